@@ -0,0 +1,265 @@
+"""
+Cached role and permission resolution.
+
+A user's role, group names and permissions are loaded together by
+:func:`get_user_access` and kept in two places: on the user object, so a
+request resolves them at most once however many checks it makes, and in
+the Django cache (``ACCESS_CACHE_ALIAS``, ``ACCESS_CACHE_TIMEOUT``
+seconds), so later requests skip the group and permission queries
+entirely.
+
+Cached entries are dropped when the user's role (and with it their role
+group) or direct permissions change. A change to any group's
+permissions affects many users at once, so it starts a new permissions
+*generation* instead, which makes every cached entry unreachable, in the
+same way as the article generation of :mod:`newsapp.cache`. Group
+memberships changed by hand, outside the role, are picked up when the
+entry expires, or at once after :func:`invalidate_user_access`.
+
+:class:`CachedModelBackend` serves ``has_perm`` and the template
+``perms`` proxy from the same entries. It also loads the user of each
+authenticated request from the cache (for ``USER_CACHE_TIMEOUT``
+seconds) instead of the database; a cached user is dropped whenever the
+user is saved or deleted. Together with a cache-backed or signed-cookie
+``SESSION_ENGINE``, a logged-in request then needs no database query
+before the view runs.
+"""
+import time
+from dataclasses import dataclass
+from typing import FrozenSet, Iterable, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import Permission
+from django.core.cache import BaseCache, caches
+from django.db.models import Q
+
+GENERATION_KEY = 'newsapp:access:generation'
+USER_KEY = 'newsapp:user:{}'
+
+
+@dataclass(frozen=True)
+class UserAccess:
+    """
+    The resolved access of one user.
+
+    :ivar role: The user's role.
+    :type role: str
+    :ivar groups: Names of the user's groups.
+    :type groups: frozenset[str]
+    :ivar permissions: ``"app_label.codename"`` of every permission the
+        user has directly or through a group.
+    :type permissions: frozenset[str]
+    """
+    role: str
+    groups: FrozenSet[str]
+    permissions: FrozenSet[str]
+
+
+ANONYMOUS = UserAccess(role='', groups=frozenset(),
+                       permissions=frozenset())
+
+
+def get_cache() -> BaseCache:
+    """
+    :return: The cache holding resolved access, selected by
+        ``ACCESS_CACHE_ALIAS``.
+    :rtype: BaseCache
+    """
+    return caches[getattr(settings, 'ACCESS_CACHE_ALIAS', 'default')]
+
+
+def _generation(cache: BaseCache) -> int:
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def access_cache_key(user_id: int, generation: int) -> str:
+    """
+    :param user_id: Id of the user.
+    :type user_id: int
+    :param generation: The current permissions generation.
+    :type generation: int
+    :return: The cache key of the user's access in this generation.
+    :rtype: str
+    """
+    return f'newsapp:access:{generation}:{user_id}'
+
+
+def load_user_access(user) -> UserAccess:
+    """
+    Reads a user's access from the database, with two queries.
+
+    :param user: An authenticated user.
+    :return: The user's access.
+    :rtype: UserAccess
+    """
+    groups = frozenset(user.groups.values_list('name', flat=True))
+    permissions = frozenset(
+        f'{app_label}.{codename}'
+        for app_label, codename in Permission.objects.filter(
+            Q(group__user=user) | Q(user=user)
+        ).values_list('content_type__app_label', 'codename').distinct())
+    return UserAccess(role=user.role, groups=groups, permissions=permissions)
+
+
+def get_user_access(user) -> UserAccess:
+    """
+    Returns a user's role, groups and permissions, from the user object
+    if they were already resolved during this request, else from the
+    cache, else from the database.
+
+    :param user: The user, possibly anonymous.
+    :return: The user's access; anonymous users have none.
+    :rtype: UserAccess
+    """
+    if not user.is_authenticated:
+        return ANONYMOUS
+    access = getattr(user, '_newsapp_access', None)
+    if access is None:
+        cache = get_cache()
+        key = access_cache_key(user.pk, _generation(cache))
+        access = cache.get(key)
+        if access is None or access.role != user.role:
+            access = load_user_access(user)
+            cache.set(key, access,
+                      getattr(settings, 'ACCESS_CACHE_TIMEOUT', 3600))
+        user._newsapp_access = access
+    return access
+
+
+def has_role(user, *roles: str) -> bool:
+    """
+    :param user: The user, possibly anonymous.
+    :param roles: Accepted roles.
+    :return: Whether the user is authenticated with one of ``roles``.
+    :rtype: bool
+    """
+    return user.is_authenticated and get_user_access(user).role in roles
+
+
+async def ahas_role(user, *roles: str) -> bool:
+    """
+    Async version of :func:`has_role`, for async views.
+
+    :param user: The user, possibly anonymous.
+    :param roles: Accepted roles.
+    :return: Whether the user is authenticated with one of ``roles``.
+    :rtype: bool
+    """
+    if not user.is_authenticated:
+        return False
+    return (await sync_to_async(get_user_access)(user)).role in roles
+
+
+def invalidate_user_access(user_ids: Iterable[int]) -> None:
+    """
+    Drops the cached access of some users, after their role, groups or
+    direct permissions changed.
+
+    :param user_ids: Ids of the users.
+    :return: None
+    """
+    cache = get_cache()
+    generation = _generation(cache)
+    cache.delete_many([access_cache_key(user_id, generation)
+                       for user_id in user_ids])
+
+
+def bump_access_generation() -> int:
+    """
+    Makes every cached access unreachable, after a group's permissions
+    changed.
+
+    :return: The new generation.
+    :rtype: int
+    """
+    cache = get_cache()
+    current = cache.get(GENERATION_KEY) or 0
+    generation = max(int(time.time() * 1000), current + 1)
+    cache.set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    """
+    Drops a user loaded by :meth:`CachedModelBackend.get_user` from the
+    cache, after the user changed.
+
+    :param user_id: Id of the user.
+    :type user_id: int
+    :return: None
+    """
+    get_cache().delete(USER_KEY.format(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ``ModelBackend`` whose permission checks are answered from
+    :func:`get_user_access`, so ``has_perm`` and the template ``perms``
+    proxy cost no queries once a user's access is cached. Object
+    permissions, inactive users and superusers are handled as by
+    ``ModelBackend``.
+
+    :meth:`get_user`, which ``AuthenticationMiddleware`` calls on every
+    authenticated request, serves users from the cache.
+    """
+
+    def get_user(self, user_id):
+        """
+        :param user_id: Id of the user stored in the session.
+        :return: The user, or None if it does not exist or may not log
+            in.
+        """
+        timeout = getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+        if timeout <= 0:
+            return super().get_user(user_id)
+        cache = get_cache()
+        key = USER_KEY.format(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, timeout)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        """
+        Async version of :meth:`get_user`, used by ``request.auser()``.
+
+        :param user_id: Id of the user stored in the session.
+        :return: The user, or None if it does not exist or may not log
+            in.
+        """
+        timeout = getattr(settings, 'USER_CACHE_TIMEOUT', 300)
+        if timeout <= 0:
+            return await super().aget_user(user_id)
+        cache = get_cache()
+        key = USER_KEY.format(user_id)
+        user = await cache.aget(key)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(key, user, timeout)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj: Optional[object] = None
+                            ) -> set:
+        """
+        :param user_obj: The user.
+        :param obj: Unsupported, as in ``ModelBackend``.
+        :return: The user's permission names.
+        :rtype: set[str]
+        """
+        if not user_obj.is_active or user_obj.is_anonymous \
+                or obj is not None:
+            return set()
+        if user_obj.is_superuser:
+            return super().get_all_permissions(user_obj, obj)
+        return set(get_user_access(user_obj).permissions)
@@ -1,7 +1,11 @@
 from django.contrib import admin
-from .models import CustomUser, Publisher, Journalist, Article
+from .models import CustomUser, Publisher, Journalist, Article, \
+    NotificationOutbox, SocialPost, DigestDelivery
 
 admin.site.register(CustomUser)
 admin.site.register(Publisher)
 admin.site.register(Journalist)
 admin.site.register(Article)
+admin.site.register(NotificationOutbox)
+admin.site.register(SocialPost)
+admin.site.register(DigestDelivery)
@@ -0,0 +1,23 @@
+"""
+URLconf for requests served through ASGI, selected by
+:class:`~newsapp.middleware.AsyncURLConfMiddleware`.
+
+The read-heavy pages and APIs are served by the async views of
+:mod:`newsapp.async_views`; every other URL falls through to
+``ROOT_URLCONF``, whose names ``reverse()`` keeps using.
+"""
+from django.conf import settings
+from django.urls import include, path
+
+from .async_views import article_list, article_list_api, home, \
+    journalist_list_api, newsletter_detail, publisher_list_api
+
+urlpatterns = [
+    path('', home),
+    path('articles/', article_list),
+    path('api/articles/', article_list_api),
+    path('api/journalists/', journalist_list_api),
+    path('api/publishers/', publisher_list_api),
+    path('newsletters/<int:pk>/', newsletter_detail),
+    path('', include(settings.ROOT_URLCONF)),
+]
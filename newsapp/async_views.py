@@ -0,0 +1,240 @@
+"""
+Async versions of the read-heavy views, for deployments served by an
+ASGI server such as uvicorn.
+
+:class:`~newsapp.middleware.AsyncURLConfMiddleware` routes requests that
+arrive through ASGI to :mod:`newsapp.async_urls`, which maps the home
+page, the HTML article list, newsletter details and the article,
+journalist and publisher APIs to the views below, and everything else
+to the usual URLconf. WSGI deployments are unaffected.
+
+The views load the session and user with ``request.auser()`` and read
+through Django's async ORM, so a worker keeps serving other requests
+while one waits. Django still runs each query, and template rendering,
+in a worker thread; the gain is in concurrency, not in the cost of a
+single request.
+
+DRF views are synchronous, so the API views here are plain Django views
+producing the same JSON, ``Link`` header and anonymous listing cache as
+their DRF counterparts in :mod:`newsapp.views`. They authenticate
+through the session only.
+"""
+from typing import Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+
+from .access import ahas_role
+from .cache import aget_generation, cache_public_listing, \
+    conditional_response, get_cache, listing_cache_key, set_validators
+from .feeds import reader_feed
+from .models import Article, Journalist, Newsletter, Publisher
+from .pagination import KeysetPagination
+from .routers import read_from_replicas
+from .serializers import ArticleSerializer, JournalistSerializer, \
+    PublisherSerializer, ValuesSerializer
+from .views import home_context, parse_fields
+
+KEYSET_COLUMNS = ('id', 'created_at')
+
+
+def json_response(data, status: int = 200,
+                  headers: Optional[dict] = None) -> HttpResponse:
+    """
+    Renders data as DRF's ``JSONRenderer`` would.
+
+    :param data: The data to render.
+    :param status: The response status.
+    :type status: int
+    :param headers: Extra response headers.
+    :type headers: dict or None
+    :return: The JSON response.
+    :rtype: HttpResponse
+    """
+    headers = dict(headers or {})
+    headers.setdefault('Content-Type', 'application/json')
+    return HttpResponse(JSONRenderer().render(data), status=status,
+                        headers=headers)
+
+
+async def serialize_page(request: HttpRequest, queryset,
+                         serializer: ValuesSerializer,
+                         paginate: bool = False) -> Tuple[list, dict]:
+    """
+    Reads ``values()`` rows of a queryset and serializes them, like
+    :class:`~newsapp.views.ValuesListMixin`.
+
+    :param request: The current request.
+    :type request: HttpRequest
+    :param queryset: The objects to list.
+    :type queryset: QuerySet
+    :param serializer: The fast serializer of the objects.
+    :type serializer: ValuesSerializer
+    :param paginate: Whether to return one keyset page.
+    :type paginate: bool
+    :return: The serialized rows and the response headers.
+    :rtype: tuple
+    :raises NotFound: If the page cursor is malformed.
+    """
+    columns = list(serializer.columns)
+    if not paginate:
+        rows = [row async for row in queryset.values(*columns)]
+        return await serializer.aserialize(rows), {}
+    columns += [c for c in KEYSET_COLUMNS if c not in columns]
+    paginator = KeysetPagination()
+    rows = await paginator.apaginate_queryset(queryset.values(*columns),
+                                              request)
+    return await serializer.aserialize(rows), paginator.get_headers()
+
+
+async def home(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of :func:`newsapp.views.home`.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :return: The rendered home page.
+    :rtype: HttpResponse
+    """
+    request.user = await request.auser()
+    return await sync_to_async(render)(request, 'newsapp/home.html',
+                                       home_context(request.user))
+
+
+@cache_public_listing
+@read_from_replicas
+async def article_list(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of :func:`newsapp.views.article_list`, sharing its
+    anonymous page cache.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :return: The rendered list of approved articles.
+    :rtype: HttpResponse
+    """
+    request.user = await request.auser()
+    articles = [article async for article in Article.objects.filter(
+        approved=True).order_by('-created_at', '-id')]
+    return await sync_to_async(render)(request, 'newsapp/article_list.html',
+                                       {'articles': articles})
+
+
+@login_required
+async def newsletter_detail(request: HttpRequest, pk: int) -> HttpResponse:
+    """
+    Async version of :func:`newsapp.views.newsletter_detail`.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :param pk: The primary key of the newsletter.
+    :type pk: int
+    :return: The rendered newsletter, or a redirection to the newsletter
+        list if the user may not read it.
+    :rtype: HttpResponse
+    """
+    request.user = user = await request.auser()
+    newsletter = await aget_object_or_404(
+        Newsletter.objects.select_related('publisher', 'journalist'), pk=pk)
+    allowed = (newsletter.approved
+               or newsletter.journalist_id == user.pk
+               or await ahas_role(user, 'editor'))
+    if allowed:
+        return await sync_to_async(render)(
+            request, 'newsapp/newsletter_detail.html',
+            {'newsletter': newsletter})
+    return redirect('newsletter_list')
+
+
+@require_GET
+@read_from_replicas
+async def article_list_api(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of :class:`newsapp.views.ArticleListView`: a reader's
+    feed, or every approved article, newest first, one keyset page at a
+    time, with an optional ``fields`` sparse fieldset. Anonymous pages
+    share the listing cache of the DRF view.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :return: The page of articles as JSON.
+    :rtype: HttpResponse
+    """
+    user = await request.auser()
+    try:
+        fields = parse_fields(request.GET.get('fields'), ArticleSerializer)
+    except ValidationError as e:
+        return json_response(e.detail, status=400)
+    serializer = ValuesSerializer.for_serializer(ArticleSerializer, fields)
+    if user.is_authenticated and user.role == 'reader':
+        queryset = await sync_to_async(reader_feed)(user)
+    else:
+        queryset = Article.objects.filter(approved=True)
+
+    if user.is_authenticated:
+        try:
+            data, headers = await serialize_page(request, queryset,
+                                                 serializer, paginate=True)
+        except NotFound as e:
+            return json_response({'detail': e.detail}, status=404)
+        return json_response(data, headers=headers)
+
+    generation = await aget_generation()
+    not_modified = conditional_response(request, generation)
+    if not_modified is not None:
+        return not_modified
+    cache = get_cache()
+    key = listing_cache_key(request, generation)
+    cached = await cache.aget(key)
+    if cached is None:
+        try:
+            data, headers = await serialize_page(request, queryset,
+                                                 serializer, paginate=True)
+        except NotFound as e:
+            return json_response({'detail': e.detail}, status=404)
+        # Stored as DRF's Response arguments, like ArticleListView does.
+        cached = (data, 200, None,
+                  {'Content-Type': 'application/json', **headers})
+        await cache.aset(key, cached,
+                         getattr(settings, 'LISTING_CACHE_TIMEOUT', 300))
+    data, status, _, headers = cached
+    return set_validators(json_response(data, status, headers),
+                          request, generation)
+
+
+@require_GET
+async def journalist_list_api(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of :class:`newsapp.views.JournalistListView`.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :return: Every journalist as JSON.
+    :rtype: HttpResponse
+    """
+    data, headers = await serialize_page(
+        request, Journalist.objects.all(),
+        ValuesSerializer.for_serializer(JournalistSerializer))
+    return json_response(data, headers=headers)
+
+
+@require_GET
+async def publisher_list_api(request: HttpRequest) -> HttpResponse:
+    """
+    Async version of :class:`newsapp.views.PublisherListView`.
+
+    :param request: The HTTP request.
+    :type request: HttpRequest
+    :return: Every publisher as JSON.
+    :rtype: HttpResponse
+    """
+    data, headers = await serialize_page(
+        request, Publisher.objects.all(),
+        ValuesSerializer.for_serializer(PublisherSerializer))
+    return json_response(data, headers=headers)
@@ -0,0 +1,1186 @@
+"""
+Benchmark scenarios run by the ``benchmark`` management command.
+
+Each scenario is a :class:`Scenario` subclass registered with
+:func:`register`. Scenarios run against a throwaway test database created
+by :func:`benchmark_database`, so they never touch real data, and they
+seed it with ``bulk_create`` so that seeding stays cheap at large sizes.
+The ``load`` scenario is the exception: it drives servers that are
+already running.
+"""
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from io import BytesIO
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections, \
+    reset_queries, transaction
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, \
+    setup_test_environment, teardown_test_environment
+from rest_framework.utils.encoders import JSONEncoder
+
+from .feeds import rebuild_feed
+from .models import Article, CustomUser, Journalist, Newsletter, Publisher
+from .recipients import iter_subscriber_emails
+from .roles import role_group
+from .search import rebuild_index
+from .serializers import ArticleSerializer, JournalistSerializer, \
+    PublisherSerializer, ValuesSerializer
+
+SCENARIOS: Dict[str, 'Scenario'] = {}
+
+
+def register(cls: type) -> type:
+    """
+    Class decorator that adds a :class:`Scenario` to :data:`SCENARIOS`.
+
+    :param cls: The scenario class.
+    :type cls: type
+    :return: The class, unchanged.
+    :rtype: type
+    """
+    SCENARIOS[cls.name] = cls()
+    return cls
+
+
+class Scenario:
+    """
+    Base class for benchmark scenarios.
+
+    :ivar name: Sub-command name of the scenario.
+    :type name: str
+    :ivar help: One-line description shown by ``--help``.
+    :type help: str
+    """
+    name = ''
+    help = ''
+
+    def add_arguments(self, parser) -> None:
+        """
+        Adds scenario specific options to the sub-command parser.
+
+        :param parser: The sub-command's argument parser.
+        :return: None
+        """
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        """
+        Runs the scenario.
+
+        :param options: Parsed command line options.
+        :type options: dict
+        :param write: Function that writes one line of output.
+        :type write: Callable
+        :return: None
+        """
+        raise NotImplementedError
+
+
+@contextmanager
+def benchmark_database(on_disk: bool = False) -> Iterator[None]:
+    """
+    Creates a fresh test database for the duration of the block and
+    destroys it afterwards, in the same way the test runner does.
+
+    :param on_disk: Create an SQLite test database in a temporary file
+        rather than in memory. Django never closes connections to an
+        in-memory database, since that would destroy it.
+    :type on_disk: bool
+    :return: A context manager.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    old_test_name = test_settings.get('NAME')
+    if on_disk and connection.vendor == 'sqlite' and not old_test_name:
+        test_settings['NAME'] = os.path.join(tempfile.gettempdir(),
+                                             'newsapp-benchmark.sqlite3')
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = old_test_name
+
+
+def measure(func: Callable[[], object]) -> Tuple[object, float, int]:
+    """
+    Calls ``func`` while measuring wall-clock time and peak Python memory
+    allocation.
+
+    :param func: The function to call.
+    :type func: Callable
+    :return: ``(result, seconds, peak_bytes)``.
+    :rtype: tuple
+    """
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = func()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def parse_sizes(value: str) -> List[int]:
+    """
+    Parses a comma separated list of sizes such as ``1000,10000``.
+
+    :param value: The option value.
+    :type value: str
+    :return: The sizes as integers.
+    :rtype: list[int]
+    """
+    return [int(size) for size in value.split(',') if size]
+
+
+def seed_subscribers(publisher: Publisher, journalist: CustomUser,
+                     count: int, start: int = 0,
+                     batch_size: int = 5000) -> None:
+    """
+    Creates ``count`` readers subscribed to ``publisher``, every other one
+    of which is also subscribed to ``journalist``.
+
+    :param publisher: Publisher to subscribe to.
+    :type publisher: Publisher
+    :param journalist: Journalist user to subscribe to.
+    :type journalist: CustomUser
+    :param count: Number of readers to create.
+    :type count: int
+    :param start: Number used for the first reader's username.
+    :type start: int
+    :param batch_size: Rows per ``bulk_create`` call.
+    :type batch_size: int
+    :return: None
+    """
+    by_publisher = CustomUser.subscriptions_publishers.through
+    by_journalist = CustomUser.subscriptions_journalists.through
+    for offset in range(start, start + count, batch_size):
+        stop = min(offset + batch_size, start + count)
+        readers = CustomUser.objects.bulk_create([
+            CustomUser(username=f'reader{i}', email=f'reader{i}@example.com',
+                       password='!', role='reader')
+            for i in range(offset, stop)
+        ])
+        if readers[0].pk is None:
+            readers = list(CustomUser.objects.filter(
+                username__in=[r.username for r in readers]))
+        by_publisher.objects.bulk_create([
+            by_publisher(customuser_id=r.pk, publisher_id=publisher.pk)
+            for r in readers
+        ])
+        by_journalist.objects.bulk_create([
+            by_journalist(from_customuser_id=r.pk,
+                          to_customuser_id=journalist.pk)
+            for r in readers[::2]
+        ])
+
+
+@register
+class RecipientsScenario(Scenario):
+    """
+    Compares the memory used to resolve an article's notification
+    recipients by loading full ``CustomUser`` rows for both subscription
+    sets, as ``notify_on_approval`` used to, against streaming distinct
+    addresses with :func:`~newsapp.recipients.iter_subscriber_emails`.
+    """
+    name = 'recipients'
+    help = 'Memory and time to resolve notification recipients.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--sizes', type=parse_sizes, default=[1000, 10000, 50000],
+            help='Comma separated subscriber counts (default: '
+                 '1000,10000,50000).')
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Rows fetched per query when streaming.')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        write(f"{'subscribers':>12} {'method':>10} {'recipients':>11} "
+              f"{'seconds':>8} {'peak KiB':>10}")
+        with benchmark_database():
+            publisher = Publisher.objects.create(name='Benchmark')
+            journalist = CustomUser.objects.create(
+                username='journalist', role='journalist')
+            seeded = 0
+            for size in options['sizes']:
+                seed_subscribers(publisher, journalist, size - seeded,
+                                 start=seeded)
+                seeded = size
+
+                def legacy():
+                    publisher_subs = publisher.subscribed_readers.all()
+                    journalist_subs = journalist.subscribed_readers.all()
+                    return len(set([u.email for u in publisher_subs]
+                                   + [u.email for u in journalist_subs]))
+
+                def streamed():
+                    return sum(1 for _ in iter_subscriber_emails(
+                        publisher.pk, journalist.pk,
+                        chunk_size=options['chunk_size']))
+
+                for label, func in (('legacy', legacy),
+                                    ('streamed', streamed)):
+                    count, elapsed, peak = measure(func)
+                    write(f"{size:>12} {label:>10} {count:>11} "
+                          f"{elapsed:>8.3f} {peak / 1024:>10.1f}")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Returns the ``pct`` percentile of ``values`` (nearest rank).
+
+    :param values: The samples; must not be empty.
+    :type values: list[float]
+    :param pct: The percentile, between 0 and 100.
+    :type pct: float
+    :return: The percentile value.
+    :rtype: float
+    """
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def _ids(queryset) -> List[int]:
+    # bulk_create only sets primary keys on some databases (not MySQL),
+    # so seeded rows are always read back.
+    return list(queryset.order_by('id').values_list('id', flat=True))
+
+
+def seed_dataset(publishers: int, journalists: int, readers: int,
+                 articles: int, subscriptions: int,
+                 batch_size: int = 5000) -> Dict[str, int]:
+    """
+    Seeds a synthetic portal: publishers, journalists (with their
+    ``Journalist`` profiles), one editor, readers following
+    ``subscriptions`` publishers and journalists each, articles (one in
+    ten pending) and newsletters (one per ten articles). Role groups,
+    reader feeds and the search index are filled as the application
+    would.
+
+    :param publishers: Number of publishers.
+    :type publishers: int
+    :param journalists: Number of journalists.
+    :type journalists: int
+    :param readers: Number of readers.
+    :type readers: int
+    :param articles: Number of articles.
+    :type articles: int
+    :param subscriptions: Publishers and journalists each reader follows.
+    :type subscriptions: int
+    :param batch_size: Rows per ``bulk_create`` call.
+    :type batch_size: int
+    :return: Ids of representative rows: ``editor``, ``reader``,
+        ``journalist`` (users), ``publisher``, ``journalist_profile``,
+        ``article`` (pending) and ``newsletter``.
+    :rtype: dict
+    """
+    Publisher.objects.bulk_create(
+        [Publisher(name=f'Publisher {i}') for i in range(publishers)],
+        batch_size=batch_size)
+    publisher_ids = _ids(Publisher.objects.all())
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'{role}{i}', email=f'{role}{i}@example.com',
+                   password='!', role=role)
+        for role, count in (('editor', 1), ('journalist', journalists),
+                            ('reader', readers))
+        for i in range(count)
+    ], batch_size=batch_size)
+    editor_id = _ids(CustomUser.objects.filter(role='editor'))[0]
+    journalist_ids = _ids(CustomUser.objects.filter(role='journalist'))
+    reader_ids = _ids(CustomUser.objects.filter(role='reader'))
+    Groups = CustomUser.groups.through
+    Groups.objects.bulk_create([
+        Groups(customuser_id=user_id, group_id=role_group(role).pk)
+        for role, user_ids in (('editor', [editor_id]),
+                               ('journalist', journalist_ids),
+                               ('reader', reader_ids))
+        for user_id in user_ids
+    ], batch_size=batch_size)
+    Publisher.editors.through.objects.create(
+        publisher_id=publisher_ids[0], customuser_id=editor_id)
+
+    Journalist.objects.bulk_create([
+        Journalist(user_id=user_id, name=f'journalist{i}')
+        for i, user_id in enumerate(journalist_ids)
+    ], batch_size=batch_size)
+    profile_ids = _ids(Journalist.objects.all())
+    Journalist.publishers.through.objects.bulk_create([
+        Journalist.publishers.through(
+            journalist_id=profile_id,
+            publisher_id=publisher_ids[i % publishers])
+        for i, profile_id in enumerate(profile_ids)
+    ], batch_size=batch_size)
+
+    def byline(i: int) -> dict:
+        return {'journalist_id': journalist_ids[i % journalists],
+                'publisher_id': publisher_ids[i % publishers]}
+
+    Article.objects.bulk_create([
+        Article(title=f'Article {i}', content=f'Body of article {i}.',
+                approved=i % 10 != 0, **byline(i))
+        for i in range(articles)
+    ], batch_size=batch_size)
+    Newsletter.objects.bulk_create([
+        Newsletter(title=f'Newsletter {i}', content=f'Newsletter {i}.',
+                   approved=i % 2 == 0, **byline(i))
+        for i in range(max(articles // 10, 1))
+    ], batch_size=batch_size)
+
+    by_publisher = CustomUser.subscriptions_publishers.through
+    by_journalist = CustomUser.subscriptions_journalists.through
+    follows = min(subscriptions, publishers, journalists)
+    by_publisher.objects.bulk_create([
+        by_publisher(customuser_id=reader_id,
+                     publisher_id=publisher_ids[(i + j) % publishers])
+        for i, reader_id in enumerate(reader_ids) for j in range(follows)
+    ], batch_size=batch_size)
+    by_journalist.objects.bulk_create([
+        by_journalist(from_customuser_id=reader_id,
+                      to_customuser_id=journalist_ids[(i + j) % journalists])
+        for i, reader_id in enumerate(reader_ids) for j in range(follows)
+    ], batch_size=batch_size)
+    for reader in CustomUser.objects.filter(role='reader').only('id'):
+        rebuild_feed(reader)
+    rebuild_index()
+
+    return {
+        'editor': editor_id,
+        'reader': reader_ids[0],
+        'journalist': journalist_ids[0],
+        'publisher': publisher_ids[0],
+        'journalist_profile': profile_ids[0],
+        'article': _ids(Article.objects.filter(approved=False))[0],
+        'newsletter': _ids(Newsletter.objects.all())[0],
+    }
+
+
+# Which seeded row fills each URL parameter. Routes are looked up by
+# name first, so that ``pk`` can mean different models.
+ROUTE_PARAMETERS = {
+    'article_id': 'article',
+    'subscribe_publisher': 'publisher',
+    'unsubscribe_publisher': 'publisher',
+    'subscribe_journalist': 'journalist_profile',
+    'unsubscribe_journalist': 'journalist_profile',
+    'newsletter_detail': 'newsletter',
+    'newsletter_update': 'newsletter',
+    'newsletter_delete': 'newsletter',
+    'approve_newsletter': 'newsletter',
+}
+# Query strings for routes that need one to do real work.
+ROUTE_QUERIES = {
+    'article_search': 'q=article+bod*',
+}
+ROLES = ('anonymous', 'reader', 'journalist', 'editor')
+# Statements of the rollback wrapper, left out of query counts.
+TRANSACTION_SQL = ('BEGIN', 'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK')
+
+
+def route_paths(ids: Dict[str, int]) -> List[str]:
+    """
+    Builds a concrete path for every route in ``newsapp.urls``, with the
+    query string from ``ROUTE_QUERIES`` where one is needed.
+
+    :param ids: Seeded row ids, as returned by :func:`seed_dataset`.
+    :type ids: dict
+    :return: The paths, in URLconf order.
+    :rtype: list[str]
+    :raises ValueError: If a route has a parameter that
+        ``ROUTE_PARAMETERS`` does not cover.
+    """
+    from .urls import urlpatterns
+
+    paths = []
+    for pattern in urlpatterns:
+        def fill(match):
+            key = (ROUTE_PARAMETERS.get(pattern.name)
+                   or ROUTE_PARAMETERS.get(match.group(1)))
+            if key is None:
+                raise ValueError(
+                    f"No benchmark value for '{match.group(1)}' in route "
+                    f"'{pattern.name}'; add it to ROUTE_PARAMETERS.")
+            return str(ids[key])
+
+        path = '/' + re.sub(r'<(?:\w+:)?(\w+)>', fill, str(pattern.pattern))
+        if pattern.name in ROUTE_QUERIES:
+            path += '?' + ROUTE_QUERIES[pattern.name]
+        paths.append(path)
+    return paths
+
+
+def benchmark_routes(ids: Dict[str, int], repeat: int,
+                     roles: Tuple[str, ...] = ROLES) -> Dict[str, dict]:
+    """
+    Requests every route as every role and records its cost.
+
+    Each request runs in a transaction that is rolled back, so routes
+    that change data (approvals, subscriptions, deletions) see the same
+    database on every repetition. The listing cache is cleared first and
+    then left to work as in production.
+
+    :param ids: Seeded row ids, as returned by :func:`seed_dataset`.
+    :type ids: dict
+    :param repeat: Timed requests per route and role.
+    :type repeat: int
+    :param roles: Roles to request as.
+    :type roles: tuple
+    :return: ``{"<role> <path>": {"status", "queries", "p50_ms",
+        "p95_ms", "peak_kib"}}``.
+    :rtype: dict
+    """
+    caches['default'].clear()
+    results = {}
+    # Server errors are recorded as status 500 rather than logged.
+    request_logger = logging.getLogger('django.request')
+    level = request_logger.level
+    request_logger.setLevel(logging.CRITICAL)
+    try:
+        for role in roles:
+            _benchmark_role(role, ids, repeat, results)
+    finally:
+        request_logger.setLevel(level)
+    return results
+
+
+def _benchmark_role(role: str, ids: Dict[str, int], repeat: int,
+                    results: Dict[str, dict]) -> None:
+    """
+    Benchmarks every route as one role, adding the rows to ``results``.
+    """
+    client = Client(raise_request_exception=False)
+    if role != 'anonymous':
+        client.force_login(CustomUser.objects.get(pk=ids[role]))
+    for path in route_paths(ids):
+        def request():
+            with transaction.atomic():
+                response = client.get(path)
+                transaction.set_rollback(True)
+            return response
+
+        # The query log is a bounded deque; empty it so the capture
+        # cannot be truncated.
+        reset_queries()
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+        query_count = sum(1 for query in queries.captured_queries
+                          if not query['sql'].startswith(TRANSACTION_SQL))
+        _, _, peak = measure(request)
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[f'{role} {path}'] = {
+            'status': response.status_code,
+            'queries': query_count,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'peak_kib': round(peak / 1024, 1),
+        }
+
+
+def find_regressions(baseline: Dict[str, dict], results: Dict[str, dict],
+                     threshold: float, min_ms: float = 1.0,
+                     min_kib: float = 64.0) -> List[str]:
+    """
+    Compares results with a baseline.
+
+    A route regresses if it starts failing with a server error, if it
+    runs more queries than in the baseline, or
+    if its p95 latency or peak memory grew by more than ``threshold``
+    (a fraction) and by more than ``min_ms`` / ``min_kib``, which keeps
+    timer and allocator noise on fast routes from failing the run.
+    Routes missing from the baseline are not compared.
+
+    :param baseline: Earlier results.
+    :type baseline: dict
+    :param results: Current results.
+    :type results: dict
+    :param threshold: Allowed relative growth, e.g. ``0.25``.
+    :type threshold: float
+    :param min_ms: Smallest latency growth reported, in milliseconds.
+    :type min_ms: float
+    :param min_kib: Smallest memory growth reported, in KiB.
+    :type min_kib: float
+    :return: One message per regression.
+    :rtype: list[str]
+    """
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        if current['status'] >= 500 > before['status']:
+            regressions.append(f"{key}: status {before['status']} -> "
+                               f"{current['status']}")
+        if current['queries'] > before['queries']:
+            regressions.append(f"{key}: {before['queries']} -> "
+                               f"{current['queries']} queries")
+        for metric, unit, floor in (('p95_ms', 'ms', min_ms),
+                                    ('peak_kib', 'KiB', min_kib)):
+            growth = current[metric] - before[metric]
+            if growth > floor and growth > before[metric] * threshold:
+                regressions.append(f"{key}: {metric} {before[metric]} -> "
+                                   f"{current[metric]} {unit}")
+    return regressions
+
+
+@register
+class RoutesScenario(Scenario):
+    """
+    Requests every route in ``newsapp.urls`` as an anonymous visitor, a
+    reader, a journalist and an editor against a seeded dataset, and
+    records the query count, p50/p95 latency and peak memory of each.
+
+    With ``--baseline FILE`` the results are compared with the file and
+    the command fails on regressions; ``--update`` (or a missing file)
+    writes the results as the new baseline instead.
+    """
+    name = 'routes'
+    help = 'Query counts, latency and memory of every route per role.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--publishers', type=int, default=10)
+        parser.add_argument('--journalists', type=int, default=20)
+        parser.add_argument('--readers', type=int, default=200)
+        parser.add_argument('--articles', type=int, default=2000)
+        parser.add_argument(
+            '--subscriptions', type=int, default=3,
+            help='Publishers and journalists each reader follows.')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Timed requests per route and role (default: 20).')
+        parser.add_argument(
+            '--baseline', help='JSON baseline file to compare with.')
+        parser.add_argument(
+            '--update', action='store_true',
+            help='Write the results to --baseline instead of comparing.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.5,
+            help='Allowed relative growth of p95 latency and memory '
+                 '(default: 0.5).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        sizes = {name: options[name] for name in (
+            'publishers', 'journalists', 'readers', 'articles',
+            'subscriptions')}
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                ids = seed_dataset(**sizes)
+                results = benchmark_routes(ids, options['repeat'])
+        finally:
+            teardown_test_environment()
+
+        write(f"{'route':<50} {'status':>6} {'queries':>7} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'peak KiB':>9}")
+        for key, row in results.items():
+            write(f"{key:<50} {row['status']:>6} {row['queries']:>7} "
+                  f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                  f"{row['peak_kib']:>9.1f}")
+
+        path: Optional[str] = options['baseline']
+        if not path:
+            return
+        if options['update'] or not os.path.exists(path):
+            with open(path, 'w') as f:
+                json.dump({'dataset': sizes, 'routes': results}, f,
+                          indent=2, sort_keys=True)
+            write(f"Baseline written to {path}.")
+            return
+        with open(path) as f:
+            baseline = json.load(f)
+        if baseline.get('dataset') != sizes:
+            write(f"Warning: baseline dataset {baseline.get('dataset')} "
+                  f"differs from {sizes}.")
+        regressions = find_regressions(baseline['routes'], results,
+                                       options['threshold'])
+        if regressions:
+            raise CommandError('Route regressions:\n'
+                               + '\n'.join(regressions))
+        write(f"No regressions against {path}.")
+
+
+def serializer_cases(rows: int) -> Dict[str, Tuple[type, object]]:
+    """
+    Returns the list querysets compared by the ``serializers`` scenario,
+    loaded as the list views load them for each path.
+
+    :param rows: Maximum rows per list.
+    :type rows: int
+    :return: ``{name: (serializer_class, queryset)}``.
+    :rtype: dict
+    """
+    return {
+        'articles': (ArticleSerializer, Article.objects.filter(
+            approved=True).order_by('-created_at', '-id')[:rows]),
+        'journalists': (JournalistSerializer, Journalist.objects.order_by(
+            'id').prefetch_related('publishers')[:rows]),
+        'publishers': (PublisherSerializer, Publisher.objects.order_by(
+            'id').prefetch_related('editors')[:rows]),
+    }
+
+
+def compare_serializers(rows: int, repeat: int) -> Dict[str, dict]:
+    """
+    Times serializing each list of :func:`serializer_cases` with its
+    ``ModelSerializer`` and with
+    :class:`~newsapp.serializers.ValuesSerializer`, from the query to
+    the list of dicts.
+
+    :param rows: Maximum rows per list.
+    :type rows: int
+    :param repeat: Timed runs per list and method.
+    :type repeat: int
+    :return: ``{"<list> <method>": {rows, p50_ms, peak_kib,
+        identical}}``; ``identical`` tells whether the fast output
+        equals the model serializer's.
+    :rtype: dict
+    """
+    results = {}
+    for name, (serializer_class, queryset) in serializer_cases(rows).items():
+        fast = ValuesSerializer.for_serializer(serializer_class)
+
+        def model():
+            return serializer_class(queryset.all(), many=True).data
+
+        def values():
+            return fast.serialize(queryset.values(*fast.columns))
+
+        expected = json.loads(json.dumps(model(), cls=JSONEncoder))
+        for method, func in (('model', model), ('values', values)):
+            timings = []
+            for _ in range(repeat):
+                data, elapsed, peak = measure(func)
+                timings.append(elapsed * 1000)
+            results[f'{name} {method}'] = {
+                'rows': len(data),
+                'p50_ms': round(percentile(timings, 50), 3),
+                'peak_kib': round(peak / 1024, 1),
+                'identical': json.loads(json.dumps(
+                    data, cls=JSONEncoder)) == expected,
+            }
+    return results
+
+
+@register
+class SerializersScenario(Scenario):
+    """
+    Compares the model serializers of the list APIs with the
+    ``values()``-based fast path on a seeded dataset, and fails if the
+    two produce different JSON.
+    """
+    name = 'serializers'
+    help = 'Time and memory of the list serializers, model vs values().'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('--publishers', type=int, default=200)
+        parser.add_argument('--journalists', type=int, default=1000)
+        parser.add_argument('--articles', type=int, default=5000)
+        parser.add_argument(
+            '--rows', type=int, default=1000,
+            help='Rows serialized per list (default: 1000).')
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Timed runs per list and method (default: 10).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        with benchmark_database():
+            seed_dataset(options['publishers'], options['journalists'],
+                         readers=1, articles=options['articles'],
+                         subscriptions=1)
+            results = compare_serializers(options['rows'],
+                                          options['repeat'])
+        write(f"{'list':<24} {'rows':>6} {'p50 ms':>8} {'peak KiB':>9} "
+              f"{'same JSON':>9}")
+        for key, row in results.items():
+            write(f"{key:<24} {row['rows']:>6} {row['p50_ms']:>8.2f} "
+                  f"{row['peak_kib']:>9.1f} {str(row['identical']):>9}")
+        different = [key for key, row in results.items()
+                     if not row['identical']]
+        if different:
+            raise CommandError('Serializer output differs: '
+                               + ', '.join(different))
+
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+USER_LOADERS = {
+    'database': 'django.contrib.auth.backends.ModelBackend',
+    'cached': 'newsapp.access.CachedModelBackend',
+}
+SESSION_ROUTES = ('home', 'profile')
+
+
+def benchmark_sessions(user: CustomUser, repeat: int,
+                       engines: Tuple[str, ...] = tuple(SESSION_ENGINES)
+                       ) -> Dict[str, dict]:
+    """
+    Requests the session-dependent routes as ``user`` with every session
+    engine and user loader, and records the queries and latency of a
+    warm request (the session and user already cached where the
+    configuration caches them).
+
+    :param user: The logged in user.
+    :type user: CustomUser
+    :param repeat: Timed requests per route and configuration.
+    :type repeat: int
+    :param engines: Keys of :data:`SESSION_ENGINES` to compare.
+    :type engines: tuple
+    :return: ``{"<engine> <loader> <route>": {"queries", "p50_ms"}}``.
+    :rtype: dict
+    """
+    results = {}
+    for engine in engines:
+        for loader, backend in USER_LOADERS.items():
+            with override_settings(SESSION_ENGINE=SESSION_ENGINES[engine],
+                                   AUTHENTICATION_BACKENDS=[backend]):
+                caches['default'].clear()
+                client = Client()
+                client.force_login(user, backend=backend)
+                for name in SESSION_ROUTES:
+                    path = reverse(name)
+                    client.get(path)
+                    reset_queries()
+                    with CaptureQueriesContext(connection) as queries:
+                        client.get(path)
+                    query_count = len(queries.captured_queries)
+                    timings = []
+                    for _ in range(repeat):
+                        started = time.perf_counter()
+                        client.get(path)
+                        timings.append((time.perf_counter() - started)
+                                       * 1000)
+                    results[f'{engine} {loader} {name}'] = {
+                        'queries': query_count,
+                        'p50_ms': round(percentile(timings, 50), 3),
+                    }
+    return results
+
+
+@register
+class SessionsScenario(Scenario):
+    """
+    Compares the per-request cost of the session engines, with the user
+    loaded from the database by ``ModelBackend`` or from the cache by
+    :class:`~newsapp.access.CachedModelBackend`, on the ``home`` and
+    ``profile`` pages of a logged in reader.
+    """
+    name = 'sessions'
+    help = 'Queries and latency per request for each session setup.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Timed requests per route and setup (default: 50).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                user = CustomUser.objects.create_user(
+                    username='reader', password='benchmark', role='reader')
+                results = benchmark_sessions(user, options['repeat'])
+        finally:
+            teardown_test_environment()
+        write(f"{'setup':<36} {'queries':>7} {'p50 ms':>8}")
+        for key, row in results.items():
+            write(f"{key:<36} {row['queries']:>7} {row['p50_ms']:>8.2f}")
+
+
+TEMPLATE_PATHS = ('/', '/articles/', '/publishers/')
+
+
+def template_profiles() -> Dict[str, dict]:
+    """
+    :return: Settings overrides of the template setups compared by the
+        ``templates`` scenario: ``before`` compiles every template on
+        each render and caches no fragments, ``after`` is the configured
+        setup (cached loader and ``{% cache %}`` fragments).
+    :rtype: dict
+    """
+    engine = settings.TEMPLATES[0]
+    options = dict(engine['OPTIONS'], loaders=[
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ])
+    return {
+        'before': {'TEMPLATES': [dict(engine, OPTIONS=options)],
+                   'TEMPLATE_FRAGMENT_TIMEOUT': 0},
+        'after': {},
+    }
+
+
+def benchmark_templates(user: CustomUser, repeat: int) -> Dict[str, dict]:
+    """
+    Requests the HTML pages of :data:`TEMPLATE_PATHS` as ``user`` with
+    each template setup of :func:`template_profiles`, and records the
+    queries and latency of a request made once the setup is warm.
+
+    :param user: The logged in user.
+    :type user: CustomUser
+    :param repeat: Timed requests per page and setup.
+    :type repeat: int
+    :return: ``{"<setup> <path>": {"queries", "p50_ms"}}``.
+    :rtype: dict
+    """
+    results = {}
+    for profile, overrides in template_profiles().items():
+        with override_settings(**overrides):
+            caches['default'].clear()
+            client = Client()
+            client.force_login(user)
+            for path in TEMPLATE_PATHS:
+                client.get(path)
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    client.get(path)
+                query_count = len(queries.captured_queries)
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    client.get(path)
+                    timings.append((time.perf_counter() - started) * 1000)
+                results[f'{profile} {path}'] = {
+                    'queries': query_count,
+                    'p50_ms': round(percentile(timings, 50), 3),
+                }
+    return results
+
+
+@register
+class TemplatesScenario(Scenario):
+    """
+    Compares the render time of the home, article list and publisher
+    list pages of a logged in editor with templates compiled on every
+    render and no fragment caching, and with the cached loader and
+    ``{% cache %}`` fragments.
+    """
+    name = 'templates'
+    help = 'Page render time before and after template caching.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--articles', type=int, default=500,
+            help='Number of articles to seed (default: 500).')
+        parser.add_argument(
+            '--publishers', type=int, default=100,
+            help='Number of publishers to seed (default: 100).')
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Timed requests per page and setup (default: 50).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        setup_test_environment()
+        try:
+            with benchmark_database():
+                ids = seed_dataset(
+                    publishers=options['publishers'], journalists=10,
+                    readers=10, articles=options['articles'],
+                    subscriptions=1)
+                editor = CustomUser.objects.get(pk=ids['editor'])
+                results = benchmark_templates(editor, options['repeat'])
+        finally:
+            teardown_test_environment()
+        write(f"{'setup':<24} {'queries':>7} {'p50 ms':>8}")
+        for key, row in results.items():
+            write(f"{key:<24} {row['queries']:>7} {row['p50_ms']:>8.2f}")
+
+
+CONNECTION_PATHS = ('/api/publishers/', '/api/journalists/')
+CONNECTION_PROFILES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False},
+    'persistent+checks': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+}
+
+
+def benchmark_connections(requests: int, concurrency: int,
+                          profiles: Tuple[str, ...] = tuple(
+                              CONNECTION_PROFILES),
+                          paths: Tuple[str, ...] = CONNECTION_PATHS
+                          ) -> Dict[str, dict]:
+    """
+    Serves ``requests`` anonymous GET requests for ``paths`` (in turn)
+    through the WSGI handler, from ``concurrency`` threads, with the
+    connection settings of each of :data:`CONNECTION_PROFILES`.
+
+    Unlike the test client, the WSGI handler closes old connections at
+    the start and end of every request, as a deployed server does, so
+    the profiles differ in how many connections they open.
+
+    :param requests: Requests per profile.
+    :type requests: int
+    :param concurrency: Threads serving requests, each with its own
+        database connection.
+    :type concurrency: int
+    :param profiles: Keys of :data:`CONNECTION_PROFILES` to compare.
+    :type profiles: tuple
+    :param paths: Paths requested.
+    :type paths: tuple
+    :return: ``{profile: {"requests", "errors", "connections", "rps",
+        "p50_ms"}}``.
+    :rtype: dict
+    """
+    handler = WSGIHandler()
+    settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+    saved = {key: settings_dict[key] for key in ('CONN_MAX_AGE',
+                                                 'CONN_HEALTH_CHECKS')}
+    opened = []
+
+    def count_connection(sender, connection, **kwargs) -> None:
+        opened.append(connection.alias)
+
+    def serve(count: int) -> List[Tuple[float, bool]]:
+        samples = []
+        try:
+            for i in range(count):
+                environ = {
+                    'REQUEST_METHOD': 'GET',
+                    'PATH_INFO': paths[i % len(paths)],
+                    'QUERY_STRING': '',
+                    'SERVER_NAME': 'testserver',
+                    'SERVER_PORT': '80',
+                    'wsgi.url_scheme': 'http',
+                    'wsgi.input': BytesIO(),
+                }
+                started = time.perf_counter()
+                response = handler(environ, lambda status, headers: None)
+                b''.join(response)
+                response.close()
+                samples.append((time.perf_counter() - started,
+                                response.status_code < 400))
+        finally:
+            connection.close()
+        return samples
+
+    results = {}
+    connection_created.connect(count_connection)
+    try:
+        for profile in profiles:
+            settings_dict.update(CONNECTION_PROFILES[profile])
+            opened.clear()
+            shares = [requests // concurrency
+                      + (1 if i < requests % concurrency else 0)
+                      for i in range(concurrency)]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                samples = [sample for batch in pool.map(serve, shares)
+                           for sample in batch]
+            elapsed = time.perf_counter() - started
+            latencies = [seconds * 1000 for seconds, ok in samples if ok]
+            results[profile] = {
+                'requests': requests,
+                'errors': requests - len(latencies),
+                'connections': len(opened),
+                'rps': requests / elapsed,
+                'p50_ms': percentile(latencies, 50) if latencies else 0.0,
+            }
+    finally:
+        connection_created.disconnect(count_connection)
+        settings_dict.update(saved)
+    return results
+
+
+@register
+class ConnectionsScenario(Scenario):
+    """
+    Compares request throughput with a new database connection per
+    request and with persistent connections, with and without health
+    checks, on the publisher and journalist APIs.
+
+    The scenario runs against a test database of the configured backend
+    (``DB_ENGINE``); connection setup costs most with a database server
+    such as MySQL, especially over the network.
+    """
+    name = 'connections'
+    help = 'Request throughput with and without connection reuse.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Requests per connection setup (default: 500).')
+        parser.add_argument(
+            '--concurrency', type=int, default=4,
+            help='Threads serving requests (default: 4).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        setup_test_environment()
+        try:
+            with benchmark_database(on_disk=True):
+                seed_dataset(publishers=50, journalists=50, readers=10,
+                             articles=100, subscriptions=1)
+                results = benchmark_connections(options['requests'],
+                                                options['concurrency'])
+        finally:
+            teardown_test_environment()
+        write(f"{'setup':<18} {'requests':>8} {'errors':>6} "
+              f"{'connections':>11} {'req/s':>8} {'p50 ms':>8}")
+        for profile, row in results.items():
+            write(f"{profile:<18} {row['requests']:>8} {row['errors']:>6} "
+                  f"{row['connections']:>11} {row['rps']:>8.1f} "
+                  f"{row['p50_ms']:>8.2f}")
+
+
+LOAD_PATHS = ('/', '/articles/', '/api/articles/', '/api/publishers/')
+
+
+def load_test(base_url: str, paths: List[str], concurrency: int,
+              requests: int, timeout: float = 10.0) -> dict:
+    """
+    Sends ``requests`` GET requests for ``paths`` (in turn) to a running
+    server, ``concurrency`` at a time, each worker over its own
+    keep-alive connection.
+
+    The load generator is a Python thread pool, so on a single machine
+    it saturates well below what a server may sustain; compare servers
+    at the same settings rather than reading the numbers as capacity.
+
+    :param base_url: Root URL of the server, such as
+        ``http://127.0.0.1:8000``.
+    :type base_url: str
+    :param paths: Paths requested, relative to ``base_url``.
+    :type paths: list[str]
+    :param concurrency: Requests in flight at once.
+    :type concurrency: int
+    :param requests: Total number of requests.
+    :type requests: int
+    :param timeout: Socket timeout in seconds.
+    :type timeout: float
+    :return: ``requests``, ``errors`` (failures and 4xx/5xx responses),
+        ``rps`` and the ``p50_ms``/``p95_ms`` latency of the successful
+        requests.
+    :rtype: dict
+    """
+    url = urlsplit(base_url)
+    connection_class = HTTPSConnection if url.scheme == 'https' \
+        else HTTPConnection
+    prefix = url.path.rstrip('/')
+    local = threading.local()
+    connections = []
+
+    def fetch(i: int) -> Tuple[float, bool]:
+        conn = getattr(local, 'conn', None)
+        if conn is None:
+            conn = local.conn = connection_class(url.hostname, url.port,
+                                                 timeout=timeout)
+            connections.append(conn)
+        started = time.perf_counter()
+        try:
+            conn.request('GET', prefix + paths[i % len(paths)])
+            response = conn.getresponse()
+            response.read()
+            ok = response.status < 400
+        except (OSError, HTTPException):
+            conn.close()
+            local.conn = None
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - started
+    for conn in connections:
+        conn.close()
+    latencies = [seconds * 1000 for seconds, ok in samples if ok]
+    return {
+        'requests': requests,
+        'errors': requests - len(latencies),
+        'rps': requests / elapsed,
+        'p50_ms': percentile(latencies, 50) if latencies else 0.0,
+        'p95_ms': percentile(latencies, 95) if latencies else 0.0,
+    }
+
+
+def parse_targets(values: List[str]) -> Dict[str, str]:
+    """
+    Parses ``--target`` options such as ``asgi=http://127.0.0.1:8001``.
+
+    :param values: The option values.
+    :type values: list[str]
+    :return: Base URL by target name.
+    :rtype: dict
+    :raises CommandError: If a value is not ``NAME=URL``.
+    """
+    targets = {}
+    for value in values:
+        name, sep, base_url = value.partition('=')
+        if not sep or not name or not base_url.startswith(
+                ('http://', 'https://')):
+            raise CommandError(f"Invalid target {value!r}; expected "
+                               f"NAME=http://host:port.")
+        targets[name] = base_url
+    return targets
+
+
+@register
+class LoadScenario(Scenario):
+    """
+    Load-tests running servers at increasing concurrency, to compare the
+    async views served by an ASGI server with the synchronous ones served
+    by a WSGI server. Unlike the other scenarios it does not create a
+    database; both servers should point at the same seeded one, e.g.::
+
+        uvicorn newsportal.asgi:application --port 8001 --workers 4
+        gunicorn newsportal.wsgi:application --bind :8000 --workers 4 \\
+            --threads 8
+        python manage.py benchmark load \\
+            --target wsgi=http://127.0.0.1:8000 \\
+            --target asgi=http://127.0.0.1:8001 --concurrency 1,16,64
+    """
+    name = 'load'
+    help = 'Throughput and latency of running servers under load.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help='NAME=URL of a running server; repeatable.')
+        parser.add_argument(
+            '--path', action='append', default=None,
+            help='Path to request; repeatable (default: the home page, '
+                 'article list and list APIs).')
+        parser.add_argument(
+            '--concurrency', type=parse_sizes, default=[1, 16, 64],
+            help='Comma separated concurrency levels (default: 1,16,64).')
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Requests per target and level (default: 1000).')
+
+    def run(self, options: dict, write: Callable[[str], None]) -> None:
+        targets = parse_targets(options['target'])
+        paths = options['path'] or list(LOAD_PATHS)
+        write(f"{'target':<12} {'conc':>5} {'req/s':>9} {'p50 ms':>8} "
+              f"{'p95 ms':>8} {'errors':>7}")
+        for concurrency in options['concurrency']:
+            for name, base_url in targets.items():
+                row = load_test(base_url, paths, concurrency,
+                                options['requests'])
+                write(f"{name:<12} {concurrency:>5} {row['rps']:>9.1f} "
+                      f"{row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+                      f"{row['errors']:>7}")
@@ -0,0 +1,253 @@
+"""
+Versioned response cache for the public article listings.
+
+Anonymous visitors all see the same approved articles, so their listing
+responses are cached under a key that includes the current article
+*generation*. The generation is the time, in milliseconds, of the last
+change to a published article or to a publisher. Any such change bumps
+it, which makes every cached listing unreachable at once without
+deleting keys one by one. The template fragments of the listing pages
+are keyed by the same generation (see :mod:`newsapp.context_processors`).
+The generation also provides the ``ETag`` and ``Last-Modified``
+validators, so clients revalidating an unchanged listing get a
+``304 Not Modified``.
+
+Responses are negotiated on ``Accept`` (the API also renders the
+browsable HTML API), so the cache key and the ``ETag`` cover the path and
+the ``Accept`` header, and responses carry ``Vary: Cookie, Accept``.
+
+The cache alias is ``LISTING_CACHE_ALIAS`` and entries live for
+``LISTING_CACHE_TIMEOUT`` seconds, so any Django cache backend can be
+plugged in through the ``CACHES`` setting. The generation lives in that
+cache too, so it is only shared by all processes if the backend is, such
+as Redis or Memcached. With the default ``LocMemCache`` every process
+keeps its own generation and its own listings, and a change made through
+one process reaches the listings cached by the others only when they
+expire, up to ``LISTING_CACHE_TIMEOUT`` seconds later. That is fine for
+a single-process development server, not for a multi-worker deployment.
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.http import HttpRequest, HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+
+GENERATION_KEY = 'newsapp:articles:generation'
+
+
+def get_cache() -> BaseCache:
+    """
+    :return: The cache used for listings, selected by
+        ``LISTING_CACHE_ALIAS``.
+    :rtype: BaseCache
+    """
+    return caches[getattr(settings, 'LISTING_CACHE_ALIAS', 'default')]
+
+
+def get_generation() -> int:
+    """
+    Returns the current article generation, initialising it to the
+    current time if the cache does not hold one (for example after a
+    restart or an eviction).
+
+    :return: Milliseconds since the epoch of the last recorded change.
+    :rtype: int
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+async def aget_generation() -> int:
+    """
+    Async version of :func:`get_generation`, which keeps the cache
+    round trips off the event loop.
+
+    :return: Milliseconds since the epoch of the last recorded change.
+    :rtype: int
+    """
+    cache = get_cache()
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, int(time.time() * 1000), None)
+        generation = await cache.aget(GENERATION_KEY)
+    return generation
+
+
+def bump_generation() -> int:
+    """
+    Starts a new article generation, invalidating every cached listing.
+
+    Called automatically when articles change; call it by hand after bulk
+    operations that bypass model signals, such as ``QuerySet.update()``.
+
+    :return: The new generation.
+    :rtype: int
+    """
+    cache = get_cache()
+    current = cache.get(GENERATION_KEY) or 0
+    generation = max(int(time.time() * 1000), current + 1)
+    cache.set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def _variant(request: HttpRequest) -> str:
+    """
+    :param request: The listing request.
+    :type request: HttpRequest
+    :return: A digest of what the listing response depends on besides
+        the generation: the full path and the ``Accept`` header.
+    :rtype: str
+    """
+    variant = f"{request.get_full_path()}\n{request.headers.get('Accept', '')}"
+    return hashlib.md5(variant.encode()).hexdigest()
+
+
+def listing_validators(request: HttpRequest,
+                       generation: int) -> Tuple[str, int]:
+    """
+    Builds the ``ETag`` and ``Last-Modified`` validators of a listing.
+
+    :param request: The listing request.
+    :type request: HttpRequest
+    :param generation: The current article generation.
+    :type generation: int
+    :return: ``(etag, last_modified)``, the latter in epoch seconds.
+    :rtype: tuple
+    """
+    return f'"{generation}-{_variant(request)[:12]}"', generation // 1000
+
+
+def listing_cache_key(request: HttpRequest, generation: int) -> str:
+    """
+    :param request: The listing request.
+    :type request: HttpRequest
+    :param generation: The current article generation.
+    :type generation: int
+    :return: The cache key of the request's response in this generation.
+    :rtype: str
+    """
+    return f'newsapp:listing:{generation}:{_variant(request)}'
+
+
+def conditional_response(request: HttpRequest,
+                         generation: int) -> Optional[HttpResponse]:
+    """
+    Answers a conditional GET from the validators alone.
+
+    :param request: The listing request.
+    :type request: HttpRequest
+    :param generation: The current article generation.
+    :type generation: int
+    :return: A ``304 Not Modified`` response if the client's copy is
+        current, otherwise None.
+    :rtype: HttpResponse or None
+    """
+    etag, last_modified = listing_validators(request, generation)
+    return get_conditional_response(request, etag=etag,
+                                    last_modified=last_modified)
+
+
+def set_validators(response: HttpResponse, request: HttpRequest,
+                   generation: int) -> HttpResponse:
+    """
+    Adds ``ETag``, ``Last-Modified`` and ``Vary: Cookie, Accept`` headers
+    to a listing response.
+
+    :param response: The response.
+    :type response: HttpResponse
+    :param request: The listing request.
+    :type request: HttpRequest
+    :param generation: The article generation the response belongs to.
+    :type generation: int
+    :return: The same response.
+    :rtype: HttpResponse
+    """
+    etag, last_modified = listing_validators(request, generation)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Cookie', 'Accept'])
+    return response
+
+
+def cache_public_listing(view_func: Callable) -> Callable:
+    """
+    View decorator that caches the rendered response for anonymous GET
+    and HEAD requests under the current article generation, and answers
+    conditional requests with ``304 Not Modified``.
+
+    Authenticated users always get a freshly rendered page, since the
+    navigation depends on their role.
+
+    :param view_func: A function view returning an ``HttpResponse``, or
+        an async one.
+    :type view_func: Callable
+    :return: The wrapped view.
+    :rtype: Callable
+    """
+    timeout = getattr(settings, 'LISTING_CACHE_TIMEOUT', 300)
+
+    def hit(request: HttpRequest, generation: int,
+            cached: tuple) -> HttpResponse:
+        content, content_type = cached
+        return set_validators(
+            HttpResponse(content, content_type=content_type),
+            request, generation)
+
+    if iscoroutinefunction(view_func):
+        # The async cache methods keep the lookups off the event loop.
+        @wraps(view_func)
+        async def async_wrapper(request: HttpRequest, *args,
+                                **kwargs) -> HttpResponse:
+            if (request.method not in ('GET', 'HEAD')
+                    or (await request.auser()).is_authenticated):
+                return await view_func(request, *args, **kwargs)
+            generation = await aget_generation()
+            not_modified = conditional_response(request, generation)
+            if not_modified is not None:
+                return not_modified
+            key = listing_cache_key(request, generation)
+            cached = await get_cache().aget(key)
+            if cached is not None:
+                return hit(request, generation, cached)
+            response = await view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            if hasattr(response, 'render'):
+                await sync_to_async(response.render)()
+            await get_cache().aset(
+                key, (response.content, response['Content-Type']), timeout)
+            return set_validators(response, request, generation)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated):
+            return view_func(request, *args, **kwargs)
+        generation = get_generation()
+        not_modified = conditional_response(request, generation)
+        if not_modified is not None:
+            return not_modified
+        key = listing_cache_key(request, generation)
+        cached = get_cache().get(key)
+        if cached is not None:
+            return hit(request, generation, cached)
+        response = view_func(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        if hasattr(response, 'render'):
+            response.render()
+        get_cache().set(
+            key, (response.content, response['Content-Type']), timeout)
+        return set_validators(response, request, generation)
+    return wrapper
@@ -0,0 +1,51 @@
+"""
+Template context processors.
+
+:func:`fragments` provides the keys of the ``{% cache %}`` fragments in
+the templates. Fragments that differ by role, such as the navigation bar,
+are keyed by ``fragment_role``. Fragments that list content, such as the
+article and publisher lists, are keyed by ``content_generation``, the
+article generation of :mod:`newsapp.cache`. Any change to that content
+starts a new generation, so the stale fragments are never read again and
+expire after ``TEMPLATE_FRAGMENT_TIMEOUT`` seconds.
+"""
+from functools import partial
+
+from django.conf import settings
+from django.http import HttpRequest
+
+from .cache import get_generation
+
+
+def fragment_role(user) -> str:
+    """
+    :param user: The user, possibly anonymous.
+    :return: The user's role, ``'anonymous'`` for visitors who are not
+        logged in, or ``'none'`` for users without a role.
+    :rtype: str
+    """
+    if not user.is_authenticated:
+        return 'anonymous'
+    return user.role or 'none'
+
+
+def fragments(request: HttpRequest) -> dict:
+    """
+    Adds the template fragment cache keys to the context.
+
+    ``fragment_role`` and ``content_generation`` are passed as
+    callables, so the user and the generation are only loaded by
+    templates that use them.
+
+    :param request: The current request.
+    :type request: HttpRequest
+    :return: ``fragment_timeout``, ``fragment_role`` and
+        ``content_generation``.
+    :rtype: dict
+    """
+    return {
+        'fragment_timeout': getattr(settings, 'TEMPLATE_FRAGMENT_TIMEOUT',
+                                    300),
+        'fragment_role': partial(fragment_role, request.user),
+        'content_generation': get_generation,
+    }
@@ -0,0 +1,288 @@
+"""
+Per-reader email digests.
+
+With ``NOTIFICATION_MODE = 'digest'``, approving an article no longer
+queues one outbox notification for all of its subscribers. It queues a
+:class:`~newsapp.models.DigestItem` for each subscribed reader instead,
+and the ``send_digests`` management command, scheduled once per digest
+period (for example daily from cron), mails every reader a single digest
+of the articles queued for them since their last one.
+
+A run reads the items queued before it started in pages ordered by
+reader, so each reader's items arrive together and become one message.
+Messages are sent in batches of ``NOTIFICATION_BATCH_SIZE`` over one
+mail connection, and each reader's
+:class:`~newsapp.models.DigestDelivery` is updated after every batch. A
+reader whose batch fails keeps their items for the next run, until
+``NOTIFICATION_MAX_ATTEMPTS`` consecutive failures drop them.
+"""
+import time
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from .models import Article, DigestDelivery, DigestItem
+from .notifications import _batches, get_batch_size
+from .recipients import iter_subscriber_ids
+
+MODE_IMMEDIATE = 'immediate'
+MODE_DIGEST = 'digest'
+
+
+def notification_mode() -> str:
+    """
+    :return: ``'digest'`` when approvals are batched into digests,
+        otherwise ``'immediate'``, from the ``NOTIFICATION_MODE``
+        setting.
+    :rtype: str
+    """
+    return getattr(settings, 'NOTIFICATION_MODE', MODE_IMMEDIATE)
+
+
+def enqueue_digest_items(article: Article) -> int:
+    """
+    Queues an approved article for the next digest of every reader
+    subscribed to its publisher or journalist. Readers who already have
+    it queued are skipped.
+
+    :param article: The approved article.
+    :type article: Article
+    :return: The number of subscribers processed.
+    :rtype: int
+    """
+    count = 0
+    reader_ids = iter_subscriber_ids(article.publisher_id,
+                                     article.journalist_id)
+    for batch in _batches(reader_ids, settings.FEED_BATCH_SIZE):
+        DigestItem.objects.bulk_create(
+            [DigestItem(reader_id=reader_id, article_id=article.pk)
+             for reader_id in batch], ignore_conflicts=True)
+        count += len(batch)
+    return count
+
+
+@dataclass
+class Digest:
+    """
+    The articles queued for one reader.
+
+    :ivar reader_id: Id of the reader.
+    :type reader_id: int
+    :ivar email: The reader's email address; may be empty.
+    :type email: str
+    :ivar articles: ``(title, publisher name)`` of each article, oldest
+        first.
+    :type articles: list[tuple]
+    :ivar last_item_id: Id of the reader's newest item in the digest.
+    :type last_item_id: int
+    """
+    reader_id: int
+    email: str
+    articles: List[Tuple[str, str]] = field(default_factory=list)
+    last_item_id: int = 0
+
+
+def iter_digests(until_id: int,
+                 page_size: Optional[int] = None) -> Iterator[Digest]:
+    """
+    Builds the digest of every reader from the items queued up to
+    ``until_id``. Items are read ordered by reader, in keyset pages of
+    ``page_size`` rows (``FEED_BATCH_SIZE`` by default), so each page is
+    one query however many articles its readers have. Items a reader's
+    :class:`~newsapp.models.DigestDelivery` has already passed are left
+    out.
+
+    :param until_id: Id of the newest item to include.
+    :type until_id: int
+    :param page_size: Items read per query.
+    :type page_size: int or None
+    :return: One digest per reader with queued items, by reader id.
+    :rtype: Iterator[Digest]
+    """
+    page_size = page_size or settings.FEED_BATCH_SIZE
+    queue = DigestItem.objects.filter(id__lte=until_id).filter(
+        Q(reader__digest_delivery__isnull=True)
+        | Q(id__gt=F('reader__digest_delivery__last_item_id'))
+    ).order_by('reader_id', 'id').values_list(
+        'reader_id', 'id', 'reader__email', 'article__title',
+        'article__publisher__name')
+    digest = None
+    position = None
+    while True:
+        page = queue
+        if position is not None:
+            reader_id, item_id = position
+            page = queue.filter(Q(reader_id__gt=reader_id)
+                                | Q(reader_id=reader_id, id__gt=item_id))
+        # Each page is read completely before any digest is yielded, so
+        # callers may write between pages.
+        rows = list(page[:page_size])
+        for reader_id, item_id, email, title, publisher in rows:
+            if digest is None or digest.reader_id != reader_id:
+                if digest is not None:
+                    yield digest
+                digest = Digest(reader_id=reader_id, email=email)
+            digest.articles.append((title, publisher))
+            digest.last_item_id = item_id
+        if len(rows) < page_size:
+            break
+        position = rows[-1][:2]
+    if digest is not None:
+        yield digest
+
+
+def digest_message(digest: Digest, connection=None) -> EmailMessage:
+    """
+    :param digest: A reader's digest.
+    :type digest: Digest
+    :param connection: Mail connection the message is sent over.
+    :return: The digest email.
+    :rtype: EmailMessage
+    """
+    count = len(digest.articles)
+    lines = [f"- {title} ({publisher})"
+             for title, publisher in digest.articles]
+    return EmailMessage(
+        subject=f"Your news digest: {count} new "
+                f"article{'s' if count != 1 else ''}",
+        body='New articles from your subscriptions:\n\n' + '\n'.join(lines),
+        from_email=getattr(settings, 'NOTIFICATION_FROM_EMAIL',
+                           'no-reply@newsportal.com'),
+        to=[digest.email],
+        connection=connection,
+    )
+
+
+@dataclass
+class DigestResult:
+    """
+    Summary of a single :func:`send_digests` run.
+
+    :ivar digests: Number of digests sent.
+    :type digests: int
+    :ivar articles: Number of articles in those digests.
+    :type articles: int
+    :ivar failed: Number of digests whose batch raised an error.
+    :type failed: int
+    :ivar batches: Number of ``send_messages`` calls made.
+    :type batches: int
+    :ivar elapsed: Wall-clock seconds spent sending.
+    :type elapsed: float
+    """
+    digests: int = 0
+    articles: int = 0
+    failed: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def digests_per_second(self) -> float:
+        """
+        :return: Delivery throughput of the run in digests per second.
+        :rtype: float
+        """
+        return self.digests / self.elapsed if self.elapsed else 0.0
+
+
+def record_batch(digests: List[Digest],
+                 error: Optional[Exception] = None) -> None:
+    """
+    Updates the delivery rows of a batch of readers, with one query to
+    read them and at most two to write them.
+
+    :param digests: The digests of the batch.
+    :type digests: list[Digest]
+    :param error: The error the batch failed with, or None if it was
+        sent. Readers without an email address were sent nothing, so
+        they never fail.
+    :type error: Exception or None
+    :return: None
+    """
+    now = timezone.now()
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    existing = {delivery.reader_id: delivery
+                for delivery in DigestDelivery.objects.filter(
+                    reader_id__in=[digest.reader_id for digest in digests])}
+    created, updated = [], []
+    for digest in digests:
+        delivery = existing.get(digest.reader_id)
+        if delivery is None:
+            delivery = DigestDelivery(reader_id=digest.reader_id)
+            created.append(delivery)
+        else:
+            updated.append(delivery)
+        if error is None or not digest.email:
+            delivery.status = DigestDelivery.STATUS_SENT
+            delivery.last_item_id = digest.last_item_id
+            delivery.attempts = 0
+            delivery.last_error = ''
+            if digest.email:
+                delivery.digests_sent += 1
+                delivery.articles_sent += len(digest.articles)
+                delivery.last_sent_at = now
+            continue
+        delivery.attempts += 1
+        delivery.last_error = str(error)
+        if delivery.attempts >= max_attempts:
+            delivery.status = DigestDelivery.STATUS_FAILED
+            delivery.last_item_id = digest.last_item_id
+        else:
+            delivery.status = DigestDelivery.STATUS_PENDING
+    DigestDelivery.objects.bulk_create(created)
+    DigestDelivery.objects.bulk_update(updated, [
+        'status', 'last_item_id', 'digests_sent', 'articles_sent',
+        'attempts', 'last_error', 'last_sent_at'])
+
+
+def send_digests(batch_size: Optional[int] = None,
+                 limit: Optional[int] = None) -> DigestResult:
+    """
+    Sends every reader a digest of the articles queued for them before
+    the run started.
+
+    Items queued while the run is in progress wait for the next one.
+    Readers without an email address get no message, but their items
+    are cleared. Once the digests are sent, the items every reader's
+    delivery has passed are deleted.
+
+    :param batch_size: Digests per ``send_messages`` call; defaults to
+        ``NOTIFICATION_BATCH_SIZE``.
+    :type batch_size: int or None
+    :param limit: Maximum number of digests to process; the remaining
+        readers keep their items for the next run.
+    :type limit: int or None
+    :return: A summary of the run, including throughput.
+    :rtype: DigestResult
+    """
+    batch_size = batch_size or get_batch_size()
+    result = DigestResult()
+    until_id = DigestItem.objects.aggregate(Max('id'))['id__max']
+    if until_id is None:
+        return result
+    started = time.perf_counter()
+    digests = islice(iter_digests(until_id), limit)
+    with get_connection() as connection:
+        for batch in _batches(digests, batch_size):
+            messages = [digest_message(digest, connection)
+                        for digest in batch if digest.email]
+            try:
+                if messages:
+                    connection.send_messages(messages)
+                    result.batches += 1
+            except Exception as e:
+                record_batch(batch, e)
+                result.failed += len(messages)
+                continue
+            record_batch(batch)
+            result.digests += len(messages)
+            result.articles += sum(len(digest.articles) for digest in batch
+                                   if digest.email)
+    DigestItem.objects.filter(id__lte=until_id).filter(
+        id__lte=F('reader__digest_delivery__last_item_id')).delete()
+    result.elapsed = time.perf_counter() - started
+    return result
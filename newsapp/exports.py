@@ -0,0 +1,192 @@
+"""
+Streaming exports of approved articles as NDJSON or CSV.
+
+Exports walk the approved articles oldest first on ``(created_at, id)``
+in keyset batches of ``EXPORT_BATCH_SIZE`` rows and serialize them one
+at a time, so neither the database driver nor the worker ever holds more
+than one batch. (``QuerySet.iterator()`` alone would not be enough:
+MySQL's driver buffers the whole result set of a query.)
+
+Every export is bounded by the newest article at the time it starts.
+That position is returned as a cursor; passing it back as ``since``
+exports only the approved articles created after it, which makes
+incremental dumps cheap. ``since`` also accepts a plain ISO 8601
+timestamp. Positions are keyed on ``created_at``, so an article created
+before a cursor but approved after it only appears in the next full
+export.
+"""
+import csv
+import json
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Article
+from .pagination import decode_cursor, encode_cursor
+
+EXPORT_FIELDS = ('id', 'title', 'content', 'approved', 'created_at',
+                 'publisher', 'journalist')
+COLUMNS = ('id', 'title', 'content', 'approved', 'created_at',
+           'publisher_id', 'journalist_id')
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+Position = Tuple[datetime, Optional[int]]
+
+_datetime_field = serializers.DateTimeField()
+
+
+def parse_since(value: str) -> Position:
+    """
+    Parses the ``since`` parameter of an export.
+
+    :param value: A cursor returned by an earlier export, or an ISO 8601
+        timestamp.
+    :type value: str
+    :return: ``(created_at, id)``; the id is None for a timestamp, which
+        selects everything created after it.
+    :rtype: tuple
+    :raises ValueError: If the value is neither.
+    """
+    try:
+        created_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return decode_cursor(value)
+    if timezone.is_naive(created_at):
+        created_at = timezone.make_aware(created_at)
+    return created_at, None
+
+
+def export_position() -> Optional[Tuple[datetime, int]]:
+    """
+    :return: ``(created_at, id)`` of the newest approved article, or None
+        if there are none.
+    :rtype: tuple or None
+    """
+    return Article.objects.filter(approved=True).order_by(
+        '-created_at', '-id').values_list('created_at', 'id').first()
+
+
+def _after(queryset: QuerySet, position: Position) -> QuerySet:
+    created_at, pk = position
+    if pk is None:
+        return queryset.filter(created_at__gt=created_at)
+    return queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+
+def _not_after(queryset: QuerySet, position: Tuple[datetime, int]
+               ) -> QuerySet:
+    created_at, pk = position
+    return queryset.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lte=pk))
+
+
+def iter_rows(since: Optional[Position] = None,
+              until: Optional[Tuple[datetime, int]] = None,
+              batch_size: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Streams approved articles oldest first, serialized like the article
+    API (datetimes in ISO 8601, foreign keys as ids).
+
+    :param since: Export only articles after this position.
+    :type since: tuple or None
+    :param until: Export only articles up to this position, inclusive.
+    :type until: tuple or None
+    :param batch_size: Rows per query; defaults to the
+        ``EXPORT_BATCH_SIZE`` setting.
+    :type batch_size: int or None
+    :return: One dict per article, with the keys ``EXPORT_FIELDS``.
+    :rtype: Iterator[dict]
+    """
+    batch_size = batch_size or getattr(settings, 'EXPORT_BATCH_SIZE', 1000)
+    articles = Article.objects.filter(approved=True).order_by(
+        'created_at', 'id')
+    if until is not None:
+        articles = _not_after(articles, until)
+    position = since
+    while True:
+        batch = articles if position is None else _after(articles, position)
+        count = 0
+        for values in batch.values_list(*COLUMNS)[:batch_size].iterator(
+                chunk_size=batch_size):
+            row = dict(zip(EXPORT_FIELDS, values))
+            position = (row['created_at'], row['id'])
+            row['created_at'] = _datetime_field.to_representation(
+                row['created_at'])
+            count += 1
+            yield row
+        if count < batch_size:
+            return
+
+
+class _Echo:
+    """
+    File-like object whose ``write`` returns what it was given, so
+    ``csv.writer`` can format rows without buffering them.
+    """
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def render_ndjson(rows: Iterable[Dict]) -> Iterator[str]:
+    """
+    :param rows: Rows from :func:`iter_rows`.
+    :return: One JSON document per line.
+    :rtype: Iterator[str]
+    """
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False,
+                         separators=(',', ':')) + '\n'
+
+
+def render_csv(rows: Iterable[Dict]) -> Iterator[str]:
+    """
+    :param rows: Rows from :func:`iter_rows`.
+    :return: A header line, then one line per row.
+    :rtype: Iterator[str]
+    """
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow([row[field] for field in EXPORT_FIELDS])
+
+
+RENDERERS = {
+    'ndjson': render_ndjson,
+    'csv': render_csv,
+}
+
+
+def export_articles(fmt: str, since: Optional[Position] = None,
+                    batch_size: Optional[int] = None
+                    ) -> Tuple[Iterator[str], Optional[str]]:
+    """
+    Starts an export.
+
+    :param fmt: ``'ndjson'`` or ``'csv'``.
+    :type fmt: str
+    :param since: Export only articles after this position, as returned
+        by :func:`parse_since`.
+    :type since: tuple or None
+    :param batch_size: Rows per query.
+    :type batch_size: int or None
+    :return: The export as an iterator of text chunks, and the cursor to
+        pass as ``since`` next time (None while there are no approved
+        articles).
+    :rtype: tuple
+    """
+    until = export_position()
+    cursor = encode_cursor(*until) if until else None
+    if until is None:
+        rows = iter([])
+    else:
+        rows = iter_rows(since, until, batch_size)
+    return RENDERERS[fmt](rows), cursor
@@ -0,0 +1,400 @@
+"""
+Precomputed per-reader article feeds (fan-out on write).
+
+When an article is approved, a :class:`~newsapp.models.FeedEntry` is
+written for every reader subscribed to its publisher or journalist.
+Subscribing backfills the new source's articles, and unsubscribing
+removes the entries no remaining subscription covers. Feeds are read
+only from their entries, so both limits on them are opt-in: with
+``FEED_BACKFILL_LIMIT`` set, subscribing backfills only that many of a
+source's newest articles, and with ``FEED_RETENTION_DAYS`` set,
+:func:`trim_expired` (the ``trim_feeds`` command) removes older entries.
+Readers do not see articles past either limit.
+
+Approvals reaching more than ``FEED_SYNC_FANOUT_LIMIT`` subscribers are
+not fanned out by the approving request: the article is flagged
+``feed_pending`` and :func:`fan_out_pending` (the ``fan_out_feeds``
+command) writes its entries later.
+
+Reading a feed page is a range scan over the reader's entries in the
+``(reader, created_at, article)`` index: :class:`ReaderFeed` finds the
+ids of the page's articles there, and only those articles are fetched.
+
+Publishers with more than ``FEED_FANOUT_LIMIT`` subscribers would make
+every approval write that many rows, so they switch to fan-out on read:
+they are flagged ``fanout_on_read``, get no entries from their publisher
+subscriptions, and :func:`reader_feed` queries their articles directly.
+"""
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Article, CustomUser, FeedEntry, Publisher
+from .recipients import iter_subscriber_ids
+
+PublisherSubscription = CustomUser.subscriptions_publishers.through
+JournalistSubscription = CustomUser.subscriptions_journalists.through
+
+
+def _chunks(values: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for value in values:
+        chunk.append(value)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _add_entries(reader_ids: Iterable[int],
+                 articles: Iterable[Tuple[int, object]]) -> None:
+    """
+    Inserts feed entries for every reader and article pair, ignoring
+    pairs that already exist.
+
+    :param reader_ids: Ids of the readers.
+    :param articles: ``(article_id, created_at)`` pairs.
+    :return: None
+    """
+    articles = list(articles)
+    for chunk in _chunks(reader_ids, settings.FEED_BATCH_SIZE):
+        FeedEntry.objects.bulk_create([
+            FeedEntry(reader_id=reader_id, article_id=article_id,
+                      created_at=created_at)
+            for reader_id in chunk
+            for article_id, created_at in articles
+        ], ignore_conflicts=True)
+
+
+def _fanned_out_publisher(article: Article) -> Tuple[Optional[int], int]:
+    """
+    Decides whether an article's publisher subscribers get feed entries.
+
+    If the publisher has more than ``FEED_FANOUT_LIMIT`` subscribers it
+    is flagged ``fanout_on_read`` (permanently), and only the
+    journalist's subscribers receive entries.
+
+    :param article: The approved article.
+    :type article: Article
+    :return: The id of the publisher to fan out to, or None, and its
+        subscriber count.
+    :rtype: tuple
+    """
+    publisher_id = article.publisher_id
+    publisher = Publisher.objects.only('fanout_on_read').get(pk=publisher_id)
+    if publisher.fanout_on_read:
+        return None, 0
+    count = PublisherSubscription.objects.filter(
+        publisher_id=publisher_id).count()
+    if count > settings.FEED_FANOUT_LIMIT:
+        Publisher.objects.filter(pk=publisher_id).update(fanout_on_read=True)
+        return None, 0
+    return publisher_id, count
+
+
+def fan_out_article(article: Article) -> None:
+    """
+    Adds an approved article to the feeds of its subscribers, or flags
+    it ``feed_pending`` for :func:`fan_out_pending` when it has more than
+    ``FEED_SYNC_FANOUT_LIMIT`` of them.
+
+    :param article: The newly approved article.
+    :type article: Article
+    :return: None
+    """
+    publisher_id, count = _fanned_out_publisher(article)
+    limit = settings.FEED_SYNC_FANOUT_LIMIT
+    if count <= limit:
+        # Readers following both sources are counted twice; the bound
+        # only has to stop large fan-outs.
+        count += JournalistSubscription.objects.filter(
+            to_customuser_id=article.journalist_id).count()
+    if count > limit:
+        Article.objects.filter(pk=article.pk).update(feed_pending=True)
+        article.feed_pending = True
+        return
+    reader_ids = iter_subscriber_ids(publisher_id, article.journalist_id)
+    _add_entries(reader_ids, [(article.pk, article.created_at)])
+
+
+def fan_out_pending() -> int:
+    """
+    Writes the feed entries of articles flagged ``feed_pending``, oldest
+    first, and clears the flag. Entries are inserted in batches of
+    ``FEED_BATCH_SIZE`` ignoring existing ones, so an interrupted run is
+    simply repeated.
+
+    :return: The number of articles fanned out.
+    :rtype: int
+    """
+    count = 0
+    pending = Article.objects.filter(feed_pending=True).only(
+        'publisher_id', 'journalist_id', 'approved', 'created_at')
+    for article in pending.order_by('id').iterator():
+        if article.approved:
+            publisher_id, _ = _fanned_out_publisher(article)
+            reader_ids = iter_subscriber_ids(publisher_id,
+                                             article.journalist_id)
+            _add_entries(reader_ids, [(article.pk, article.created_at)])
+            count += 1
+        Article.objects.filter(pk=article.pk).update(feed_pending=False)
+    return count
+
+
+def _latest(articles: QuerySet, field: str) -> QuerySet:
+    """
+    Selects the approved articles for each value of ``field``; with
+    ``FEED_BACKFILL_LIMIT`` set, only that many of the newest, in one
+    query using a ``ROW_NUMBER()`` window.
+
+    :param articles: The articles to choose from.
+    :type articles: QuerySet
+    :param field: ``'publisher_id'`` or ``'journalist_id'``.
+    :type field: str
+    :return: ``(id, created_at)`` rows.
+    :rtype: QuerySet
+    """
+    articles = articles.filter(approved=True)
+    limit = settings.FEED_BACKFILL_LIMIT
+    if limit is not None:
+        articles = articles.annotate(
+            rank=Window(RowNumber(), partition_by=F(field),
+                        order_by=[F('created_at').desc(), F('id').desc()])
+        ).filter(rank__lte=limit)
+    return articles.values_list('id', 'created_at')
+
+
+def backfill_publisher(reader_ids: Iterable[int],
+                       publisher_ids: Iterable[int]) -> None:
+    """
+    Adds the articles of newly subscribed publishers to readers' feeds.
+    Publishers served on read are skipped.
+
+    :param reader_ids: Ids of the subscribing readers.
+    :param publisher_ids: Ids of the publishers subscribed to.
+    :return: None
+    """
+    _add_entries(reader_ids, _latest(Article.objects.filter(
+        publisher_id__in=list(publisher_ids),
+        publisher__fanout_on_read=False), 'publisher_id'))
+
+
+def backfill_journalist(reader_ids: Iterable[int],
+                        journalist_ids: Iterable[int]) -> None:
+    """
+    Adds the articles of newly subscribed journalists to readers' feeds.
+
+    :param reader_ids: Ids of the subscribing readers.
+    :param journalist_ids: User ids of the journalists subscribed to.
+    :return: None
+    """
+    _add_entries(reader_ids, _latest(Article.objects.filter(
+        journalist_id__in=list(journalist_ids)), 'journalist_id'))
+
+
+def trim_publisher(reader_id: int, publisher_ids: Iterable[int]) -> None:
+    """
+    Removes a reader's feed entries for publishers they unsubscribed
+    from, keeping articles still covered by a journalist subscription.
+
+    :param reader_id: Id of the reader.
+    :type reader_id: int
+    :param publisher_ids: Ids of the publishers unsubscribed from.
+    :return: None
+    """
+    FeedEntry.objects.filter(
+        reader_id=reader_id, article__publisher_id__in=list(publisher_ids)
+    ).exclude(
+        article__journalist_id__in=JournalistSubscription.objects.filter(
+            from_customuser_id=reader_id).values('to_customuser_id')
+    ).delete()
+
+
+def trim_journalist(reader_id: int, journalist_ids: Iterable[int]) -> None:
+    """
+    Removes a reader's feed entries for journalists they unsubscribed
+    from, keeping articles still covered by a publisher subscription.
+
+    :param reader_id: Id of the reader.
+    :type reader_id: int
+    :param journalist_ids: User ids of the journalists unsubscribed from.
+    :return: None
+    """
+    FeedEntry.objects.filter(
+        reader_id=reader_id, article__journalist_id__in=list(journalist_ids)
+    ).exclude(
+        article__publisher_id__in=PublisherSubscription.objects.filter(
+            customuser_id=reader_id, publisher__fanout_on_read=False
+        ).values('publisher_id')
+    ).delete()
+
+
+def rebuild_feed(reader: CustomUser) -> None:
+    """
+    Rebuilds a reader's feed from their current subscriptions.
+
+    :param reader: The reader.
+    :type reader: CustomUser
+    :return: None
+    """
+    FeedEntry.objects.filter(reader=reader).delete()
+    backfill_publisher([reader.pk], PublisherSubscription.objects.filter(
+        customuser_id=reader.pk).values_list('publisher_id', flat=True))
+    backfill_journalist([reader.pk], JournalistSubscription.objects.filter(
+        from_customuser_id=reader.pk).values_list('to_customuser_id',
+                                                  flat=True))
+
+
+def trim_expired(days: Optional[int] = None) -> int:
+    """
+    Removes feed entries of articles older than ``days`` days. Readers
+    no longer see those articles in their feeds.
+
+    :param days: Age limit; defaults to the ``FEED_RETENTION_DAYS``
+        setting. Nothing is removed when both are None.
+    :type days: int or None
+    :return: The number of entries removed.
+    :rtype: int
+    """
+    if days is None:
+        days = settings.FEED_RETENTION_DAYS
+    if days is None:
+        return 0
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = FeedEntry.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+Position = Optional[Tuple[datetime, int]]
+
+
+class ReaderFeed:
+    """
+    Finds the articles on one keyset page of a reader's feed.
+
+    The page is read from the reader's feed entries, ordered on their
+    own ``(created_at, article_id)`` columns so the feed index serves
+    both the filter and the order. Articles of publishers served on read
+    have no entries; the same page of their articles is read from the
+    articles table and merged in.
+
+    :ivar reader_id: Id of the reader.
+    :type reader_id: int
+    :ivar on_read: Ids of the followed publishers served on read.
+    :type on_read: list[int]
+    """
+
+    def __init__(self, reader_id: int, on_read: List[int]) -> None:
+        self.reader_id = reader_id
+        self.on_read = on_read
+
+    def sources(self, position: Position, size: int) -> List[QuerySet]:
+        """
+        :param position: ``(created_at, id)`` of the last article
+            already returned, or None for the first page.
+        :param size: Number of articles wanted.
+        :type size: int
+        :return: Queries of ``(created_at, article_id)`` rows, newest
+            first, whose merge holds the page.
+        :rtype: list[QuerySet]
+        """
+        entries = FeedEntry.objects.filter(reader_id=self.reader_id,
+                                           article__approved=True)
+        if position is not None:
+            created_at, pk = position
+            entries = entries.filter(
+                Q(created_at__lt=created_at)
+                | Q(created_at=created_at, article_id__lt=pk))
+        sources = [entries.order_by('-created_at', '-article_id')
+                   .values_list('created_at', 'article_id')[:size]]
+        if self.on_read:
+            articles = Article.objects.filter(approved=True,
+                                              publisher_id__in=self.on_read)
+            if position is not None:
+                articles = articles.filter(
+                    Q(created_at__lt=created_at)
+                    | Q(created_at=created_at, id__lt=pk))
+            sources.append(articles.order_by('-created_at', '-id')
+                           .values_list('created_at', 'id')[:size])
+        return sources
+
+    @staticmethod
+    def merge(rows: Iterable[Tuple[datetime, int]], size: int) -> List[int]:
+        """
+        :param rows: ``(created_at, article_id)`` rows of all sources.
+        :param size: Number of articles wanted.
+        :type size: int
+        :return: The ids of the newest ``size`` distinct articles.
+        :rtype: list[int]
+        """
+        return [pk for _, pk in sorted(set(rows), reverse=True)[:size]]
+
+    def page_ids(self, position: Position, size: int) -> List[int]:
+        """
+        :param position: ``(created_at, id)`` of the last article
+            already returned, or None for the first page.
+        :param size: Number of articles wanted.
+        :type size: int
+        :return: Ids of the articles on the page, newest first.
+        :rtype: list[int]
+        """
+        return self.merge([row for source in self.sources(position, size)
+                           for row in source], size)
+
+    async def apage_ids(self, position: Position, size: int) -> List[int]:
+        """
+        Async version of :meth:`page_ids`.
+        """
+        return self.merge([row for source in self.sources(position, size)
+                           async for row in source], size)
+
+
+class FeedQuerySet(QuerySet):
+    """
+    Article queryset of a reader's feed. It carries the
+    :class:`ReaderFeed` through ``filter()`` and ``values()``, so that
+    :class:`~newsapp.pagination.KeysetPagination` can page through the
+    feed index instead of sorting the articles.
+
+    :ivar feed: The feed the articles belong to.
+    :type feed: ReaderFeed or None
+    """
+    feed = None
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.feed = self.feed
+        return clone
+
+
+def reader_feed(reader: CustomUser) -> QuerySet:
+    """
+    Returns the approved articles in a reader's feed.
+
+    When the reader follows no publisher served on read, this is a join
+    from the reader's feed entries; otherwise those publishers' articles
+    are added with an ``IN`` subquery. Keyset pages of it are read
+    through its :class:`ReaderFeed` (see :class:`FeedQuerySet`).
+
+    :param reader: The reader.
+    :type reader: CustomUser
+    :return: The reader's articles, unordered.
+    :rtype: FeedQuerySet
+    """
+    on_read = list(PublisherSubscription.objects.filter(
+        customuser_id=reader.pk, publisher__fanout_on_read=True
+    ).values_list('publisher_id', flat=True))
+    articles = FeedQuerySet(Article)
+    articles.feed = ReaderFeed(reader.pk, on_read)
+    articles = articles.filter(approved=True)
+    if not on_read:
+        return articles.filter(feed_entries__reader=reader)
+    return articles.filter(
+        Q(id__in=FeedEntry.objects.filter(reader=reader).values('article_id'))
+        | Q(publisher_id__in=on_read)
+    )
@@ -0,0 +1,473 @@
+"""
+Streaming bulk import of publishers, users and articles.
+
+Records are read one at a time from JSON Lines or CSV input and written
+in ``bulk_create`` batches, so memory use depends on the batch size, not
+on the size of the input. Invalid records, including lines that are not
+JSON, are counted, logged and skipped. Each record has a ``type`` of ``publisher``,
+``user`` or ``article`` (or the whole input has one, see
+:class:`Importer`). A batch is flushed whenever the type changes, so
+records may refer to publishers and users defined earlier in the same
+file.
+
+Record fields:
+
+* ``publisher``: ``name``.
+* ``user``: ``username``, ``role``, and optionally ``email``,
+  ``first_name``, ``last_name``, ``bio`` and ``password`` (an already
+  hashed Django password; users without one cannot log in until they
+  reset it).
+* ``article``: ``title``, ``content``, ``publisher`` (name),
+  ``journalist`` (username), and optionally ``approved`` and
+  ``created_at`` (ISO 8601).
+
+Publishers and users that already exist (by name / username) are
+skipped. Foreign keys are resolved through :class:`NameCache`, which
+looks up all unknown names of a batch with one query.
+
+``bulk_create`` sends no model signals, so their side effects are
+applied in bulk instead: role groups and journalist profiles per batch,
+search indexing per batch, and feed backfill plus listing-cache
+invalidation once at the end. Archive articles deliberately do not
+queue subscriber notifications or X posts.
+"""
+import csv
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, \
+    Set, TextIO, Tuple, Type, Union
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, models, transaction
+from django.utils.dateparse import parse_datetime
+
+from . import feeds, search
+from .cache import bump_generation
+from .models import Article, CustomUser, Journalist, Publisher
+from .recipients import iter_subscriber_ids
+from .roles import role_group
+
+RECORD_TYPES = ('publisher', 'user', 'article')
+ROLES = {role for role, _ in CustomUser.ROLE_CHOICES}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+Record = Tuple[int, Union[dict, 'RecordError']]
+
+
+class RecordError(ValueError):
+    """
+    Raised for a record that cannot be imported. Invalid records are
+    counted and logged; the rest of the import goes on.
+    """
+
+
+@dataclass
+class ImportResult:
+    """
+    Summary of an import.
+
+    :ivar rows: Records read.
+    :type rows: int
+    :ivar created: Rows inserted.
+    :type created: int
+    :ivar skipped: Records whose publisher or user already existed.
+    :type skipped: int
+    :ivar errors: Records rejected as invalid.
+    :type errors: int
+    :ivar elapsed: Wall-clock seconds.
+    :type elapsed: float
+    """
+    rows: int = 0
+    created: int = 0
+    skipped: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """
+        :return: Records processed per second.
+        :rtype: float
+        """
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Record]:
+    """
+    Streams records from JSON Lines or CSV input.
+
+    :param stream: The open input.
+    :type stream: TextIO
+    :param fmt: ``'jsonl'`` or ``'csv'``.
+    :type fmt: str
+    :return: ``(line_number, record)`` pairs; blank lines are skipped.
+        A line that is not a JSON object gives a :class:`RecordError`
+        instead of a record, so the importer can count it and go on.
+    :rtype: Iterator[tuple]
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, RecordError(f"invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield number, RecordError("expected a JSON object")
+            continue
+        yield number, record
+
+
+class NameCache:
+    """
+    Maps natural keys (publisher names, usernames) to primary keys.
+
+    Unknown names are looked up together, one query per batch, and the
+    results are cached. The cache holds at most ``max_size`` entries,
+    evicting the least recently used, so it cannot grow with the input.
+
+    :ivar model: The model looked up.
+    :type model: type
+    :ivar field: The natural key field.
+    :type field: str
+    """
+
+    def __init__(self, model: Type[models.Model], field: str,
+                 max_size: int = 100000):
+        self.model = model
+        self.field = field
+        self.max_size = max_size
+        self._ids: 'OrderedDict[str, int]' = OrderedDict()
+
+    def resolve(self, names: Iterable[str]) -> Dict[str, int]:
+        """
+        :param names: The names to resolve.
+        :return: Ids of the names that exist; missing names are left out
+            and not cached.
+        :rtype: dict
+        """
+        names = set(names)
+        found = {}
+        for name in names:
+            if name in self._ids:
+                self._ids.move_to_end(name)
+                found[name] = self._ids[name]
+        missing = names - set(found)
+        if missing:
+            for name, pk in self.model.objects.filter(
+                    **{f'{self.field}__in': missing}
+            ).values_list(self.field, 'id'):
+                found.setdefault(name, pk)
+                self.add(name, pk)
+        return found
+
+    def add(self, name: str, pk: int) -> None:
+        """
+        Caches one name.
+
+        :param name: The natural key.
+        :type name: str
+        :param pk: Its primary key.
+        :type pk: int
+        :return: None
+        """
+        self._ids[name] = pk
+        self._ids.move_to_end(name)
+        while len(self._ids) > self.max_size:
+            self._ids.popitem(last=False)
+
+
+def _required(record: dict, *names: str) -> List[str]:
+    values = []
+    for name in names:
+        value = str(record.get(name) or '').strip()
+        if not value:
+            raise RecordError(f"missing '{name}'")
+        values.append(value)
+    return values
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value or '').strip().lower() in TRUE_VALUES
+
+
+class Importer:
+    """
+    Imports records in batches; see the module documentation.
+
+    :ivar batch_size: Records per ``bulk_create`` batch.
+    :type batch_size: int
+    :ivar default_type: Record type used when a record has no ``type``.
+    :type default_type: str or None
+    :ivar result: Running totals.
+    :type result: ImportResult
+    """
+
+    def __init__(self, batch_size: int = 1000,
+                 default_type: Optional[str] = None,
+                 log: Optional[Callable[[str], None]] = None):
+        self.batch_size = batch_size
+        self.default_type = default_type
+        self.log = log or (lambda message: None)
+        self.result = ImportResult()
+        self.publishers = NameCache(Publisher, 'name')
+        self.users = NameCache(CustomUser, 'username')
+        self.touched_publishers: Set[int] = set()
+        self.touched_journalists: Set[int] = set()
+        # Whether a publisher or an approved article was written, so the
+        # cached public listings are out of date.
+        self.listings_changed = False
+
+    def run(self, records: Iterable[Record],
+            progress: Optional[Callable[[ImportResult], None]] = None
+            ) -> ImportResult:
+        """
+        Imports all records, then applies the deferred side effects.
+
+        If reading the records fails part way, the records already read
+        are still written and the side effects still applied before the
+        error propagates.
+
+        :param records: ``(line_number, record)`` pairs, as produced by
+            :func:`read_records`.
+        :param progress: Called with the running totals after each
+            batch.
+        :return: The totals.
+        :rtype: ImportResult
+        """
+        started = time.perf_counter()
+        batch: List[Record] = []
+        batch_type = None
+        try:
+            for number, record in records:
+                self.result.rows += 1
+                if isinstance(record, RecordError):
+                    self.reject(number, str(record))
+                    continue
+                record_type = record.get('type') or self.default_type
+                if record_type not in RECORD_TYPES:
+                    self.reject(number,
+                                f"unknown record type {record_type!r}")
+                    continue
+                if batch and (record_type != batch_type
+                              or len(batch) >= self.batch_size):
+                    full, batch = batch, []
+                    self.flush(batch_type, full)
+                    self.result.elapsed = time.perf_counter() - started
+                    if progress:
+                        progress(self.result)
+                batch_type = record_type
+                batch.append((number, record))
+        finally:
+            try:
+                if batch:
+                    self.flush(batch_type, batch)
+            finally:
+                self.finish()
+        self.result.elapsed = time.perf_counter() - started
+        return self.result
+
+    def reject(self, number: int, message: str) -> None:
+        """
+        Counts and logs an invalid record.
+
+        :param number: Line number of the record.
+        :type number: int
+        :param message: What is wrong with it.
+        :type message: str
+        :return: None
+        """
+        self.result.errors += 1
+        self.log(f"line {number}: {message}")
+
+    def flush(self, record_type: str, batch: List[Record]) -> None:
+        """
+        Writes one batch of records of the same type in a transaction.
+
+        :param record_type: The records' type.
+        :type record_type: str
+        :param batch: The records.
+        :type batch: list
+        :return: None
+        """
+        with transaction.atomic():
+            getattr(self, f'import_{record_type}s')(batch)
+
+    def _valid(self, batch: List[Record],
+               parse: Callable[[dict], object]) -> List[Tuple[int, object]]:
+        rows = []
+        for number, record in batch:
+            try:
+                rows.append((number, parse(record)))
+            except RecordError as e:
+                self.reject(number, str(e))
+        return rows
+
+    def import_publishers(self, batch: List[Record]) -> None:
+        """
+        Inserts the new publishers of a batch.
+
+        :param batch: ``publisher`` records.
+        :type batch: list
+        :return: None
+        """
+        rows = self._valid(batch, lambda record: _required(record, 'name')[0])
+        existing = self.publishers.resolve(name for _, name in rows)
+        new = list(dict.fromkeys(
+            name for _, name in rows if name not in existing))
+        self.result.skipped += len(rows) - len(new)
+        Publisher.objects.bulk_create([Publisher(name=name) for name in new])
+        self.publishers.resolve(new)
+        self.result.created += len(new)
+        if new:
+            self.listings_changed = True
+
+    def parse_user(self, record: dict) -> CustomUser:
+        """
+        Builds an unsaved user from a ``user`` record.
+
+        :param record: The record.
+        :type record: dict
+        :return: The user.
+        :rtype: CustomUser
+        :raises RecordError: If the record is invalid.
+        """
+        username, role = _required(record, 'username', 'role')
+        if role not in ROLES:
+            raise RecordError(f"unknown role {role!r}")
+        return CustomUser(
+            username=username, role=role,
+            email=record.get('email') or '',
+            first_name=record.get('first_name') or '',
+            last_name=record.get('last_name') or '',
+            bio=record.get('bio') or '',
+            published_newsletters=None if role == 'reader' else '',
+            password=record.get('password') or make_password(None))
+
+    def import_users(self, batch: List[Record]) -> None:
+        """
+        Inserts the new users of a batch, adds them to their role groups
+        and creates profiles for journalists, as ``CustomUser.save`` and
+        the ``post_save`` receivers would.
+
+        :param batch: ``user`` records.
+        :type batch: list
+        :return: None
+        """
+        rows = self._valid(batch, self.parse_user)
+        existing = self.users.resolve(user.username for _, user in rows)
+        users = list({user.username: user for _, user in rows
+                      if user.username not in existing}.values())
+        self.result.skipped += len(rows) - len(users)
+        if not users:
+            return
+        CustomUser.objects.bulk_create(users)
+        ids = self.users.resolve(user.username for user in users)
+        Groups = CustomUser.groups.through
+        Groups.objects.bulk_create([
+            Groups(customuser_id=ids[user.username],
+                   group_id=role_group(user.role).pk)
+            for user in users
+        ])
+        Journalist.objects.bulk_create([
+            Journalist(user_id=ids[user.username], name=user.username)
+            for user in users if user.role == 'journalist'
+        ])
+        self.result.created += len(users)
+
+    def import_articles(self, batch: List[Record]) -> None:
+        """
+        Inserts the articles of a batch and indexes the approved ones for
+        search.
+
+        ``bulk_create`` stamps every row with the current time, like
+        ``auto_now_add`` does on save, so the archive ``created_at``
+        values are written afterwards with one ``bulk_update``.
+
+        :param batch: ``article`` records.
+        :type batch: list
+        :return: None
+        """
+        publishers = self.publishers.resolve(
+            record.get('publisher') for _, record in batch)
+        journalists = self.users.resolve(
+            record.get('journalist') for _, record in batch)
+
+        def parse(record: dict) -> Article:
+            title, content, publisher, journalist = _required(
+                record, 'title', 'content', 'publisher', 'journalist')
+            if publisher not in publishers:
+                raise RecordError(f"unknown publisher {publisher!r}")
+            if journalist not in journalists:
+                raise RecordError(f"unknown journalist {journalist!r}")
+            created_at = None
+            if record.get('created_at'):
+                created_at = parse_datetime(record['created_at'])
+                if created_at is None:
+                    raise RecordError(
+                        f"invalid created_at {record['created_at']!r}")
+            return Article(
+                title=title, content=content,
+                publisher_id=publishers[publisher],
+                journalist_id=journalists[journalist],
+                approved=_bool(record.get('approved')),
+                created_at=created_at)
+
+        articles = [article for _, article in self._valid(batch, parse)]
+        if not articles:
+            return
+        created_at = [article.created_at for article in articles]
+        returns_ids = connection.features.can_return_rows_from_bulk_insert
+        if not returns_ids:
+            last_id = Article.objects.order_by('-id').values_list(
+                'id', flat=True).first() or 0
+        articles = Article.objects.bulk_create(articles)
+        if not returns_ids:
+            # MySQL does not return ids from bulk_create; the batch's ids
+            # are read back, in insert order, inside the same transaction.
+            for article, pk in zip(articles, Article.objects.filter(
+                    pk__gt=last_id).order_by('pk').values_list(
+                    'pk', flat=True)):
+                article.pk = pk
+        archived = []
+        for article, value in zip(articles, created_at):
+            if value is not None:
+                article.created_at = value
+                archived.append(article)
+        Article.objects.bulk_update(archived, ['created_at'],
+                                    batch_size=self.batch_size)
+        self.result.created += len(articles)
+        approved = [article for article in articles if article.approved]
+        if not approved:
+            return
+        self.listings_changed = True
+        self.touched_publishers.update(a.publisher_id for a in approved)
+        self.touched_journalists.update(a.journalist_id for a in approved)
+        search.index_documents(approved)
+
+    def finish(self) -> None:
+        """
+        Applies the side effects deferred to the end of the import: adds
+        the imported articles to subscribers' feeds and invalidates the
+        cached public listings.
+
+        :return: None
+        """
+        for publisher_id in self.touched_publishers:
+            feeds.backfill_publisher(
+                iter_subscriber_ids(publisher_id, None), [publisher_id])
+        for journalist_id in self.touched_journalists:
+            feeds.backfill_journalist(
+                iter_subscriber_ids(None, journalist_id), [journalist_id])
+        if self.listings_changed:
+            bump_generation()
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that runs the performance
+    benchmarks defined in ``newsapp.benchmarks``.
+
+    Each benchmark is a sub-command with its own options. Benchmarks run
+    against a throwaway test database, so they are safe to run against a
+    configured production-like database server.
+
+    Usage:
+    ``python manage.py benchmark <scenario> [options]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Run a performance benchmark scenario'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='scenario', required=True)
+        for name, scenario in SCENARIOS.items():
+            subparser = subparsers.add_parser(name, help=scenario.help)
+            scenario.add_arguments(subparser)
+
+    def handle(self, *args, **options):
+        SCENARIOS[options['scenario']].run(options, self.stdout.write)
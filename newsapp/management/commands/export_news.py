@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsapp.exports import RENDERERS, export_articles, parse_since
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that exports every approved
+    article as NDJSON or CSV, oldest first.
+
+    Articles are read in keyset batches and written as they are
+    serialized, so memory use stays flat however many articles there
+    are. When the export finishes, the cursor of the last article is
+    printed to standard error; passing it back with ``--since`` exports
+    only newer articles.
+
+    Usage:
+    ``python manage.py export_news [--format ndjson|csv] [--since CURSOR]
+    [--output FILE]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Export approved articles as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', choices=sorted(RENDERERS), default='ndjson',
+            help='Output format (default: ndjson).')
+        parser.add_argument(
+            '--since', default=None,
+            help='Cursor from an earlier export, or an ISO 8601 '
+                 'timestamp; only newer articles are exported.')
+        parser.add_argument(
+            '--output', default=None,
+            help='File to write (default: standard output).')
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Rows per query (default: EXPORT_BATCH_SIZE).')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            try:
+                since = parse_since(options['since'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        chunks, cursor = export_articles(options['format'], since,
+                                         options['batch_size'])
+        if options['output']:
+            with open(options['output'], 'w', newline='',
+                      encoding='utf-8') as stream:
+                stream.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+        if cursor:
+            self.stderr.write(f'Next cursor: {cursor}')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.feeds import fan_out_pending
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that adds the articles whose
+    approval reached more than ``FEED_SYNC_FANOUT_LIMIT`` subscribers to
+    those subscribers' feeds. Until it runs, the articles are missing
+    from the feeds, so run it frequently, for example every minute from
+    cron.
+
+    Usage:
+    ``python manage.py fan_out_feeds``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Add articles flagged feed_pending to their subscribers\' feeds'
+
+    def handle(self, *args, **options):
+        count = fan_out_pending()
+        self.stdout.write(
+            self.style.SUCCESS(f'Fanned out {count} articles.'))
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from newsapp.social import apublish_pending, publish_pending
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that posts queued articles to X
+    (formerly Twitter).
+
+    Queued rows are posted through a single pooled HTTP session with
+    bounded timeouts. Rows that hit a rate limit or a transient error are
+    rescheduled rather than retried in a tight loop. By default the
+    command processes the queue once and exits; with ``--loop`` it keeps
+    polling and acts as a long-running worker. With ``--concurrency N``
+    up to N posts are in flight at once.
+
+    Usage:
+    ``python manage.py publish_to_x [--limit N] [--loop] [--concurrency N]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Post approved articles queued for X'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of posts to process per pass.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the queue instead of exiting when empty.')
+        parser.add_argument(
+            '--interval', type=float, default=15.0,
+            help='Seconds to sleep between polls in --loop mode.')
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Posts in flight at once (default: 1, one at a time).')
+
+    def handle(self, *args, **options):
+        while True:
+            if options['concurrency'] > 1:
+                result = asyncio.run(apublish_pending(
+                    limit=options['limit'],
+                    concurrency=options['concurrency']))
+            else:
+                result = publish_pending(limit=options['limit'])
+            if result.posted or result.failed:
+                self.stdout.write(
+                    f"Posted {result.posted} articles to X, "
+                    f"{result.failed} failed.")
+            if result.rate_limited:
+                self.stdout.write(self.style.WARNING(
+                    'Rate limited by X; remaining posts rescheduled.'))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.feeds import rebuild_feed
+from newsapp.models import CustomUser
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that rebuilds the precomputed
+    article feeds of readers from their current subscriptions.
+
+    Feeds are maintained incrementally as articles are approved and
+    readers subscribe, so this is only needed after loading data that
+    bypassed those paths, such as the first deployment of feeds or a raw
+    SQL import.
+
+    Usage:
+    ``python manage.py rebuild_feeds [--reader USERNAME ...]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Rebuild reader article feeds from their subscriptions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reader', action='append', dest='readers', default=[],
+            help='Only rebuild the feed of this reader (repeatable).')
+
+    def handle(self, *args, **options):
+        readers = CustomUser.objects.filter(role='reader').only('id')
+        if options['readers']:
+            readers = readers.filter(username__in=options['readers'])
+        count = 0
+        for reader in readers.iterator():
+            rebuild_feed(reader)
+            count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {count} reader feeds.'))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that rebuilds the full-text
+    search index from the approved articles and newsletters.
+
+    The index is maintained incrementally as content is saved, so this is
+    only needed after loading data that bypassed model signals, such as
+    the first deployment of search or a raw SQL import.
+
+    Usage:
+    ``python manage.py rebuild_search_index``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Rebuild the full-text search index'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {count} documents.'))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.digests import send_digests
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that mails every reader one
+    digest of the articles approved for their subscriptions since their
+    last digest.
+
+    Articles are only queued for digests while ``NOTIFICATION_MODE`` is
+    ``'digest'``. Schedule the command once per digest period, for
+    example daily from cron; digests are sent in fixed-size batches over
+    one reused mail connection, and each reader's delivery state is kept
+    in :class:`~newsapp.models.DigestDelivery`.
+
+    Usage:
+    ``python manage.py send_digests [--batch-size N] [--limit N]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Mail each reader a digest of newly approved articles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Digests per send_messages() call '
+                 '(default: NOTIFICATION_BATCH_SIZE).')
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of digests to send.')
+
+    def handle(self, *args, **options):
+        result = send_digests(batch_size=options['batch_size'],
+                              limit=options['limit'])
+        self.stdout.write(
+            f"Sent {result.digests} digests ({result.articles} articles) "
+            f"in {result.batches} batches, {result.failed} failed, "
+            f"{result.elapsed:.2f}s "
+            f"({result.digests_per_second:.1f} digests/s)")
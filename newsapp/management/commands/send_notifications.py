@@ -0,0 +1,89 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from newsapp.notifications import KINDS, delivery_stats, drain_outbox
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that delivers queued subscriber
+    notifications from the notification outbox.
+
+    Each pending outbox row (an article notification or an approved
+    newsletter) is sent to its recipients in fixed-size batches over one
+    reused mail connection, or with ``--concurrency N`` over N
+    connections at once. By default the command drains the outbox once
+    and exits, which suits a cron job; with ``--loop`` it keeps polling
+    and acts as a long-running worker.
+
+    Usage:
+    ``python manage.py send_notifications [--batch-size N] [--concurrency N]
+    [--loop]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Deliver queued subscriber notifications in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Recipients per send_messages() call '
+                 '(default: NOTIFICATION_BATCH_SIZE).')
+        parser.add_argument(
+            '--concurrency', type=int, default=None,
+            help='Batches sent at once over separate connections '
+                 '(default: NOTIFICATION_CONCURRENCY).')
+        parser.add_argument(
+            '--limit', type=int, default=None,
+            help='Maximum number of outbox rows to process per pass.')
+        parser.add_argument(
+            '--stale-after', type=int, default=600,
+            help='Seconds after which an in-progress row is reclaimed.')
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Keep polling the outbox instead of exiting when empty.')
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Seconds to sleep between polls in --loop mode.')
+        parser.add_argument(
+            '--stats', action='store_true',
+            help='Print end-to-end delivery statistics and exit.')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.print_stats()
+            return
+        while True:
+            result = drain_outbox(batch_size=options['batch_size'],
+                                  limit=options['limit'],
+                                  stale_after=options['stale_after'],
+                                  concurrency=options['concurrency'])
+            if result.notifications or result.failed:
+                self.stdout.write(
+                    f"Delivered {result.emails} emails for "
+                    f"{result.notifications} notifications in "
+                    f"{result.batches} batches, {result.failed} failed, "
+                    f"{result.elapsed:.2f}s "
+                    f"({result.emails_per_second:.1f} emails/s)")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def print_stats(self):
+        for kind in KINDS:
+            stats = delivery_stats(kind)
+            counts = ', '.join(f"{status}={n}"
+                               for status, n in stats['counts'].items())
+            self.stdout.write(f"{kind.capitalize()} outbox: {counts}")
+            self.stdout.write(f"Emails delivered: {stats['emails']}")
+            if stats['avg_latency'] is not None:
+                self.stdout.write(
+                    f"Average queue-to-delivered latency: "
+                    f"{stats['avg_latency']:.2f}s "
+                    f"(sending {stats['avg_send_time']:.2f}s)")
+            if stats['emails_per_second'] is not None:
+                self.stdout.write(
+                    f"Throughput: {stats['emails_per_second']:.1f} emails/s")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from newsapp.feeds import trim_expired
+
+
+class Command(BaseCommand):
+    """
+    Provides a custom management command that removes reader feed
+    entries of old articles, so the feed table does not grow without
+    bound. Run it periodically, for example daily from cron. It removes
+    nothing unless ``FEED_RETENTION_DAYS`` or ``--days`` is set; readers
+    no longer see the removed articles in their feeds.
+
+    Usage:
+    ``python manage.py trim_feeds [--days DAYS]``
+
+    :ivar help: Message displayed with the `help` command that
+        describes the purpose of this management command.
+    :type help: str
+    """
+    help = 'Remove reader feed entries older than FEED_RETENTION_DAYS'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Age limit in days (default: FEED_RETENTION_DAYS).')
+
+    def handle(self, *args, **options):
+        count = trim_expired(options['days'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Removed {count} feed entries.'))
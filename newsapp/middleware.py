@@ -0,0 +1,49 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.deprecation import MiddlewareMixin
+
+from .routers import pin_to_primary
+
+
+class AsyncURLConfMiddleware:
+    """
+    Routes requests served through ASGI to the ``ASYNC_URLCONF`` URLconf
+    (:mod:`newsapp.async_urls`), so the same settings serve the async
+    views under an ASGI server and the synchronous ones under a WSGI
+    server.
+
+    The middleware is native async: it is only installed in an async
+    middleware chain, where it costs no thread switch, and drops itself
+    from synchronous chains, and when ``ASYNC_URLCONF`` is None.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.urlconf = getattr(settings, 'ASYNC_URLCONF', None)
+        if not self.urlconf or not iscoroutinefunction(get_response):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        markcoroutinefunction(self)
+
+    async def __call__(self, request):
+        request.urlconf = self.urlconf
+        return await self.get_response(request)
+
+
+class ReplicaPinMiddleware(MiddlewareMixin):
+    """
+    Pins a logged-in user's reads to the primary database after each of
+    their successful non-GET requests (see :mod:`newsapp.routers`), so
+    the pages they load next show their own changes. It must come after
+    the session and authentication middleware.
+    """
+
+    def process_response(self, request, response):
+        user = getattr(request, 'user', None)
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS')
+                and response.status_code < 400
+                and user is not None and user.is_authenticated):
+            pin_to_primary(request)
+        return response
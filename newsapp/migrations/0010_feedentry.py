@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0009_create_role_groups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='publisher',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='newsapp.article')),
+                ('reader', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['reader', '-created_at', '-article'], name='feedentry_reader_created_idx')],
+                'constraints': [models.UniqueConstraint(fields=('reader', 'article'), name='feedentry_reader_article_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-17 06:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='journalist',
+            index=models.Index(fields=['name', 'id'], name='journalist_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publisher',
+            index=models.Index(fields=['name', 'id'], name='publisher_name_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.3 on 2026-10-17 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0014_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='batches_sent',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='newsletter',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='newsapp.newsletter'),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='recipients_total',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='article',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='newsapp.article'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationoutbox',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('article__isnull', False), ('newsletter__isnull', True)), models.Q(('article__isnull', True), ('newsletter__isnull', False)), _connector='OR'), name='outbox_article_xor_newsletter'),
+        ),
+    ]
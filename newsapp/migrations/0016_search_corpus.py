@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:00
+
+import newsapp.models
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def count_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('newsapp', 'SearchDocument')
+    SearchCorpus = apps.get_model('newsapp', 'SearchCorpus')
+    for row in SearchDocument.objects.values('kind').annotate(
+            documents=Count('id'), total_length=Sum('length')):
+        SearchCorpus.objects.create(**row)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0015_newsletter_dispatch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchCorpus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('article', 'Article'), ('newsletter', 'Newsletter')], max_length=10, unique=True)),
+                ('documents', models.PositiveIntegerField(default=0)),
+                ('total_length', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'search corpora',
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='searchdocument',
+            name='searchdocument_kind_len_idx',
+        ),
+        migrations.AlterField(
+            model_name='searchposting',
+            name='term',
+            field=newsapp.models.BinaryCharField(max_length=64),
+        ),
+        migrations.RunPython(count_documents, migrations.RunPython.noop),
+    ]
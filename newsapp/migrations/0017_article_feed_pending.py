@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0016_search_corpus'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='feed_pending',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 08:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('newsapp', '0017_article_feed_pending'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='article',
+            name='journalist',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='journalist_articles', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='article',
+            name='publisher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='articles', to='newsapp.publisher'),
+        ),
+    ]
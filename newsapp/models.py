@@ -1,8 +1,12 @@
-from typing import Any
+from typing import Any, Optional
 
 from django.db import models
 from django.conf import settings
-from django.contrib.auth.models import AbstractUser, Group
+from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from .roles import role_group
+from .tracking import ApprovalTrackingMixin, TrackedFieldsMixin
 
 
 class Publisher(models.Model):
@@ -22,6 +26,10 @@ class Publisher(models.Model):
     :type editors: models.ManyToManyField
     :ivar journalists: A many-to-many relationship to `Journalist`.
     :type journalists: models.ManyToManyField
+    :ivar fanout_on_read: Set once the publisher has more subscribers than
+        ``FEED_FANOUT_LIMIT``. Its articles are then no longer copied
+        into every subscriber's feed; readers' feeds query them directly.
+    :type fanout_on_read: models.BooleanField
     """
     name = models.CharField(max_length=100)
     editors = models.ManyToManyField(
@@ -30,6 +38,13 @@ class Publisher(models.Model):
         related_name='editor_publishers',
         blank=True
     )
+    fanout_on_read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Directory listing ordered and filtered by name prefix.
+            models.Index(fields=['name', 'id'], name='publisher_name_idx'),
+        ]
 
     def __str__(self) -> str:
 
@@ -45,7 +60,7 @@ class Publisher(models.Model):
         return self.name
 
 
-class CustomUser(AbstractUser):
+class CustomUser(TrackedFieldsMixin, AbstractUser):
     """
     Represents a customized user model with additional fields
     and functionality extending the AbstractUser class.
@@ -96,24 +111,22 @@ class CustomUser(AbstractUser):
     published_newsletters = models.TextField(blank=True, null=True)
     bio = models.TextField(blank=True)
 
+    tracked_fields = ('role',)
+
     def save(self, *args: Any, **kwargs: Any) -> None:
 
         """
             Saves the current instance and performs additional operations
             based on the role attribute of the instance.
 
-            When the role is 'journalist', it clears all the user's
-            subscriptions to publishers and journalists.
-
             When the role is 'reader', it sets the user's published
             newsletters to None.
 
-            Regardless of the role, the method ensures that the instance is
-            associated with the corresponding group.
-            If the group corresponding to the role of the instance does
-            not exist, it creates the group. The association between the
-            instance and the group is updated accordingly by first
-            clearing the current associations and then adding the new group.
+            When the saved role differs from the stored one (including
+            on creation), :meth:`sync_role` brings the user's group and
+            subscriptions in line with it. Saves that leave the role
+            unchanged, such as the ``last_login`` update on login, cost a
+            single UPDATE.
 
             :param args: Positional arguments passed to the parent
                 class's save method.
@@ -121,17 +134,46 @@ class CustomUser(AbstractUser):
                 save method.
             :return: None
             """
-        super().save(*args, **kwargs)
-        if self.role == 'journalist':
-            self.subscriptions_publishers.clear()
-            self.subscriptions_journalists.clear()
-        elif self.role == 'reader':
+        if self.role == 'reader':
             self.published_newsletters = None
-        if self.role:
-            group_name = self.role.capitalize()
-            group, created = Group.objects.get_or_create(name=group_name)
+        super().save(*args, **kwargs)
+
+    def tracked_fields_saved(self, changes: dict, created: bool) -> None:
+        """
+        Runs :meth:`sync_role` after a save that changed the role.
+
+        :param changes: Mapping of changed field name to ``(old, new)``.
+        :type changes: dict
+        :param created: Whether the save inserted a new row.
+        :type created: bool
+        :return: None
+        """
+        super().tracked_fields_saved(changes, created)
+        if 'role' in changes:
+            self.sync_role(created)
+
+    def sync_role(self, created: bool = False) -> None:
+        """
+            Associates the user with the group corresponding to their
+            role, replacing any previous group, and clears the
+            subscriptions of users who become journalists.
+
+            Role groups are cached per process (see
+            :func:`newsapp.roles.role_group`), and a freshly created user
+            has no groups or subscriptions to clear, so creating a user
+            costs one extra query.
+
+            :param created: Whether the user was just created.
+            :type created: bool
+            :return: None
+            """
+        if not created:
+            if self.role == 'journalist':
+                self.subscriptions_publishers.clear()
+                self.subscriptions_journalists.clear()
             self.groups.clear()
-            self.groups.add(group)
+        if self.role:
+            self.groups.add(role_group(self.role))
 
 
 class Journalist(models.Model):
@@ -158,6 +200,12 @@ class Journalist(models.Model):
     publishers = models.ManyToManyField(Publisher, related_name='journalists', blank=True)
     bio = models.TextField(blank=True)
 
+    class Meta:
+        indexes = [
+            # Directory listing ordered and filtered by name prefix.
+            models.Index(fields=['name', 'id'], name='journalist_name_idx'),
+        ]
+
     def __str__(self):
         """
         Represents the string representation of an object. The
@@ -174,7 +222,7 @@ class Journalist(models.Model):
         return self.name
 
 
-class Article(models.Model):
+class Article(ApprovalTrackingMixin, models.Model):
     """
     Represents an Article in a publishing system.
 
@@ -183,6 +231,11 @@ class Article(models.Model):
     title, content, publisher, the journalist who created it, its approval
     status, and the timestamp it was created. Articles are linked to
     a publisher and journalist through foreign key relationships.
+    Saving an article that becomes approved sends the
+    :data:`newsapp.tracking.approving` signal once, inside the saving
+    transaction, and :data:`newsapp.tracking.approved` after commit.
+    ``title`` and ``content`` are tracked too, so the search index is
+    only updated when they change.
 
     :ivar title: The title of the article.
     :type title: models.CharField
@@ -198,21 +251,58 @@ class Article(models.Model):
     :ivar created_at: The timestamp when the article was created,
         automatically set.
     :type created_at: models.DateTimeField
+    :ivar feed_pending: Set when the article was approved with more than
+        ``FEED_SYNC_FANOUT_LIMIT`` subscribers, until the
+        ``fan_out_feeds`` command has added it to their feeds.
+    :type feed_pending: models.BooleanField
     """
     title = models.CharField(max_length=255)
     content = models.TextField()
+    # Both foreign keys lead a composite index (see Meta), which serves
+    # their lookups and constraints; a separate index would be redundant.
     publisher = models.ForeignKey(
         'Publisher',
         on_delete=models.CASCADE,
-        related_name='articles'
+        related_name='articles',
+        db_index=False
     )
     journalist = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
-        related_name='journalist_articles'
+        related_name='journalist_articles',
+        db_index=False
     )
     approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    feed_pending = models.BooleanField(default=False, db_index=True)
+
+    tracked_fields = ('approved', 'title', 'content')
+
+    class Meta:
+        indexes = [
+            # Public listings and the anonymous API, newest first. MySQL
+            # filters with "approved = 1" and uses the composite index;
+            # SQLite and PostgreSQL filter on the bare boolean column,
+            # which matches the partial index.
+            models.Index(fields=['approved', '-created_at', '-id'],
+                         name='article_approved_created_idx'),
+            models.Index(fields=['-created_at', '-id'],
+                         condition=models.Q(approved=True),
+                         name='article_published_idx'),
+            # Approved articles by publisher / by journalist by date:
+            # feed backfill, fan-out on read, journalist dashboard.
+            models.Index(fields=['publisher', 'approved', '-created_at'],
+                         name='article_pub_approved_idx'),
+            models.Index(fields=['journalist', 'approved', '-created_at'],
+                         name='article_jour_approved_idx'),
+            # Editors' pending-approval queue. MySQL ignores the
+            # conditions of both partial indexes (see
+            # SILENCED_SYSTEM_CHECKS) and uses the composite approved
+            # index above.
+            models.Index(fields=['created_at'],
+                         condition=models.Q(approved=False),
+                         name='article_pending_idx'),
+        ]
 
     def __str__(self) -> str:
         """
@@ -231,7 +321,7 @@ class Article(models.Model):
         return self.title
 
 
-class Newsletter(models.Model):
+class Newsletter(ApprovalTrackingMixin, models.Model):
     """
     Represents a newsletter that holds content and metadata.
 
@@ -239,7 +329,12 @@ class Newsletter(models.Model):
     including the title, content, journalist, publisher, approval status,
     and creation date.
     Instances of this class represent individual newsletters with
-    metadata about their sources and status.
+    metadata about their sources and status. Saving a newsletter that
+    becomes approved sends the :data:`newsapp.tracking.approving` signal
+    once, inside the saving transaction, and
+    :data:`newsapp.tracking.approved` after commit. ``title`` and
+    ``content`` are tracked too, so the search index is only updated
+    when they change.
 
     :ivar title: The title of the newsletter.
     :type title: models.CharField
@@ -271,5 +366,467 @@ class Newsletter(models.Model):
     approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    tracked_fields = ('approved', 'title', 'content')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['approved', '-created_at'],
+                         name='newsletter_approved_idx'),
+            models.Index(fields=['-created_at'],
+                         name='newsletter_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
+
+
+class NotificationOutbox(models.Model):
+    """
+    Represents a queued subscriber notification waiting to be delivered.
+
+    Rows are written when an article is approved, or a newsletter is
+    approved for distribution, so the approving request only pays for a
+    single INSERT. The ``send_notifications`` management command later
+    drains pending rows, resolving recipients and sending the emails in
+    fixed-size batches over reused mail connections. Progress is
+    stored on the row after every batch so an interrupted delivery resumes
+    where it stopped instead of mailing everyone again.
+
+    :ivar article: The approved article the notification announces, if
+        it announces one.
+    :type article: models.ForeignKey
+    :ivar newsletter: The approved newsletter being distributed, if the
+        row distributes one. Exactly one of ``article`` and
+        ``newsletter`` is set.
+    :type newsletter: models.ForeignKey
+    :ivar subject: Email subject, captured when the row is queued.
+    :type subject: models.CharField
+    :ivar body: Email body, captured when the row is queued.
+    :type body: models.TextField
+    :ivar from_email: Sender address used for every message.
+    :type from_email: models.CharField
+    :ivar status: Delivery state: pending, sending, sent or failed.
+    :type status: models.CharField
+    :ivar last_recipient: Email address of the last recipient delivered
+        to; recipients are processed in address order, so this acts as a
+        resume cursor.
+    :type last_recipient: models.CharField
+    :ivar recipients_sent: Number of recipients delivered to so far.
+    :type recipients_sent: models.PositiveIntegerField
+    :ivar recipients_total: Number of recipients, counted when delivery
+        starts.
+    :type recipients_total: models.PositiveIntegerField
+    :ivar batches_sent: Number of batches delivered so far.
+    :type batches_sent: models.PositiveIntegerField
+    :ivar attempts: Number of delivery attempts that ended in an error.
+    :type attempts: models.PositiveIntegerField
+    :ivar last_error: Text of the most recent delivery error.
+    :type last_error: models.TextField
+    :ivar created_at: When the notification was queued.
+    :type created_at: models.DateTimeField
+    :ivar started_at: When a worker first picked the row up.
+    :type started_at: models.DateTimeField
+    :ivar finished_at: When the last batch was delivered.
+    :type finished_at: models.DateTimeField
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    article = models.ForeignKey(
+        'Article',
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        null=True,
+        blank=True
+    )
+    newsletter = models.ForeignKey(
+        'Newsletter',
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        null=True,
+        blank=True
+    )
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    last_recipient = models.CharField(max_length=254, blank=True)
+    recipients_sent = models.PositiveIntegerField(default=0)
+    recipients_total = models.PositiveIntegerField(null=True, blank=True)
+    batches_sent = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'],
+                         name='outbox_status_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=(models.Q(article__isnull=False,
+                                    newsletter__isnull=True)
+                           | models.Q(article__isnull=True,
+                                      newsletter__isnull=False)),
+                name='outbox_article_xor_newsletter'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.subject} [{self.status}]"
+
+    @property
+    def progress(self) -> Optional[float]:
+        """
+        :return: The fraction of recipients delivered to, between 0 and
+            1, or None before delivery has started.
+        :rtype: float or None
+        """
+        if self.recipients_total is None:
+            return None
+        if not self.recipients_total:
+            return 1.0
+        return min(self.recipients_sent / self.recipients_total, 1.0)
+
+    @property
+    def emails_per_second(self) -> Optional[float]:
+        """
+        :return: Delivery throughput since a worker first picked the row
+            up, until it finished (or until now while it is sending), or
+            None before delivery has started.
+        :rtype: float or None
+        """
+        if self.started_at is None:
+            return None
+        end = self.finished_at or timezone.now()
+        seconds = (end - self.started_at).total_seconds()
+        return self.recipients_sent / seconds if seconds > 0 else 0.0
+
+
+class SocialPost(models.Model):
+    """
+    Tracks the publication of an approved article to X (formerly Twitter).
+
+    A row is queued when an article is approved and is drained by the
+    ``publish_to_x`` management command. Because there is at most one row
+    per article and it is only ever posted while ``pending``, saving an
+    approved article again never produces a second post.
+
+    :ivar article: The article being posted.
+    :type article: models.OneToOneField
+    :ivar status: Publication state: pending, posted or failed.
+    :type status: models.CharField
+    :ivar attempts: Number of failed publication attempts.
+    :type attempts: models.PositiveIntegerField
+    :ivar next_attempt_at: Earliest time the worker may try again, used
+        for retry backoff and to respect API rate limits.
+    :type next_attempt_at: models.DateTimeField
+    :ivar remote_id: Identifier of the created post returned by the API.
+    :type remote_id: models.CharField
+    :ivar last_error: Text of the most recent publication error.
+    :type last_error: models.TextField
+    :ivar created_at: When the post was queued.
+    :type created_at: models.DateTimeField
+    :ivar posted_at: When the API confirmed the post.
+    :type posted_at: models.DateTimeField
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_POSTED = 'posted'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_POSTED, 'Posted'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    article = models.OneToOneField(
+        'Article',
+        on_delete=models.CASCADE,
+        related_name='social_post'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    remote_id = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    posted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'],
+                         name='socialpost_status_next_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.article} [{self.status}]"
+
+
+class FeedEntry(models.Model):
+    """
+    Represents one article in a reader's precomputed feed.
+
+    Entries are written when an article is approved (fan-out on write)
+    and when a reader subscribes to a publisher or journalist, and are
+    removed when the reader unsubscribes. A reader's feed is therefore a
+    single range scan over the ``(reader, created_at)`` index instead of
+    a join against every article. See :mod:`newsapp.feeds`.
+
+    :ivar reader: The reader whose feed the entry belongs to.
+    :type reader: models.ForeignKey
+    :ivar article: The approved article.
+    :type article: models.ForeignKey
+    :ivar created_at: Copy of the article's creation time, so the feed
+        can be ordered from the index alone.
+    :type created_at: models.DateTimeField
+    """
+    reader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    article = models.ForeignKey(
+        'Article',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'article'],
+                                    name='feedentry_reader_article_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['reader', '-created_at', '-article'],
+                         name='feedentry_reader_created_idx'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.reader} <- {self.article}"
+
+
+class SearchDocument(models.Model):
+    """
+    Represents an approved article or newsletter in the search index.
+
+    Each document stores its length in tokens, which BM25 needs to
+    normalise term frequencies, and owns the postings of its terms. See
+    :mod:`newsapp.search`.
+
+    :ivar kind: Whether the document is an article or a newsletter.
+    :type kind: models.CharField
+    :ivar object_id: Primary key of the indexed article or newsletter.
+    :type object_id: models.PositiveIntegerField
+    :ivar length: Number of indexed tokens in the document.
+    :type length: models.PositiveIntegerField
+    """
+    KIND_ARTICLE = 'article'
+    KIND_NEWSLETTER = 'newsletter'
+    KIND_CHOICES = (
+        (KIND_ARTICLE, 'Article'),
+        (KIND_NEWSLETTER, 'Newsletter'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveIntegerField()
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'],
+                                    name='searchdocument_object_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.kind} {self.object_id}"
+
+
+class SearchCorpus(models.Model):
+    """
+    Represents the running totals of the indexed documents of one kind,
+    which BM25 needs for every query. They are kept up to date as
+    documents are indexed and removed, so a search reads one row instead
+    of aggregating the whole index.
+
+    :ivar kind: The kind of document the totals are for.
+    :type kind: models.CharField
+    :ivar documents: Number of indexed documents.
+    :type documents: models.PositiveIntegerField
+    :ivar total_length: Sum of their lengths in tokens.
+    :type total_length: models.PositiveBigIntegerField
+    """
+    kind = models.CharField(max_length=10, unique=True,
+                            choices=SearchDocument.KIND_CHOICES)
+    documents = models.PositiveIntegerField(default=0)
+    total_length = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'search corpora'
+
+    def __str__(self) -> str:
+        return f"{self.kind}: {self.documents} documents"
+
+
+class BinaryCharField(models.CharField):
+    """
+    A ``CharField`` compared byte by byte, whatever the database's default
+    collation. MySQL's default ``utf8mb4_0900_ai_ci`` would otherwise
+    treat ``resume`` and ``résumé`` as equal, and order strings in a way
+    no prefix range can follow.
+
+    :cvar collations: The binary collation of each database vendor;
+        SQLite compares bytes by default.
+    :type collations: dict
+    """
+    collations = {'mysql': 'utf8mb4_bin', 'postgresql': 'C'}
+
+    def db_parameters(self, connection) -> dict:
+        params = super().db_parameters(connection)
+        params['collation'] = self.collations.get(connection.vendor)
+        return params
+
+
+class SearchPosting(models.Model):
+    """
+    Represents one entry of the inverted index: a term and how often it
+    occurs in a document.
+
+    Terms are lower-cased and compared in binary (code point) order, so
+    an exact match and a prefix match are both range scans over the
+    ``(term, document)`` index on every database.
+
+    :ivar term: The normalised term.
+    :type term: models.CharField
+    :ivar document: The document containing the term.
+    :type document: models.ForeignKey
+    :ivar frequency: Number of occurrences of the term in the document,
+        with title occurrences weighted up.
+    :type frequency: models.PositiveIntegerField
+    """
+    term = BinaryCharField(max_length=64)
+    document = models.ForeignKey(
+        'SearchDocument',
+        on_delete=models.CASCADE,
+        related_name='postings'
+    )
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['term', 'document'],
+                                    name='searchposting_term_doc_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.term} in {self.document}"
+
+
+class DigestItem(models.Model):
+    """
+    Represents an approved article waiting to be included in a reader's
+    next email digest.
+
+    With ``NOTIFICATION_MODE = 'digest'`` an approval queues one item per
+    subscribed reader instead of an outbox row, and the ``send_digests``
+    management command later mails each reader a single digest of their
+    items. See :mod:`newsapp.digests`.
+
+    :ivar reader: The reader the article is queued for.
+    :type reader: models.ForeignKey
+    :ivar article: The approved article.
+    :type article: models.ForeignKey
+    :ivar created_at: When the item was queued.
+    :type created_at: models.DateTimeField
+    """
+    reader = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='digest_items'
+    )
+    article = models.ForeignKey(
+        'Article',
+        on_delete=models.CASCADE,
+        related_name='digest_items'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['reader', 'article'],
+                                    name='digestitem_reader_article_uniq'),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.article} for {self.reader}"
+
+
+class DigestDelivery(models.Model):
+    """
+    Tracks the digest deliveries of one reader.
+
+    The row is updated after every batch of digests, so
+    ``last_item_id`` acts as the reader's resume cursor: items up to it
+    have been mailed (or given up on) and are never sent again, even if
+    a run is interrupted before its queued items are deleted.
+
+    :ivar reader: The reader.
+    :type reader: models.OneToOneField
+    :ivar status: Outcome of the last attempt: pending (a failed attempt
+        that will be retried), sent or failed (given up).
+    :type status: models.CharField
+    :ivar last_item_id: Id of the newest digest item delivered or dropped.
+    :type last_item_id: models.PositiveBigIntegerField
+    :ivar digests_sent: Number of digests sent to the reader.
+    :type digests_sent: models.PositiveIntegerField
+    :ivar articles_sent: Number of articles included in those digests.
+    :type articles_sent: models.PositiveIntegerField
+    :ivar attempts: Consecutive failed attempts since the last success.
+    :type attempts: models.PositiveIntegerField
+    :ivar last_error: Text of the most recent delivery error.
+    :type last_error: models.TextField
+    :ivar last_sent_at: When the last digest was sent.
+    :type last_sent_at: models.DateTimeField
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    reader = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='digest_delivery'
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING
+    )
+    last_item_id = models.PositiveBigIntegerField(default=0)
+    digests_sent = models.PositiveIntegerField(default=0)
+    articles_sent = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f"Digests of {self.reader} [{self.status}]"
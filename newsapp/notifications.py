@@ -0,0 +1,494 @@
+"""
+Subscriber notification outbox.
+
+Approving an article, or a newsletter, only queues a
+:class:`~newsapp.models.NotificationOutbox` row; the emails themselves
+are sent later by the ``send_notifications`` management command, which
+calls :func:`drain_outbox`. A newsletter goes to the subscribers of its
+publisher and of its journalist, and its email is rendered from a
+template once, when it is queued, not once per recipient.
+
+Recipients are streamed in fixed-size batches. By default the batches
+are sent one after the other over a single mail connection; with a
+``concurrency`` above one, up to that many batches are in flight at once
+through a :class:`MailPool` of as many connections. The outbox row
+records its progress after every batch.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import Avg, Count, F, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Article, Newsletter, NotificationOutbox
+from .recipients import iter_subscriber_emails, subscribers
+
+
+def get_batch_size() -> int:
+    """
+    Returns the number of recipients delivered per batch, read from the
+    ``NOTIFICATION_BATCH_SIZE`` setting.
+
+    :return: The configured batch size, at least 1.
+    :rtype: int
+    """
+    return max(1, getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100))
+
+
+def enqueue_article_notification(article: Article) -> NotificationOutbox:
+    """
+    Queues the subscriber notification for an approved article.
+
+    Only one outbox row is ever created per article, so calling this again
+    for an article that was already queued returns the existing row.
+
+    :param article: The approved article to announce.
+    :type article: Article
+    :return: The queued (or previously queued) outbox row.
+    :rtype: NotificationOutbox
+    """
+    outbox, _ = NotificationOutbox.objects.get_or_create(
+        article=article,
+        defaults={
+            'subject': f"New Article Approved: {article.title}",
+            'body': article.content,
+            'from_email': getattr(settings, 'NOTIFICATION_FROM_EMAIL',
+                                  'no-reply@newsportal.com'),
+        }
+    )
+    return outbox
+
+
+def get_concurrency() -> int:
+    """
+    Returns the number of batches sent at once, read from the
+    ``NOTIFICATION_CONCURRENCY`` setting.
+
+    :return: The configured concurrency, at least 1.
+    :rtype: int
+    """
+    return max(1, getattr(settings, 'NOTIFICATION_CONCURRENCY', 1))
+
+
+def enqueue_newsletter(newsletter: Newsletter) -> NotificationOutbox:
+    """
+    Queues the distribution of an approved newsletter to the subscribers
+    of its publisher and journalist.
+
+    The email is rendered from ``newsapp/email/newsletter.txt`` here,
+    once, and every recipient receives the stored copy. A newsletter is
+    only ever queued once.
+
+    :param newsletter: The approved newsletter.
+    :type newsletter: Newsletter
+    :return: The queued (or previously queued) outbox row.
+    :rtype: NotificationOutbox
+    """
+    outbox = NotificationOutbox.objects.filter(newsletter=newsletter).first()
+    if outbox is not None:
+        return outbox
+    context = {'newsletter': newsletter,
+               'publisher': newsletter.publisher,
+               'journalist': newsletter.journalist}
+    return NotificationOutbox.objects.create(
+        newsletter=newsletter,
+        subject=f"{newsletter.publisher.name}: {newsletter.title}"[:255],
+        body=render_to_string('newsapp/email/newsletter.txt', context),
+        from_email=getattr(settings, 'NOTIFICATION_FROM_EMAIL',
+                           'no-reply@newsportal.com'),
+    )
+
+
+def _source(outbox: NotificationOutbox):
+    return outbox.article if outbox.article_id else outbox.newsletter
+
+
+def iter_recipients(outbox: NotificationOutbox,
+                    after: str = '') -> Iterator[str]:
+    """
+    Yields the email addresses that should receive an outbox row, in
+    ascending order, starting after the ``after`` cursor.
+
+    :param outbox: The outbox row being delivered.
+    :type outbox: NotificationOutbox
+    :param after: Only addresses sorting after this value are yielded.
+    :type after: str
+    :return: An iterator over recipient email addresses.
+    :rtype: Iterator[str]
+    """
+    source = _source(outbox)
+    return iter_subscriber_emails(source.publisher_id,
+                                  source.journalist_id, after=after)
+
+
+def count_recipients(outbox: NotificationOutbox) -> int:
+    """
+    :param outbox: The outbox row being delivered.
+    :type outbox: NotificationOutbox
+    :return: The number of distinct addresses the row is sent to.
+    :rtype: int
+    """
+    source = _source(outbox)
+    return subscribers(source.publisher_id, source.journalist_id).count()
+
+
+def _batches(emails: Iterator[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for email in emails:
+        batch.append(email)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class DrainResult:
+    """
+    Summary of a single :func:`drain_outbox` run.
+
+    :ivar notifications: Number of outbox rows fully delivered.
+    :type notifications: int
+    :ivar failed: Number of outbox rows that raised an error.
+    :type failed: int
+    :ivar emails: Number of individual emails sent.
+    :type emails: int
+    :ivar batches: Number of ``send_messages`` calls made.
+    :type batches: int
+    :ivar elapsed: Wall-clock seconds spent draining.
+    :type elapsed: float
+    """
+    notifications: int = 0
+    failed: int = 0
+    emails: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def emails_per_second(self) -> float:
+        """
+        :return: Delivery throughput of the run in emails per second.
+        :rtype: float
+        """
+        return self.emails / self.elapsed if self.elapsed else 0.0
+
+
+def claim_next(stale_after: int = 600,
+               exclude: Iterable[int] = ()) -> Optional[NotificationOutbox]:
+    """
+    Atomically claims the oldest deliverable outbox row for this worker.
+
+    Pending rows are eligible, as are rows stuck in ``sending`` for longer
+    than ``stale_after`` seconds (their worker presumably died). Rows are
+    locked with ``SKIP LOCKED`` where the database supports it, so several
+    workers can drain the outbox concurrently.
+
+    :param stale_after: Seconds after which a ``sending`` row is
+        considered abandoned.
+    :type stale_after: int
+    :param exclude: Ids of rows this worker must not claim, such as rows
+        that already failed during the current run.
+    :type exclude: Iterable[int]
+    :return: The claimed row, or None if nothing is waiting.
+    :rtype: NotificationOutbox or None
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=stale_after)
+    with transaction.atomic():
+        pending = NotificationOutbox.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            status=NotificationOutbox.STATUS_PENDING
+        ).exclude(id__in=exclude)
+        outbox = pending.order_by('created_at', 'id').first()
+        if outbox is None:
+            outbox = NotificationOutbox.objects.select_for_update(
+                skip_locked=True
+            ).filter(
+                status=NotificationOutbox.STATUS_SENDING,
+                started_at__lt=stale,
+            ).exclude(id__in=exclude).order_by('created_at', 'id').first()
+        if outbox is None:
+            return None
+        outbox.status = NotificationOutbox.STATUS_SENDING
+        outbox.started_at = outbox.started_at or now
+        outbox.save(update_fields=['status', 'started_at'])
+    return outbox
+
+
+class MailPool:
+    """
+    Sends batches of messages from a fixed number of worker threads,
+    each with its own mail connection, opened on first use and kept open
+    until the pool is closed. Mail connections are not thread-safe, so
+    no connection is ever shared between threads.
+
+    Use the pool as a context manager.
+
+    :ivar size: Number of worker threads and connections.
+    :type size: int
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def __enter__(self) -> 'MailPool':
+        self._executor = ThreadPoolExecutor(max_workers=self.size,
+                                            thread_name_prefix='mail')
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._executor.shutdown(wait=True)
+        for connection in self._connections:
+            connection.close()
+
+    def _send(self, messages: List[EmailMessage]) -> int:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = get_connection()
+            connection.open()
+            with self._lock:
+                self._connections.append(connection)
+        return connection.send_messages(messages)
+
+    def submit(self, messages: List[EmailMessage]) -> Future:
+        """
+        Queues a batch for sending.
+
+        :param messages: The messages of the batch.
+        :type messages: list[EmailMessage]
+        :return: A future that raises if the batch could not be sent.
+        :rtype: Future
+        """
+        return self._executor.submit(self._send, messages)
+
+
+def _messages(outbox: NotificationOutbox, batch: List[str],
+              connection=None) -> List[EmailMessage]:
+    return [
+        EmailMessage(
+            subject=outbox.subject,
+            body=outbox.body,
+            from_email=outbox.from_email,
+            to=[email],
+            connection=connection,
+        )
+        for email in batch
+    ]
+
+
+def _record_batch(outbox: NotificationOutbox, batch: List[str],
+                  result: DrainResult) -> None:
+    outbox.last_recipient = batch[-1]
+    outbox.recipients_sent += len(batch)
+    outbox.batches_sent += 1
+    outbox.save(update_fields=['last_recipient', 'recipients_sent',
+                               'batches_sent'])
+    result.emails += len(batch)
+    result.batches += 1
+
+
+def deliver(outbox: NotificationOutbox, connection,
+            batch_size: int, result: DrainResult,
+            pool: Optional[MailPool] = None) -> None:
+    """
+    Sends a claimed outbox row to all of its remaining recipients.
+
+    Without a pool, each batch is sent with one ``send_messages`` call on
+    the shared connection. With one, up to ``pool.size`` batches are
+    sent at once. Either way the row's cursor and counters are saved
+    after each batch, in recipient order, so the cursor never passes a
+    batch that was not sent. If a batch fails, the batches already in
+    flight behind it may still go out, and are sent again when the row
+    is retried.
+
+    :param outbox: The claimed outbox row.
+    :type outbox: NotificationOutbox
+    :param connection: An open mail backend connection, used when there
+        is no pool.
+    :param batch_size: Number of recipients per batch.
+    :type batch_size: int
+    :param result: Run summary updated in place.
+    :type result: DrainResult
+    :param pool: Pool to send the batches through concurrently.
+    :type pool: MailPool or None
+    :return: None
+    """
+    if outbox.recipients_total is None:
+        outbox.recipients_total = count_recipients(outbox)
+        outbox.save(update_fields=['recipients_total'])
+    recipients = iter_recipients(outbox, after=outbox.last_recipient)
+    if pool is None:
+        for batch in _batches(recipients, batch_size):
+            connection.send_messages(_messages(outbox, batch, connection))
+            _record_batch(outbox, batch, result)
+    else:
+        in_flight = deque()
+        try:
+            for batch in _batches(recipients, batch_size):
+                in_flight.append(
+                    (batch, pool.submit(_messages(outbox, batch))))
+                if len(in_flight) >= pool.size:
+                    batch, future = in_flight.popleft()
+                    future.result()
+                    _record_batch(outbox, batch, result)
+            while in_flight:
+                batch, future = in_flight.popleft()
+                future.result()
+                _record_batch(outbox, batch, result)
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+    outbox.status = NotificationOutbox.STATUS_SENT
+    outbox.finished_at = timezone.now()
+    outbox.save(update_fields=['status', 'finished_at'])
+
+
+def drain_outbox(batch_size: Optional[int] = None,
+                 limit: Optional[int] = None,
+                 stale_after: int = 600,
+                 concurrency: Optional[int] = None) -> DrainResult:
+    """
+    Delivers pending outbox rows until the outbox is empty or ``limit``
+    rows have been processed.
+
+    A single mail connection is opened for the whole run and reused for
+    every batch, or with a ``concurrency`` above one a :class:`MailPool`
+    of that many connections. A row whose delivery raises is returned to
+    ``pending``
+    (keeping its cursor) until ``NOTIFICATION_MAX_ATTEMPTS`` is reached,
+    after which it is marked ``failed``. Failed rows are not retried
+    within the same run.
+
+    :param batch_size: Recipients per batch; defaults to
+        ``NOTIFICATION_BATCH_SIZE``.
+    :type batch_size: int or None
+    :param limit: Maximum number of outbox rows to process.
+    :type limit: int or None
+    :param stale_after: Seconds after which an in-progress row is
+        reclaimed.
+    :type stale_after: int
+    :param concurrency: Batches sent at once; defaults to
+        ``NOTIFICATION_CONCURRENCY``.
+    :type concurrency: int or None
+    :return: A summary of the run, including throughput.
+    :rtype: DrainResult
+    """
+    batch_size = batch_size or get_batch_size()
+    concurrency = concurrency or get_concurrency()
+    max_attempts = getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+    result = DrainResult()
+    started = time.perf_counter()
+    pool = MailPool(concurrency) if concurrency > 1 else None
+    with pool or get_connection() as sender:
+        connection = None if pool else sender
+        processed = 0
+        failed_ids = []
+        while limit is None or processed < limit:
+            outbox = claim_next(stale_after=stale_after, exclude=failed_ids)
+            if outbox is None:
+                break
+            processed += 1
+            try:
+                deliver(outbox, connection, batch_size, result, pool)
+            except Exception as e:
+                outbox.attempts += 1
+                outbox.last_error = str(e)
+                if outbox.attempts >= max_attempts:
+                    outbox.status = NotificationOutbox.STATUS_FAILED
+                else:
+                    outbox.status = NotificationOutbox.STATUS_PENDING
+                outbox.save(update_fields=['attempts', 'last_error',
+                                           'status'])
+                failed_ids.append(outbox.id)
+                result.failed += 1
+            else:
+                result.notifications += 1
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+KINDS = {
+    'article': {'article__isnull': False},
+    'newsletter': {'newsletter__isnull': False},
+}
+
+
+def delivery_stats(kind: Optional[str] = None) -> dict:
+    """
+    Aggregates end-to-end delivery figures over all delivered outbox rows.
+
+    ``avg_latency`` is the mean time between an article or newsletter
+    being queued and its last email being sent; ``avg_send_time``
+    excludes the time spent waiting in the queue. ``emails_per_second``
+    is the throughput over the time spent sending.
+
+    :param kind: ``'article'`` or ``'newsletter'`` to restrict the
+        figures to one kind of row.
+    :type kind: str or None
+    :return: A dictionary with per-status counts, total emails delivered
+        and average latency and throughput figures (None when nothing
+        has been delivered yet).
+    :rtype: dict
+    """
+    rows = NotificationOutbox.objects.filter(**KINDS.get(kind, {}))
+    counts = {status: 0 for status, _ in NotificationOutbox.STATUS_CHOICES}
+    for row in rows.values('status').annotate(n=Count('id')).order_by():
+        counts[row['status']] = row['n']
+    delivered = rows.filter(
+        status=NotificationOutbox.STATUS_SENT
+    ).aggregate(
+        emails=Sum('recipients_sent'),
+        avg_latency=Avg(F('finished_at') - F('created_at')),
+        avg_send_time=Avg(F('finished_at') - F('started_at')),
+        send_time=Sum(F('finished_at') - F('started_at')),
+    )
+
+    def seconds(value):
+        return value.total_seconds() if value is not None else None
+
+    emails = delivered['emails'] or 0
+    send_time = seconds(delivered['send_time'])
+    return {
+        'counts': counts,
+        'emails': emails,
+        'avg_latency': seconds(delivered['avg_latency']),
+        'avg_send_time': seconds(delivered['avg_send_time']),
+        'emails_per_second': emails / send_time if send_time else None,
+    }
+
+
+def dispatch_progress(outbox: NotificationOutbox) -> dict:
+    """
+    Reports the progress of one outbox row, such as a newsletter being
+    distributed.
+
+    :param outbox: The outbox row.
+    :type outbox: NotificationOutbox
+    :return: The row's status, recipients sent and total, batches sent,
+        progress (0 to 1) and throughput in emails per second; the last
+        two are None before delivery starts.
+    :rtype: dict
+    """
+    return {
+        'status': outbox.status,
+        'recipients_sent': outbox.recipients_sent,
+        'recipients_total': outbox.recipients_total,
+        'batches_sent': outbox.batches_sent,
+        'progress': outbox.progress,
+        'emails_per_second': outbox.emails_per_second,
+    }
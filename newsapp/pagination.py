@@ -0,0 +1,244 @@
+"""
+Keyset (cursor) pagination for the article APIs.
+
+Pages are ordered newest first on ``(created_at, id)`` and each page is
+selected with a ``WHERE (created_at, id) < (cursor)`` condition instead
+of an ``OFFSET``, so fetching page 1000 costs the same as fetching page 1.
+Reader feeds are paged on their own index by the feed's
+:class:`~newsapp.feeds.ReaderFeed`, and only the page's articles are
+read.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    """
+    Encodes a ``(created_at, id)`` position as an opaque cursor string.
+
+    :param created_at: Creation time of the last row on a page.
+    :type created_at: datetime
+    :param pk: Id of the last row on a page.
+    :type pk: int
+    :return: A URL-safe cursor.
+    :rtype: str
+    """
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decodes a cursor produced by :func:`encode_cursor`.
+
+    :param cursor: The cursor string.
+    :type cursor: str
+    :return: The ``(created_at, id)`` position.
+    :rtype: tuple
+    :raises ValueError: If the cursor is malformed.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(
+            padded.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def after_cursor(queryset: QuerySet, created_at: datetime,
+                 pk: int) -> QuerySet:
+    """
+    Restricts a queryset ordered by ``-created_at, -id`` to the rows that
+    come after the given position.
+
+    :param queryset: The queryset to filter.
+    :type queryset: QuerySet
+    :param created_at: ``created_at`` of the last row already returned.
+    :type created_at: datetime
+    :param pk: Id of the last row already returned.
+    :type pk: int
+    :return: The filtered queryset.
+    :rtype: QuerySet
+    """
+    return queryset.filter(
+        Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+
+def _in_order(rows: Iterable, ids: List[int]) -> List:
+    """
+    :param rows: Objects or ``values()`` rows, in any order.
+    :param ids: Their ids in the wanted order.
+    :type ids: list[int]
+    :return: The rows in the order of ``ids``.
+    :rtype: list
+    """
+    position = {pk: i for i, pk in enumerate(ids)}
+    return sorted(rows, key=lambda row: position[
+        row['id'] if isinstance(row, dict) else row.pk])
+
+
+def _query_params(request):
+    # DRF requests expose query_params, plain Django requests GET.
+    return getattr(request, 'query_params', request.GET)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginates a queryset newest first on ``(created_at, id)``.
+
+    The response body stays a plain JSON list, as it was before
+    pagination was added; the URL of the next page is sent in a
+    ``Link: <...>; rel="next"`` header, which is omitted on the last page.
+    Clients choose the page size with ``page_size``, up to
+    ``max_page_size``.
+
+    :ivar page_size: Default number of rows per page; None means the
+        ``ARTICLE_PAGE_SIZE`` setting.
+    :type page_size: int or None
+    :ivar max_page_size: Largest page size a client may request.
+    :type max_page_size: int
+    :ivar ordering: The ordering the keyset relies on.
+    :type ordering: tuple
+    """
+    page_size = None
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('-created_at', '-id')
+
+    def get_page_size(self, request) -> int:
+        """
+        Returns the page size requested by the client, falling back to
+        the default for missing or invalid values.
+
+        :param request: The current request.
+        :return: The page size.
+        :rtype: int
+        """
+        default = self.page_size or getattr(settings, 'ARTICLE_PAGE_SIZE',
+                                            50)
+        try:
+            size = int(_query_params(request)[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset: QuerySet, request,
+                          view=None) -> List:
+        """
+        Returns the rows of the requested page.
+
+        One extra row is fetched to learn whether a next page exists. A
+        queryset with a ``feed`` (a :class:`~newsapp.feeds.FeedQuerySet`)
+        is restricted to the ids the feed returns for the page, which
+        are fetched unordered and put in feed order here.
+
+        :param queryset: The queryset to paginate; a ``values()``
+            queryset must include ``id`` and ``created_at``.
+        :type queryset: QuerySet
+        :param request: The current request.
+        :param view: The view being paginated.
+        :return: The objects or rows on the page.
+        :rtype: list
+        :raises NotFound: If the cursor is malformed.
+        """
+        position = self._start(request)
+        feed = getattr(queryset, 'feed', None)
+        if feed is not None:
+            ids = feed.page_ids(position, self.size + 1)
+            return self._trim(_in_order(
+                queryset.filter(id__in=ids).order_by(), ids))
+        return self._trim(list(self._page_queryset(queryset, position)))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request) -> List:
+        """
+        Async version of :meth:`paginate_queryset`, for async views.
+
+        :param queryset: The queryset to paginate.
+        :type queryset: QuerySet
+        :param request: The current request (a Django ``HttpRequest``
+            is enough).
+        :return: The objects or rows on the page.
+        :rtype: list
+        :raises NotFound: If the cursor is malformed.
+        """
+        position = self._start(request)
+        feed = getattr(queryset, 'feed', None)
+        if feed is not None:
+            ids = await feed.apage_ids(position, self.size + 1)
+            return self._trim(_in_order(
+                [row async for row in
+                 queryset.filter(id__in=ids).order_by()], ids))
+        return self._trim([row async for row in
+                           self._page_queryset(queryset, position)])
+
+    def _start(self, request) -> Optional[Tuple[datetime, int]]:
+        self.request = request
+        self.size = self.get_page_size(request)
+        cursor = _query_params(request).get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            return decode_cursor(cursor)
+        except ValueError:
+            raise NotFound('Invalid cursor')
+
+    def _page_queryset(self, queryset: QuerySet,
+                       position: Optional[Tuple[datetime, int]]) -> QuerySet:
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = after_cursor(queryset, *position)
+        return queryset[:self.size + 1]
+
+    def _trim(self, rows: List) -> List:
+        self.has_next = len(rows) > self.size
+        rows = rows[:self.size]
+        self.last = rows[-1] if rows else None
+        return rows
+
+    def get_next_link(self) -> Optional[str]:
+        """
+        :return: The absolute URL of the next page, or None on the last
+            page.
+        :rtype: str or None
+        """
+        if not self.has_next:
+            return None
+        params = _query_params(self.request).copy()
+        if isinstance(self.last, dict):
+            position = self.last['created_at'], self.last['id']
+        else:
+            position = self.last.created_at, self.last.pk
+        params[self.cursor_query_param] = encode_cursor(*position)
+        url = self.request.build_absolute_uri(self.request.path)
+        return f"{url}?{params.urlencode()}"
+
+    def get_paginated_response(self, data) -> Response:
+        """
+        Wraps the serialized page in a response carrying the ``Link``
+        header.
+
+        :param data: The serialized rows.
+        :return: The response.
+        :rtype: Response
+        """
+        return Response(data, headers=self.get_headers())
+
+    def get_headers(self) -> dict:
+        """
+        :return: The ``Link`` header of the page, if there is a next one.
+        :rtype: dict
+        """
+        next_link = self.get_next_link()
+        if next_link:
+            return {'Link': f'<{next_link}>; rel="next"'}
+        return {}
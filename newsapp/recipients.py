@@ -0,0 +1,135 @@
+"""
+Resolution of the readers subscribed to a publisher or a journalist.
+
+Every notification channel needs "everyone subscribed to this article's
+publisher or journalist". These helpers answer that with a single
+``UNION`` query over the two subscription tables, so duplicates are
+removed by the database and only the requested column is transferred.
+Results are read in keyset pages ordered by that column, so memory stays
+bounded by ``chunk_size`` however many subscribers there are, and a
+caller can resume from the last value it processed.
+"""
+from typing import Any, Iterator, Optional
+
+from django.db.models import QuerySet
+
+from .models import CustomUser
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def subscribers(publisher_id: Optional[int], journalist_id: Optional[int],
+                field: str = 'email', after: Any = None) -> QuerySet:
+    """
+    Builds the query for the distinct ``field`` values of the readers
+    subscribed to a publisher or to a journalist.
+
+    :param publisher_id: Id of the publisher, or None to ignore
+        publisher subscriptions.
+    :type publisher_id: int or None
+    :param journalist_id: Id of the journalist's user, or None to ignore
+        journalist subscriptions.
+    :type journalist_id: int or None
+    :param field: The ``CustomUser`` column to return. When it is
+        ``email``, readers without an email address are left out.
+    :type field: str
+    :param after: Only values greater than this are returned.
+    :return: A flat ``values_list`` queryset ordered by ``field``.
+    :rtype: QuerySet
+    """
+    users = CustomUser.objects.all()
+    if field == 'email':
+        users = users.exclude(email='')
+    if after is not None:
+        users = users.filter(**{f'{field}__gt': after})
+    parts = []
+    if publisher_id is not None:
+        parts.append(users.filter(subscriptions_publishers=publisher_id))
+    if journalist_id is not None:
+        parts.append(users.filter(subscriptions_journalists=journalist_id))
+    if not parts:
+        return users.none().values_list(field, flat=True)
+    parts = [part.values_list(field, flat=True) for part in parts]
+    return parts[0].union(*parts[1:]).order_by(field)
+
+
+def iter_subscribers(publisher_id: Optional[int],
+                     journalist_id: Optional[int],
+                     field: str = 'email', after: Any = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Streams the distinct ``field`` values of the readers subscribed to a
+    publisher or to a journalist, in ascending order.
+
+    Values are fetched in keyset pages of ``chunk_size`` rows, each read
+    with ``iterator(chunk_size=...)``. Client-side database cursors (such
+    as MySQL's default one) therefore never hold more than one page.
+
+    :param publisher_id: Id of the publisher, or None.
+    :type publisher_id: int or None
+    :param journalist_id: Id of the journalist's user, or None.
+    :type journalist_id: int or None
+    :param field: The ``CustomUser`` column to return.
+    :type field: str
+    :param after: Resume after this value.
+    :param chunk_size: Rows fetched per query.
+    :type chunk_size: int
+    :return: An iterator over the values.
+    :rtype: Iterator
+    """
+    while True:
+        page = subscribers(publisher_id, journalist_id, field=field,
+                           after=after)[:chunk_size]
+        count = 0
+        for value in page.iterator(chunk_size=chunk_size):
+            count += 1
+            after = value
+            yield value
+        if count < chunk_size:
+            return
+
+
+def iter_subscriber_emails(publisher_id: Optional[int],
+                           journalist_id: Optional[int], after: str = '',
+                           chunk_size: int = DEFAULT_CHUNK_SIZE
+                           ) -> Iterator[str]:
+    """
+    Streams the distinct, non-empty email addresses of the readers
+    subscribed to a publisher or to a journalist, in ascending order.
+
+    :param publisher_id: Id of the publisher, or None.
+    :type publisher_id: int or None
+    :param journalist_id: Id of the journalist's user, or None.
+    :type journalist_id: int or None
+    :param after: Resume after this address.
+    :type after: str
+    :param chunk_size: Rows fetched per query.
+    :type chunk_size: int
+    :return: An iterator over email addresses.
+    :rtype: Iterator[str]
+    """
+    return iter_subscribers(publisher_id, journalist_id, field='email',
+                            after=after or None, chunk_size=chunk_size)
+
+
+def iter_subscriber_ids(publisher_id: Optional[int],
+                        journalist_id: Optional[int], after: int = 0,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE
+                        ) -> Iterator[int]:
+    """
+    Streams the distinct ids of the readers subscribed to a publisher or
+    to a journalist, in ascending order.
+
+    :param publisher_id: Id of the publisher, or None.
+    :type publisher_id: int or None
+    :param journalist_id: Id of the journalist's user, or None.
+    :type journalist_id: int or None
+    :param after: Resume after this id.
+    :type after: int
+    :param chunk_size: Rows fetched per query.
+    :type chunk_size: int
+    :return: An iterator over user ids.
+    :rtype: Iterator[int]
+    """
+    return iter_subscribers(publisher_id, journalist_id, field='id',
+                            after=after or None, chunk_size=chunk_size)
@@ -0,0 +1,49 @@
+"""
+Role helpers shared by models, views and management commands.
+
+Each user role maps to a Django ``Group`` of the same name capitalised.
+The three groups are created by a data migration and rarely change, so
+they are cached for the lifetime of the process: assigning a user to
+their role's group costs no lookup query after the first one.
+"""
+from typing import Dict
+
+from django.contrib.auth.models import Group
+
+ROLE_GROUP_NAMES = {
+    'reader': 'Reader',
+    'editor': 'Editor',
+    'journalist': 'Journalist',
+}
+
+_role_groups: Dict[str, Group] = {}
+
+
+def role_group(role: str) -> Group:
+    """
+    Returns the ``Group`` for a role, creating it if needed and caching
+    it for the lifetime of the process.
+
+    :param role: One of the ``CustomUser.ROLE_CHOICES`` values.
+    :type role: str
+    :return: The group users with that role belong to.
+    :rtype: Group
+    """
+    group = _role_groups.get(role)
+    if group is None:
+        name = ROLE_GROUP_NAMES.get(role, role.capitalize())
+        group, _ = Group.objects.get_or_create(name=name)
+        _role_groups[role] = group
+    return group
+
+
+def clear_role_group_cache(**kwargs) -> None:
+    """
+    Empties the role group cache. Connected to ``Group`` deletions and to
+    ``post_migrate`` (which also follows a database flush) so a deleted
+    group is never handed out again.
+
+    :param kwargs: Signal arguments, ignored.
+    :return: None
+    """
+    _role_groups.clear()
@@ -0,0 +1,193 @@
+"""
+Read-replica routing.
+
+The read-only reader pages and APIs are decorated with
+:func:`read_from_replicas`, and :class:`ReplicaRouter` sends the reads
+they make to one of the ``REPLICA_DATABASES`` aliases, chosen at random.
+All other reads, and every write, go to the ``default`` (primary)
+database.
+
+Replicas lag behind the primary, so reads stay on the primary:
+
+* for ``REPLICA_PIN_SECONDS`` after a user's own write, so they see the
+  result of their subscribe or approve action. A user is *pinned* by
+  :class:`~newsapp.middleware.ReplicaPinMiddleware` after every
+  successful non-GET request, and by :func:`pin_to_primary` in views
+  that change data on GET;
+* for ``REPLICA_PIN_SECONDS`` after any change to the article
+  generation (see :mod:`newsapp.cache`), so that listings cached under a
+  new generation are never rendered from a replica that has not caught
+  up with it.
+
+Without ``REPLICA_DATABASES`` every read goes to the primary.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, List, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpRequest, HttpResponse
+
+from .cache import aget_generation, get_generation
+
+PIN_SESSION_KEY = '_newsapp_primary_until'
+
+_use_replicas: ContextVar[bool] = ContextVar('newsapp_use_replicas',
+                                             default=False)
+
+
+def replica_aliases() -> List[str]:
+    """
+    :return: The database aliases of the read replicas, from the
+        ``REPLICA_DATABASES`` setting.
+    :rtype: list[str]
+    """
+    return list(getattr(settings, 'REPLICA_DATABASES', []))
+
+
+def pin_seconds() -> float:
+    """
+    :return: Seconds reads stay on the primary after a write, from the
+        ``REPLICA_PIN_SECONDS`` setting.
+    :rtype: float
+    """
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+
+
+class ReplicaRouter:
+    """
+    Database router that sends the reads of views decorated with
+    :func:`read_from_replicas` to a replica, and everything else to the
+    primary. Replicas are copies of the primary, so they are never
+    migrated directly.
+    """
+
+    def db_for_read(self, model, **hints) -> Optional[str]:
+        """
+        :param model: The model being read.
+        :return: A replica alias inside :func:`read_from_replicas`,
+            otherwise None (the primary).
+        :rtype: str or None
+        """
+        replicas = replica_aliases()
+        if replicas and _use_replicas.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints) -> str:
+        """
+        :param model: The model being written.
+        :return: The primary alias.
+        :rtype: str
+        """
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> Optional[bool]:
+        """
+        Allows relations between objects read from the primary and its
+        replicas, which hold the same rows.
+
+        :return: True if both objects come from the primary or a
+            replica, otherwise None (no opinion).
+        :rtype: bool or None
+        """
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name=None,
+                      **hints) -> Optional[bool]:
+        """
+        :param db: The database alias being migrated.
+        :type db: str
+        :return: False for replicas, which receive the schema from the
+            primary, otherwise None (no opinion).
+        :rtype: bool or None
+        """
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def pin_to_primary(request: HttpRequest) -> None:
+    """
+    Sends the user's reads to the primary for ``REPLICA_PIN_SECONDS``,
+    so they see their own writes. Does nothing without replicas.
+
+    :param request: The request that changed data.
+    :type request: HttpRequest
+    :return: None
+    """
+    if replica_aliases():
+        request.session[PIN_SESSION_KEY] = time.time() + pin_seconds()
+
+
+def _replicas_allowed(pinned_until: Optional[float],
+                      generation: int) -> bool:
+    """
+    :param pinned_until: Time until which the user is pinned to the
+        primary, or None.
+    :type pinned_until: float or None
+    :param generation: The current article generation.
+    :type generation: int
+    :return: Whether a read-only view may read from a replica now.
+    :rtype: bool
+    """
+    now = time.time()
+    if pinned_until is not None and pinned_until > now:
+        return False
+    return generation / 1000 + pin_seconds() <= now
+
+
+def read_from_replicas(view_func: Callable) -> Callable:
+    """
+    View decorator that sends the reads of a read-only view to the
+    replicas, unless the user or the content changed recently (see the
+    module documentation).
+
+    The user is loaded before the replicas are selected, so sessions and
+    accounts are always read from the primary. On DRF views, decorate
+    ``list`` or ``retrieve`` rather than ``dispatch``, so authentication
+    runs first.
+
+    :param view_func: A function view, or an async one.
+    :type view_func: Callable
+    :return: The wrapped view.
+    :rtype: Callable
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request: HttpRequest, *args,
+                                **kwargs) -> HttpResponse:
+            allowed = False
+            if replica_aliases():
+                await request.auser()
+                allowed = _replicas_allowed(
+                    await request.session.aget(PIN_SESSION_KEY),
+                    await aget_generation())
+            token = _use_replicas.set(allowed)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _use_replicas.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        allowed = False
+        if replica_aliases():
+            # Resolves the lazy user while reads still go to the primary.
+            request.user.pk
+            allowed = _replicas_allowed(
+                request.session.get(PIN_SESSION_KEY), get_generation())
+        token = _use_replicas.set(allowed)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _use_replicas.reset(token)
+    return wrapper
@@ -0,0 +1,326 @@
+"""
+Full-text search over approved articles and newsletters.
+
+The search index is an inverted index stored in two tables:
+:class:`~newsapp.models.SearchDocument` holds one row per indexed
+article or newsletter with its length, and
+:class:`~newsapp.models.SearchPosting` holds one row per term and
+document with the term's frequency. Documents are re-indexed whenever an
+approved article or newsletter is saved, and dropped when one is
+withdrawn or deleted, so the index never needs a full rebuild; the
+``rebuild_search_index`` command exists for data loaded without model
+signals. :class:`~newsapp.models.SearchCorpus` keeps the number and
+total length of the documents of each kind, updated in the same
+transactions.
+
+Queries are ranked with Okapi BM25. A query word of at least
+``SEARCH_MIN_PREFIX`` characters ending in ``*`` matches the first
+``SEARCH_PREFIX_EXPANSION`` terms starting with it; shorter ones are
+looked up as whole words. Terms are stored with a binary collation, so
+both exact and prefix lookups are range scans over the
+``(term, document)`` index, a search never reads the article text, and
+it works the same on SQLite, MySQL and PostgreSQL. A search reads at
+most ``SEARCH_MAX_POSTINGS`` postings; queries matching more are ranked
+on those.
+"""
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple, Type, Union
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Model, Sum
+
+from .models import Article, Newsletter, SearchCorpus, SearchDocument, \
+    SearchPosting
+
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 3
+MAX_TERM_LENGTH = SearchPosting._meta.get_field('term').max_length
+
+KINDS: Dict[Type[Model], str] = {
+    Article: SearchDocument.KIND_ARTICLE,
+    Newsletter: SearchDocument.KIND_NEWSLETTER,
+}
+MODELS: Dict[str, Type[Model]] = {
+    kind: model for model, kind in KINDS.items()
+}
+
+_WORD = re.compile(r'\w+')
+_QUERY_WORD = re.compile(r'(\w+)(\*?)')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into lower-case terms.
+
+    :param text: The text to split.
+    :type text: str
+    :return: The terms, in order, truncated to the maximum term length.
+    :rtype: list[str]
+    """
+    return [word[:MAX_TERM_LENGTH] for word in _WORD.findall(text.lower())]
+
+
+def document_terms(title: str, content: str) -> Counter:
+    """
+    Counts the terms of a document, weighting title terms by
+    ``TITLE_WEIGHT``.
+
+    :param title: The document title.
+    :type title: str
+    :param content: The document body.
+    :type content: str
+    :return: Term frequencies.
+    :rtype: Counter
+    """
+    terms = Counter(tokenize(content))
+    for term in tokenize(title):
+        terms[term] += TITLE_WEIGHT
+    return terms
+
+
+def _update_corpus(kind: str, documents: int, length: int) -> None:
+    """
+    Adds to the document count and total length of a kind. Call it in
+    the transaction that changes the documents.
+
+    :param kind: ``'article'`` or ``'newsletter'``.
+    :type kind: str
+    :param documents: Change in the number of documents.
+    :type documents: int
+    :param length: Change in their total length.
+    :type length: int
+    :return: None
+    """
+    if not documents and not length:
+        return
+    corpus = SearchCorpus.objects.filter(kind=kind)
+    changes = {'documents': F('documents') + documents,
+               'total_length': F('total_length') + length}
+    if not corpus.update(**changes):
+        SearchCorpus.objects.get_or_create(kind=kind)
+        corpus.update(**changes)
+
+
+def index_document(instance: Union[Article, Newsletter]) -> None:
+    """
+    Adds an article or newsletter to the index, replacing its previous
+    postings. Unapproved instances are removed from the index instead.
+
+    :param instance: The article or newsletter.
+    :return: None
+    """
+    if not instance.approved:
+        remove_document(instance)
+        return
+    kind = KINDS[type(instance)]
+    terms = document_terms(instance.title, instance.content)
+    length = sum(terms.values())
+    with transaction.atomic():
+        document = SearchDocument.objects.select_for_update().filter(
+            kind=kind, object_id=instance.pk).first()
+        if document is None:
+            document = SearchDocument.objects.create(
+                kind=kind, object_id=instance.pk, length=length)
+            _update_corpus(kind, 1, length)
+        else:
+            document.postings.all().delete()
+            _update_corpus(kind, 0, length - document.length)
+            document.length = length
+            document.save(update_fields=['length'])
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for term, frequency in terms.items()
+        ])
+
+
+def remove_document(instance: Union[Article, Newsletter]) -> None:
+    """
+    Removes an article or newsletter and its postings from the index.
+
+    :param instance: The article or newsletter.
+    :return: None
+    """
+    kind = KINDS[type(instance)]
+    with transaction.atomic():
+        document = SearchDocument.objects.select_for_update().filter(
+            kind=kind, object_id=instance.pk).first()
+        if document is not None:
+            document.delete()
+            _update_corpus(kind, -1, -document.length)
+
+
+def index_documents(instances: Iterable[Union[Article, Newsletter]]
+                    ) -> int:
+    """
+    Indexes many approved articles and newsletters with a fixed number
+    of queries, replacing any previous postings. Unapproved instances are
+    skipped. Used by bulk loads, which bypass the model signals.
+
+    :param instances: The articles and newsletters.
+    :return: The number of documents indexed.
+    :rtype: int
+    """
+    by_kind: Dict[str, Dict[int, Counter]] = {}
+    for instance in instances:
+        if instance.approved:
+            by_kind.setdefault(KINDS[type(instance)], {})[instance.pk] = \
+                document_terms(instance.title, instance.content)
+    with transaction.atomic():
+        for kind, documents in by_kind.items():
+            existing = SearchDocument.objects.filter(
+                kind=kind, object_id__in=list(documents))
+            replaced = existing.aggregate(count=Count('id'),
+                                          total=Sum('length'))
+            existing.delete()
+            _update_corpus(
+                kind, len(documents) - replaced['count'],
+                sum(sum(terms.values()) for terms in documents.values())
+                - (replaced['total'] or 0))
+            SearchDocument.objects.bulk_create([
+                SearchDocument(kind=kind, object_id=object_id,
+                               length=sum(terms.values()))
+                for object_id, terms in documents.items()
+            ])
+            # Read the ids back; not every database returns them.
+            document_ids = dict(SearchDocument.objects.filter(
+                kind=kind, object_id__in=list(documents)
+            ).values_list('object_id', 'id'))
+            SearchPosting.objects.bulk_create([
+                SearchPosting(term=term, document_id=document_ids[object_id],
+                              frequency=frequency)
+                for object_id, terms in documents.items()
+                for term, frequency in terms.items()
+            ], batch_size=5000)
+    return sum(len(documents) for documents in by_kind.values())
+
+
+def rebuild_index(batch_size: int = 1000) -> int:
+    """
+    Rebuilds the whole index from the approved articles and newsletters.
+
+    :param batch_size: Documents indexed per batch.
+    :type batch_size: int
+    :return: The number of documents indexed.
+    :rtype: int
+    """
+    SearchDocument.objects.all().delete()
+    SearchCorpus.objects.all().delete()
+    count = 0
+    for model in KINDS:
+        batch = []
+        for instance in model.objects.filter(approved=True).iterator(
+                chunk_size=batch_size):
+            batch.append(instance)
+            if len(batch) >= batch_size:
+                count += index_documents(batch)
+                batch = []
+        count += index_documents(batch)
+    return count
+
+
+def parse_query(query: str) -> List[Tuple[str, bool]]:
+    """
+    Parses a search query into terms.
+
+    :param query: The query text. Words ending in ``*`` are prefixes,
+        unless shorter than the ``SEARCH_MIN_PREFIX`` setting.
+    :type query: str
+    :return: Distinct ``(term, is_prefix)`` pairs.
+    :rtype: list[tuple]
+    """
+    min_prefix = getattr(settings, 'SEARCH_MIN_PREFIX', 3)
+    terms = []
+    for word, star in _QUERY_WORD.findall(query.lower()):
+        word = word[:MAX_TERM_LENGTH]
+        term = (word, bool(star) and len(word) >= min_prefix)
+        if term not in terms:
+            terms.append(term)
+    return terms
+
+
+def _prefix_end(prefix: str) -> str:
+    """
+    :param prefix: A non-empty term prefix.
+    :type prefix: str
+    :return: The smallest string greater than every string starting
+        with ``prefix`` in code point order: the prefix with its last
+        character incremented.
+    :rtype: str
+    """
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _expand(terms: List[Tuple[str, bool]]) -> List[str]:
+    """
+    Replaces each prefix among parsed query terms with the first
+    ``SEARCH_PREFIX_EXPANSION`` indexed terms starting with it. A prefix
+    ``p`` is looked up as the range ``p <= term < _prefix_end(p)``,
+    which the binary collation of the term column keeps exact on every
+    database.
+
+    :param terms: Parsed ``(term, is_prefix)`` pairs.
+    :type terms: list[tuple]
+    :return: The distinct terms to look up.
+    :rtype: list[str]
+    """
+    expansion = getattr(settings, 'SEARCH_PREFIX_EXPANSION', 50)
+    expanded = []
+    for term, prefix in terms:
+        if prefix:
+            expanded.extend(SearchPosting.objects.filter(
+                term__gte=term, term__lt=_prefix_end(term)
+            ).order_by('term').values_list(
+                'term', flat=True).distinct()[:expansion])
+        else:
+            expanded.append(term)
+    return list(dict.fromkeys(expanded))
+
+
+def search(query: str, kind: str = SearchDocument.KIND_ARTICLE,
+           limit: int = None) -> List[Tuple[int, float]]:
+    """
+    Ranks the indexed documents of one kind against a query with BM25.
+
+    :param query: The query text.
+    :type query: str
+    :param kind: ``'article'`` or ``'newsletter'``.
+    :type kind: str
+    :param limit: Maximum number of results; defaults to the
+        ``SEARCH_RESULT_LIMIT`` setting.
+    :type limit: int
+    :return: ``(object_id, score)`` pairs, best match first; ties go to
+        the newest object.
+    :rtype: list[tuple]
+    """
+    terms = parse_query(query)
+    if not terms:
+        return []
+    if limit is None:
+        limit = getattr(settings, 'SEARCH_RESULT_LIMIT', 20)
+    corpus = SearchCorpus.objects.filter(kind=kind).first()
+    if corpus is None or not corpus.documents:
+        return []
+    average_length = corpus.total_length / corpus.documents or 1
+    # The document frequencies are counted from the matching postings
+    # themselves; a GROUP BY over the terms would need a sort.
+    postings = list(SearchPosting.objects.filter(
+        term__in=_expand(terms), document__kind=kind
+    ).values_list('term', 'document__object_id', 'frequency',
+                  'document__length')[
+        :getattr(settings, 'SEARCH_MAX_POSTINGS', 10000)])
+    idf = {
+        term: math.log(1 + (corpus.documents - df + 0.5) / (df + 0.5))
+        for term, df in Counter(row[0] for row in postings).items()
+    }
+    scores: Dict[int, float] = {}
+    for term, object_id, frequency, length in postings:
+        norm = K1 * (1 - B + B * length / average_length)
+        scores[object_id] = scores.get(object_id, 0.0) + idf[term] * (
+            frequency * (K1 + 1) / (frequency + norm))
+    return heapq.nlargest(limit, scores.items(),
+                          key=lambda item: (item[1], item[0]))
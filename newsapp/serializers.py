@@ -1,14 +1,32 @@
 from rest_framework import serializers
-from .models import Article, Journalist, Publisher
+from .models import Article, Journalist, Newsletter, Publisher
 
 
-class ArticleSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that lets callers restrict the serialized fields.
+
+    Passing ``fields=[...]`` when constructing the serializer keeps only
+    the named fields, so list endpoints can honour a ``?fields=`` query
+    parameter and leave out large columns such as article content.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class ArticleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer class for the Article model.
 
     This class is responsible for serializing and deserializing
     article objects, allowing them to be easily converted between
-    Python native data types and JSON for APIs.
+    Python native data types and JSON for APIs. A ``fields`` keyword
+    argument limits the output to a sparse fieldset.
 
     :ivar Meta: Inner class providing metadata about the
         serializer, including the associated model and the
@@ -17,7 +35,7 @@ class ArticleSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Article
-        fields = '__all__'
+        exclude = ('feed_pending',)
 
 class JournalistSerializer(serializers.ModelSerializer):
     """
@@ -55,3 +73,180 @@ class PublisherSerializer(serializers.ModelSerializer):
     class Meta:
         model = Publisher
         fields = '__all__'
+
+
+class NewsletterSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer class for the Newsletter model, used by the search API.
+
+    :ivar Meta: Inner class providing the associated model and the fields
+        to include.
+    :type Meta: type
+    """
+    class Meta:
+        model = Newsletter
+        fields = '__all__'
+
+
+class IdChangesSerializer(serializers.Serializer):
+    """
+    Validates the ids to add and remove for one kind of subscription.
+
+    :ivar add: Ids to subscribe to.
+    :type add: serializers.ListField
+    :ivar remove: Ids to unsubscribe from.
+    :type remove: serializers.ListField
+    """
+    add = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        default=list)
+    remove = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), required=False,
+        default=list)
+
+
+class SubscriptionChangeSerializer(serializers.Serializer):
+    """
+    Validates a bulk subscription change such as
+    ``{"publishers": {"add": [1, 2]}, "journalists": {"remove": [3]}}``.
+    Journalists are identified by their ``Journalist`` id.
+
+    :ivar publishers: Publisher ids to add and remove.
+    :type publishers: IdChangesSerializer
+    :ivar journalists: Journalist ids to add and remove.
+    :type journalists: IdChangesSerializer
+    """
+    publishers = IdChangesSerializer(required=False)
+    journalists = IdChangesSerializer(required=False)
+
+
+class ValuesSerializer:
+    """
+    Fast read-only serializer for list endpoints.
+
+    Produces the same representation as a ``ModelSerializer`` from
+    ``QuerySet.values()`` rows instead of model instances. The fields of
+    the model serializer are inspected once, when this object is built,
+    and each row is then turned into a dict with plain lookups:
+    primary-key relations are read from their ``*_id`` column, many-to-
+    many relations are loaded for the whole list with one query on the
+    through table, and only fields whose representation differs from the
+    database value (such as datetimes) go through the DRF field.
+
+    Use :meth:`for_serializer` to share instances between requests.
+
+    :ivar model: The serialized model.
+    :type model: type
+    :ivar columns: Column names to pass to ``values()``.
+    :type columns: list[str]
+    """
+    # Field types whose representation is the database value itself.
+    PLAIN_FIELDS = (serializers.BooleanField, serializers.CharField,
+                    serializers.IntegerField)
+    _instances = {}
+
+    def __init__(self, serializer_class: type, fields=None):
+        kwargs = {} if fields is None else {'fields': fields}
+        serializer = serializer_class(**kwargs)
+        self.model = serializer_class.Meta.model
+        opts = self.model._meta
+        self.pk = opts.pk.attname
+        self.columns = [self.pk]
+        self._plan = []
+        self._many = []
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.ManyRelatedField):
+                model_field = opts.get_field(field.source)
+                self._plan.append((name, None, None))
+                self._many.append((name, model_field.remote_field.through,
+                                   model_field.m2m_field_name(),
+                                   model_field.m2m_reverse_field_name()))
+                continue
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                column = opts.get_field(field.source).attname
+                convert = None
+            else:
+                column = field.source
+                convert = None if type(field) in self.PLAIN_FIELDS \
+                    else field.to_representation
+            if column not in self.columns:
+                self.columns.append(column)
+            self._plan.append((name, column, convert))
+
+    @classmethod
+    def for_serializer(cls, serializer_class: type,
+                       fields=None) -> 'ValuesSerializer':
+        """
+        Returns a shared instance for a serializer class and sparse
+        fieldset.
+
+        :param serializer_class: The ``ModelSerializer`` to mirror.
+        :type serializer_class: type
+        :param fields: Field names to keep, or None for all.
+        :type fields: list[str] or None
+        :return: The fast serializer.
+        :rtype: ValuesSerializer
+        """
+        key = (serializer_class, None if fields is None else tuple(fields))
+        instance = cls._instances.get(key)
+        if instance is None:
+            instance = cls._instances[key] = cls(serializer_class, fields)
+        return instance
+
+    def serialize(self, rows) -> list:
+        """
+        Serializes ``values()`` rows.
+
+        :param rows: Rows of a queryset restricted to :attr:`columns`.
+        :return: The representations, in the order of ``rows``.
+        :rtype: list[dict]
+        """
+        rows = list(rows)
+        related = {}
+        if self._many and rows:
+            for name, queryset in self._related_querysets(rows):
+                related[name] = self._group(queryset)
+        return self._represent(rows, related)
+
+    async def aserialize(self, rows) -> list:
+        """
+        Async version of :meth:`serialize`, for async views.
+
+        :param rows: Rows already read from the database.
+        :type rows: list
+        :return: The representations, in the order of ``rows``.
+        :rtype: list[dict]
+        """
+        related = {}
+        if self._many and rows:
+            for name, queryset in self._related_querysets(rows):
+                related[name] = self._group([pair async for pair in queryset])
+        return self._represent(rows, related)
+
+    def _related_querysets(self, rows):
+        ids = [row[self.pk] for row in rows]
+        for name, through, source, target in self._many:
+            yield name, through.objects.filter(
+                **{f'{source}__in': ids}
+            ).order_by(target).values_list(source, target)
+
+    @staticmethod
+    def _group(pairs) -> dict:
+        by_owner = {}
+        for owner, target_id in pairs:
+            by_owner.setdefault(owner, []).append(target_id)
+        return by_owner
+
+    def _represent(self, rows: list, related: dict) -> list:
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in self._plan:
+                if column is None:
+                    item[name] = related[name].get(row[self.pk], [])
+                    continue
+                value = row[column]
+                item[name] = value if convert is None or value is None \
+                    else convert(value)
+            data.append(item)
+        return data
@@ -1,63 +1,186 @@
-import requests
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, \
+    post_migrate, post_save
 from django.dispatch import receiver
-from django.core.mail import send_mail
 from django.contrib.auth.models import Group
-from .models import Article, CustomUser, Journalist
+from . import feeds, search
+from .access import bump_access_generation, invalidate_cached_user, \
+    invalidate_user_access
+from .cache import bump_generation
+from .digests import MODE_DIGEST, enqueue_digest_items, \
+    notification_mode
+from .models import Article, CustomUser, Journalist, Newsletter, Publisher
+from .notifications import enqueue_article_notification, \
+    enqueue_newsletter
+from .roles import clear_role_group_cache
+from .social import enqueue_article_post
+from .tracking import approving
 
 
-@receiver(post_save, sender=Article)
-def notify_on_approval(sender, instance, created, **kwargs):
+@receiver(approving, sender=Article)
+def notify_on_approval(sender, instance, **kwargs):
     """
-    This function is a signal receiver that triggers on the post_save
-    event of the Article model.
-    When an article is approved, it gathers the email addresses
-    of subscribers of the article's publisher and journalist,
-    and sends a notification email to these recipients informing them about
-    the approval of the new article.
+    This function is a signal receiver that triggers on the approved
+    transition of the Article model, inside the transaction that
+    approves the article, so the notification is queued if and only if
+    the approval commits.
+    When an article is approved, it queues a notification for the
+    subscribers of the article's publisher and journalist in the
+    notification outbox. The emails themselves are sent in batches by the
+    ``send_notifications`` management command, so saving the article only
+    costs a single INSERT. An article is only ever queued once.
+    With ``NOTIFICATION_MODE = 'digest'`` the article is queued for each
+    subscriber's next digest instead (see :mod:`newsapp.digests`).
 
     :param sender: The model class that is the sender of the signal.
-    :param instance: The actual instance of the Article model that was saved.
-    :param created: A boolean indicating whether a new instance was created.
+    :param instance: The actual instance of the Article model that was
+        approved.
     :param kwargs: Additional keyword arguments passed by the signal.
     :return: None
     """
-    if instance.approved:
-        publisher_subs = instance.publisher.subscribed_readers.all()
-        journalist_subs = instance.journalist.subscribed_readers.all()
-        recipients = set([u.email for u in publisher_subs]
-                         + [u.email for u in journalist_subs])
-        if recipients:
-            send_mail(
-                subject=f"New Article Approved: {instance.title}",
-                message=instance.content,
-                from_email='no-reply@newsportal.com',
-                recipient_list=list(recipients),
-            )
+    if notification_mode() == MODE_DIGEST:
+        enqueue_digest_items(instance)
+    else:
+        enqueue_article_notification(instance)
+
+@receiver(approving, sender=Newsletter)
+def dispatch_on_newsletter_approval(sender, instance, **kwargs):
+    """
+    Signal receiver that queues an approved newsletter for distribution
+    to the subscribers of its publisher and journalist, once, inside the
+    approving transaction, so it is queued if and only if the approval
+    commits. The emails are sent by the
+    ``send_notifications`` management command, like article
+    notifications.
+
+    :param sender: The model class that is the sender of the signal.
+    :param instance: The newsletter that was approved.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    enqueue_newsletter(instance)
+
+
+@receiver(post_delete, sender=Group)
+def forget_deleted_role_group(sender, instance, **kwargs):
+    """
+    Signal handler that empties the process-level role group cache when
+    a ``Group`` is deleted, so the deleted group is never assigned again,
+    and invalidates every cached access, which may include its
+    permissions, once the transaction commits.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The group that was deleted.
+    :param kwargs: Additional keyword arguments passed by the
+        post_delete signal.
+    :return: None
+    """
+    clear_role_group_cache()
+    transaction.on_commit(bump_access_generation)
+
+
+post_migrate.connect(clear_role_group_cache,
+                     dispatch_uid='newsapp.clear_role_group_cache')
+
 
 @receiver(post_save, sender=CustomUser)
-def assign_user_group(sender, instance, created, **kwargs):
+def invalidate_access_on_role_change(sender, instance, created, **kwargs):
     """
-    Signal handler that assigns a user to a group based on their role
-    upon saving a CustomUser instance. This function ensures that the user
-    is assigned to the
-    appropriate group aligned with their role and clears any previous group
-    assignments prior to updating.
+    Signal handler that drops a user's cached role and permissions (see
+    :mod:`newsapp.access`) when their role changes, and any entry left
+    under a new user's id (for example by a deleted user).
+
+    A role change is applied once the transaction commits, so that a
+    concurrent request cannot cache the old role again after it is
+    dropped; a new user has no committed access to re-cache.
 
     :param sender: The model class that sends the signal.
-    :param instance: The instance of the model that is being saved.
-    :param created: Boolean indicating if the instance was created (True)
-        or updated (False).
+    :param instance: The user that was saved.
+    :param created: Whether the user was just created.
     :param kwargs: Additional keyword arguments passed by the
         post_save signal.
     :return: None
     """
-    if instance.role:
-        group, _ = Group.objects.get_or_create(
-            name=instance.role.capitalize()
-        )
-        instance.groups.clear()
-        instance.groups.add(group)
+    if created:
+        invalidate_user_access([instance.pk])
+    elif instance.has_changed('role'):
+        user_ids = [instance.pk]
+        transaction.on_commit(lambda: invalidate_user_access(user_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def forget_cached_user(sender, instance, **kwargs):
+    """
+    Signal handler that drops a saved or deleted user from the cache the
+    authentication backend loads request users from, so the next request
+    sees the change (including a new password, which ends the user's
+    other sessions).
+
+    A changed or deleted user is dropped once the transaction commits;
+    dropping it earlier would let a concurrent request cache the old row
+    again (a deactivated user, or the old password hash) with nothing
+    left to drop it. A new user has no committed row to re-cache, so any
+    entry left under its id (after a rollback) is dropped at once.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The user that was saved or deleted.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    user_id = instance.pk
+    if kwargs.get('created'):
+        invalidate_cached_user(user_id)
+    else:
+        transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def invalidate_access_on_permission_change(sender, instance, action,
+                                           reverse, pk_set, **kwargs):
+    """
+    Signal handler that drops the cached access of users whose direct
+    permissions change, from either side of the relation, once the
+    transaction commits.
+
+    Group membership follows the role (see ``CustomUser.sync_role``) and
+    is covered by :func:`invalidate_access_on_role_change`. There is
+    deliberately no receiver on ``groups``: any receiver would stop
+    ``groups.add()`` from using its one-query fast path on user creation.
+
+    :param sender: The through model of ``user_permissions``.
+    :param instance: The user, or the permission when ``reverse``.
+    :param action: The ``m2m_changed`` action.
+    :param reverse: Whether the change was made from the other side.
+    :param pk_set: Ids of the related objects added or removed.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        user_ids = [instance.pk]
+        transaction.on_commit(lambda: invalidate_user_access(user_ids))
+    else:
+        # Clearing from the permission side does not say which users
+        # were affected.
+        transaction.on_commit(bump_access_generation)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_access_on_group_permissions(sender, action, **kwargs):
+    """
+    Signal handler that invalidates every cached access when a group's
+    permissions change, since any number of users may be affected, once
+    the transaction commits.
+
+    :param sender: The through model of ``Group.permissions``.
+    :param action: The ``m2m_changed`` action.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(bump_access_generation)
 
 @receiver(post_save, sender=CustomUser)
 def create_journalist_for_user(sender: type, instance: CustomUser,
@@ -86,43 +209,229 @@ def create_journalist_for_user(sender: type, instance: CustomUser,
         Journalist.objects.create(user=instance, name=instance.username)
 
 
-@receiver(post_save, sender=Article)
-def post_article_to_x(sender: type, instance: Article, created: bool,
+@receiver(approving, sender=Article)
+def post_article_to_x(sender: type, instance: Article,
                       **kwargs: dict) -> None:
     """
-    Signal receiver function triggered after saving an Article instance.
-    Its purpose is to post the approved article to X (formerly Twitter) by
-    sending a POST request using the API. The function ensures that only
-    newly approved articles are posted.
+    Signal receiver function triggered once, inside the approving
+    transaction, when an Article instance becomes approved, so the post
+    is queued if and only if the approval commits.
+    Its purpose is to queue the approved article for posting to X
+    (formerly Twitter). The HTTP request itself is made by the
+    ``publish_to_x`` management command, outside the save transaction, so
+    a slow X API never holds up the request that approved the article.
+    Each article is queued at most once, so it is posted only once.
     No return value is expected.
 
     :param sender: The sender of the signal.
     :type sender: type
-    :param instance: The instance of the Article model being saved.
+    :param instance: The instance of the Article model that was approved.
     :type instance: Article
-    :param created: Indicates whether the instance was created or updated.
-    :type created: bool
     :param kwargs: Additional arguments passed to the signal receiver.
     :type kwargs: dict
     :return: None
     """
-    # Only post if the article has just been approved
+    enqueue_article_post(instance)
+
+
+@receiver(approving, sender=Article)
+def fan_out_to_feeds(sender: type, instance: Article, **kwargs) -> None:
+    """
+    Signal receiver that adds a newly approved article to the
+    precomputed feeds of the readers subscribed to its publisher or
+    journalist, inside the approving transaction.
+
+    :param sender: The sender of the signal.
+    :type sender: type
+    :param instance: The article that was approved.
+    :type instance: Article
+    :param kwargs: Additional arguments passed to the signal receiver.
+    :return: None
+    """
+    feeds.fan_out_article(instance)
+
+
+@receiver(m2m_changed, sender=CustomUser.subscriptions_publishers.through)
+def update_feeds_for_publishers(sender, instance, action, reverse,
+                                pk_set, **kwargs) -> None:
+    """
+    Signal receiver that keeps reader feeds in step with publisher
+    subscriptions: subscribing backfills the publisher's newest articles,
+    unsubscribing removes entries no other subscription covers.
+
+    Changes made from either side of the relation are handled, i.e. both
+    ``reader.subscriptions_publishers.add(publisher)`` and
+    ``publisher.subscribed_readers.add(reader)``.
+
+    :param sender: The subscription through model.
+    :param instance: The reader, or the publisher when ``reverse``.
+    :param action: The ``m2m_changed`` action.
+    :param reverse: Whether the change was made from the publisher side.
+    :param pk_set: Ids of the related objects added or removed.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    if action == 'post_add':
+        if reverse:
+            feeds.backfill_publisher(pk_set, [instance.pk])
+        else:
+            feeds.backfill_publisher([instance.pk], pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            for reader_id in pk_set:
+                feeds.trim_publisher(reader_id, [instance.pk])
+        else:
+            feeds.trim_publisher(instance.pk, pk_set)
+    elif action == 'pre_clear':
+        if reverse:
+            for reader_id in instance.subscribed_readers.values_list(
+                    'id', flat=True):
+                feeds.trim_publisher(reader_id, [instance.pk])
+        else:
+            feeds.trim_publisher(
+                instance.pk,
+                instance.subscriptions_publishers.values_list('id',
+                                                              flat=True))
+
+
+@receiver(m2m_changed, sender=CustomUser.subscriptions_journalists.through)
+def update_feeds_for_journalists(sender, instance, action, reverse,
+                                 pk_set, **kwargs) -> None:
+    """
+    Signal receiver that keeps reader feeds in step with journalist
+    subscriptions: subscribing backfills the journalist's newest
+    articles, unsubscribing removes entries no other subscription covers.
+
+    :param sender: The subscription through model.
+    :param instance: The reader, or the journalist when ``reverse``.
+    :param action: The ``m2m_changed`` action.
+    :param reverse: Whether the change was made from the journalist side.
+    :param pk_set: Ids of the related users added or removed.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    if action == 'post_add':
+        if reverse:
+            feeds.backfill_journalist(pk_set, [instance.pk])
+        else:
+            feeds.backfill_journalist([instance.pk], pk_set)
+    elif action == 'post_remove':
+        if reverse:
+            for reader_id in pk_set:
+                feeds.trim_journalist(reader_id, [instance.pk])
+        else:
+            feeds.trim_journalist(instance.pk, pk_set)
+    elif action == 'pre_clear':
+        if reverse:
+            for reader_id in instance.subscribed_readers.values_list(
+                    'id', flat=True):
+                feeds.trim_journalist(reader_id, [instance.pk])
+        else:
+            feeds.trim_journalist(
+                instance.pk,
+                instance.subscriptions_journalists.values_list('id',
+                                                               flat=True))
+
+
+def bump_generation_on_commit() -> None:
+    """
+    Starts a new article generation once the current transaction
+    commits. Bumping earlier would let a concurrent request cache the
+    uncommitted state's predecessor under the new generation, where no
+    later bump would replace it.
+
+    :return: None
+    """
+    transaction.on_commit(bump_generation)
+
+
+@receiver(post_save, sender=Article)
+def invalidate_listings_on_save(sender, instance, **kwargs):
+    """
+    Signal handler that starts a new article generation, invalidating the
+    cached public listings, when a published article is edited or an
+    article is approved or withdrawn. Saving a pending article leaves the
+    listings untouched.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The article that was saved.
+    :param kwargs: Additional keyword arguments passed by the
+        post_save signal.
+    :return: None
+    """
+    if instance.approved or instance.has_changed('approved'):
+        bump_generation_on_commit()
+
+
+@receiver(post_delete, sender=Article)
+def invalidate_listings_on_delete(sender, instance, **kwargs):
+    """
+    Signal handler that invalidates the cached public listings when an
+    article is deleted.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The article that was deleted.
+    :param kwargs: Additional keyword arguments passed by the
+        post_delete signal.
+    :return: None
+    """
+    if instance.approved:
+        bump_generation_on_commit()
+
+
+@receiver(post_save, sender=Publisher)
+@receiver(post_delete, sender=Publisher)
+def invalidate_listings_on_publisher_change(sender, instance, **kwargs):
+    """
+    Signal handler that starts a new article generation when a publisher
+    is created, renamed or deleted, since the publisher list and the
+    article listings show publisher names.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The publisher that changed.
+    :param kwargs: Additional keyword arguments passed by the signal.
+    :return: None
+    """
+    bump_generation_on_commit()
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_save, sender=Newsletter)
+def update_search_index(sender, instance, **kwargs):
+    """
+    Signal handler that keeps the search index in step with approved
+    articles and newsletters: an approved one is (re-)indexed when it is
+    approved or its title or content changes, and one that was withdrawn
+    is removed. Other saves do not touch the index.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The article or newsletter that was saved.
+    :param kwargs: Additional keyword arguments passed by the
+        post_save signal.
+    :return: None
+    """
+    fields = ('approved', 'title', 'content')
+    update_fields = kwargs.get('update_fields')
+    if update_fields is not None:
+        fields = [name for name in fields if name in update_fields]
+    changed = [name for name in fields if instance.has_changed(name)]
+    if 'approved' in changed or (
+            instance.approved and (changed or kwargs.get('created'))):
+        search.index_document(instance)
+
+
+@receiver(post_delete, sender=Article)
+@receiver(post_delete, sender=Newsletter)
+def remove_from_search_index(sender, instance, **kwargs):
+    """
+    Signal handler that removes a deleted article or newsletter from the
+    search index.
+
+    :param sender: The model class that sends the signal.
+    :param instance: The article or newsletter that was deleted.
+    :param kwargs: Additional keyword arguments passed by the
+        post_delete signal.
+    :return: None
+    """
     if instance.approved:
-        x_api_url = "https://api.twitter.com/2/tweets"
-        bearer_token = "YOUR_X_BEARER_TOKEN"  # Store securely in environment variables!
-
-        headers = {
-            "Authorization": f"Bearer {bearer_token}",
-            "Content-Type": "application/json"
-        }
-        data = {
-            "text": f"{instance.title}\n\n{instance.content[:250]}..."  # Plaintext preview
-        }
-        try:
-            response = requests.post(x_api_url, headers=headers, json=data)
-            if response.status_code == 201 or response.status_code == 200:
-                print("Article posted to X successfully.")
-            else:
-                print(f"Failed to post to X: {response.status_code} {response.text}")
-        except Exception as e:
-            print(f"Could not post article to X: {e}")
+        search.remove_document(instance)
@@ -0,0 +1,458 @@
+"""
+Background publishing of approved articles to X (formerly Twitter).
+
+Approving an article only queues a :class:`~newsapp.models.SocialPost`
+row; the ``publish_to_x`` management command drains the queue through
+:func:`publish_pending`, or :func:`apublish_pending` to keep several
+posts in flight at once. All requests go through one process-wide
+:class:`XClient`, whose ``requests.Session`` keeps a pool of TLS
+connections alive between posts.
+"""
+import asyncio
+import email.utils
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import List, Optional
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from .models import Article, SocialPost
+
+RETRY_STATUSES = {500, 502, 503, 504}
+
+
+class XPostError(Exception):
+    """
+    Raised when the X API rejects a post or cannot be reached after all
+    retries.
+    """
+
+
+class XPostUnknown(XPostError):
+    """
+    Raised when a post was sent but no answer arrived (for example the
+    read timed out), so X may or may not have published it. Such posts
+    are never sent again automatically.
+    """
+
+
+class XRateLimited(XPostError):
+    """
+    Raised when the X API answers ``429 Too Many Requests``.
+
+    :ivar retry_at: When the rate limit window resets.
+    :type retry_at: datetime
+    """
+
+    def __init__(self, retry_at: datetime) -> None:
+        super().__init__(f"Rate limited until {retry_at.isoformat()}")
+        self.retry_at = retry_at
+
+
+def _http_date(value: str) -> Optional[datetime]:
+    """
+    :param value: An HTTP date, such as ``Wed, 21 Oct 2015 07:28:00 GMT``.
+    :type value: str
+    :return: The aware datetime it stands for (UTC if it names no
+        zone), or None if it is not a valid date.
+    :rtype: datetime or None
+    """
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if timezone.is_naive(parsed):
+        parsed = parsed.replace(tzinfo=dt_timezone.utc)
+    return parsed
+
+
+def _retry_at(response: requests.Response) -> datetime:
+    """
+    Works out when a rate-limited request may be retried, from the
+    ``x-rate-limit-reset`` (epoch seconds) or ``Retry-After`` headers.
+
+    :param response: The ``429`` response.
+    :type response: requests.Response
+    :return: The time the rate limit resets, always timezone-aware; one
+        minute from now when the response carries no usable header.
+    :rtype: datetime
+    """
+    now = timezone.now()
+    reset = response.headers.get('x-rate-limit-reset')
+    if reset and reset.isdigit():
+        try:
+            return datetime.fromtimestamp(int(reset), tz=dt_timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            pass
+    retry_after = response.headers.get('Retry-After')
+    if retry_after:
+        if retry_after.isdigit():
+            return now + timedelta(seconds=int(retry_after))
+        parsed = _http_date(retry_after)
+        if parsed is not None:
+            return parsed
+    return now + timedelta(minutes=1)
+
+
+def _not_sent(error: requests.RequestException) -> bool:
+    """
+    :param error: An error raised by ``requests``.
+    :type error: requests.RequestException
+    :return: Whether the request failed while connecting, so nothing
+        reached the server.
+    :rtype: bool
+    """
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.ConnectionError) or not error.args:
+        return False
+    # Connection failures arrive wrapped in urllib3's MaxRetryError;
+    # errors on an open connection (e.g. "connection aborted") do not.
+    reason = getattr(error.args[0], 'reason', None)
+    return isinstance(reason, NewConnectionError)
+
+
+class XClient:
+    """
+    Thin client for the X "create post" endpoint.
+
+    The client owns a ``requests.Session`` mounted with a pooled
+    ``HTTPAdapter``, so consecutive posts reuse open TLS connections.
+    Every request is bounded by ``timeout``. Creating a post is not
+    idempotent, so only failures to connect (before anything was sent)
+    and 5xx responses are retried with exponential backoff; a request
+    that may have reached X without an answer raises
+    :class:`XPostUnknown` instead. ``429``
+    responses raise :class:`XRateLimited` straight away so the caller can
+    reschedule instead of sleeping through the window.
+
+    :ivar api_url: URL of the create post endpoint.
+    :type api_url: str
+    :ivar timeout: ``(connect, read)`` timeout in seconds.
+    :type timeout: tuple
+    :ivar max_retries: Retries after the first attempt for transient
+        failures.
+    :type max_retries: int
+    :ivar backoff: Base backoff in seconds, doubled after each retry.
+    :type backoff: float
+    :ivar session: The pooled HTTP session.
+    :type session: requests.Session
+    """
+
+    def __init__(self, api_url: str, bearer_token: str,
+                 timeout: tuple = (3.05, 10), max_retries: int = 3,
+                 backoff: float = 0.5, pool_size: int = 10) -> None:
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'Authorization': f"Bearer {bearer_token}",
+            'Content-Type': 'application/json',
+        })
+
+    def create_post(self, text: str) -> str:
+        """
+        Publishes a post and returns its identifier.
+
+        :param text: Text of the post.
+        :type text: str
+        :return: The identifier the API assigned to the post, or an empty
+            string if the response did not include one.
+        :rtype: str
+        :raises XRateLimited: If the API answers ``429``.
+        :raises XPostUnknown: If the request was sent but got no
+            response.
+        :raises XPostError: If the post is rejected or every attempt
+            failed.
+        """
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = self.session.post(self.api_url,
+                                             json={'text': text},
+                                             timeout=self.timeout)
+            except requests.RequestException as e:
+                if not _not_sent(e):
+                    raise XPostUnknown(f"No response from X: {e}") from e
+                error = XPostError(f"Could not reach X: {e}")
+                continue
+            if response.status_code in (200, 201):
+                try:
+                    return str(response.json()['data']['id'])
+                except (ValueError, KeyError, TypeError):
+                    return ''
+            if response.status_code == 429:
+                raise XRateLimited(_retry_at(response))
+            error = XPostError(
+                f"Failed to post to X: {response.status_code} "
+                f"{response.text}")
+            if response.status_code not in RETRY_STATUSES:
+                break
+        raise error
+
+    def close(self) -> None:
+        """
+        Closes the pooled connections held by the session.
+
+        :return: None
+        """
+        self.session.close()
+
+
+_client = None
+
+
+def get_client() -> XClient:
+    """
+    Returns the process-wide :class:`XClient`, creating it from the
+    ``X_*`` settings on first use.
+
+    :return: The shared client.
+    :rtype: XClient
+    """
+    global _client
+    if _client is None:
+        _client = XClient(
+            api_url=settings.X_API_URL,
+            bearer_token=settings.X_BEARER_TOKEN,
+            timeout=(settings.X_CONNECT_TIMEOUT, settings.X_READ_TIMEOUT),
+            max_retries=settings.X_MAX_RETRIES,
+            backoff=settings.X_RETRY_BACKOFF,
+            pool_size=settings.X_POOL_SIZE,
+        )
+    return _client
+
+
+def reset_client() -> None:
+    """
+    Closes and discards the shared client so the next call to
+    :func:`get_client` picks up changed settings.
+
+    :return: None
+    """
+    global _client
+    if _client is not None:
+        _client.close()
+    _client = None
+
+
+def post_text(article: Article) -> str:
+    """
+    Builds the plaintext preview posted for an article.
+
+    :param article: The article being posted.
+    :type article: Article
+    :return: The post text.
+    :rtype: str
+    """
+    return f"{article.title}\n\n{article.content[:250]}..."
+
+
+def enqueue_article_post(article: Article) -> Optional[SocialPost]:
+    """
+    Queues an approved article for publication to X.
+
+    Nothing is queued when ``X_POSTING_ENABLED`` is off. An article is
+    only ever queued once, so repeated saves are harmless.
+
+    :param article: The approved article.
+    :type article: Article
+    :return: The queued (or previously queued) row, or None when posting
+        is disabled.
+    :rtype: SocialPost or None
+    """
+    if not settings.X_POSTING_ENABLED:
+        return None
+    post, _ = SocialPost.objects.get_or_create(article=article)
+    return post
+
+
+@dataclass
+class PublishResult:
+    """
+    Summary of a single :func:`publish_pending` run.
+
+    :ivar posted: Number of articles posted.
+    :type posted: int
+    :ivar failed: Number of attempts that ended in an error.
+    :type failed: int
+    :ivar rate_limited: Whether the run stopped on a rate limit.
+    :type rate_limited: bool
+    """
+    posted: int = 0
+    failed: int = 0
+    rate_limited: bool = False
+
+
+def publish_pending(limit: Optional[int] = None,
+                    client: Optional[XClient] = None) -> PublishResult:
+    """
+    Posts queued articles whose ``next_attempt_at`` has passed.
+
+    Each row is claimed with :func:`claim_pending`, so concurrent workers
+    never post the same article, and posted outside any transaction, so
+    no row lock or connection is held while waiting for X. A rate limit
+    reschedules the row for the reset time and ends the run, since every
+    other request would be rejected too. Other failures back off
+    exponentially until ``X_MAX_ATTEMPTS`` is reached, after which the row
+    is marked ``failed``; so is a post with an unknown outcome
+    (:class:`XPostUnknown`), rather than risk posting it twice.
+
+    :param limit: Maximum number of rows to process.
+    :type limit: int or None
+    :param client: Client to post with; defaults to :func:`get_client`.
+    :type client: XClient or None
+    :return: A summary of the run.
+    :rtype: PublishResult
+    """
+    client = client or get_client()
+    result = PublishResult()
+    processed = 0
+    while not result.rate_limited and (limit is None or processed < limit):
+        posts = claim_pending(1)
+        if not posts:
+            break
+        processed += 1
+        try:
+            outcome = client.create_post(post_text(posts[0].article))
+        except XPostError as e:
+            outcome = e
+        _record_outcomes(posts, [outcome], result)
+    return result
+
+
+def _record_posted(post: SocialPost, remote_id: str) -> None:
+    post.status = SocialPost.STATUS_POSTED
+    post.remote_id = remote_id
+    post.posted_at = timezone.now()
+    post.save(update_fields=['status', 'remote_id', 'posted_at'])
+
+
+def _record_rate_limit(post: SocialPost, error: XRateLimited) -> None:
+    post.next_attempt_at = error.retry_at
+    post.last_error = str(error)
+    post.save(update_fields=['next_attempt_at', 'last_error'])
+
+
+def _record_failure(post: SocialPost, error: XPostError,
+                    now: datetime) -> None:
+    post.attempts += 1
+    post.last_error = str(error)
+    # A post that may have been published is left for manual retry.
+    if (isinstance(error, XPostUnknown)
+            or post.attempts >= settings.X_MAX_ATTEMPTS):
+        post.status = SocialPost.STATUS_FAILED
+    else:
+        post.next_attempt_at = now + timedelta(
+            seconds=30 * 2 ** (post.attempts - 1))
+    post.save(update_fields=['attempts', 'last_error', 'status',
+                             'next_attempt_at'])
+
+
+def claim_pending(count: int) -> List[SocialPost]:
+    """
+    Claims up to ``count`` queued posts that are due, for posting outside
+    a transaction.
+
+    The rows are locked only while their ``next_attempt_at`` is pushed
+    ``X_CLAIM_LEASE`` seconds ahead, which hides them from other workers
+    until the claimant records the outcome; a worker that dies
+    mid-post only delays its rows by the lease.
+
+    :param count: Maximum number of posts to claim.
+    :type count: int
+    :return: The claimed posts, with their articles.
+    :rtype: list[SocialPost]
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        posts = list(SocialPost.objects.select_for_update(
+            skip_locked=True
+        ).filter(
+            status=SocialPost.STATUS_PENDING,
+        ).exclude(
+            next_attempt_at__gt=now
+        ).select_related('article').order_by('created_at', 'id')[:count])
+        if posts:
+            SocialPost.objects.filter(pk__in=[p.pk for p in posts]).update(
+                next_attempt_at=now + timedelta(
+                    seconds=getattr(settings, 'X_CLAIM_LEASE', 300)))
+    return posts
+
+
+def _record_outcomes(posts: List[SocialPost], outcomes: list,
+                     result: PublishResult) -> None:
+    now = timezone.now()
+    unexpected = None
+    for post, outcome in zip(posts, outcomes):
+        if isinstance(outcome, XRateLimited):
+            _record_rate_limit(post, outcome)
+            result.rate_limited = True
+        elif isinstance(outcome, XPostError):
+            _record_failure(post, outcome, now)
+            result.failed += 1
+        elif isinstance(outcome, BaseException):
+            # Left claimed; the post is retried once the lease expires.
+            unexpected = unexpected or outcome
+        else:
+            _record_posted(post, outcome)
+            result.posted += 1
+    if unexpected is not None:
+        raise unexpected
+
+
+async def apublish_pending(limit: Optional[int] = None,
+                           concurrency: Optional[int] = None,
+                           client: Optional[XClient] = None
+                           ) -> PublishResult:
+    """
+    Posts queued articles like :func:`publish_pending`, but keeps up to
+    ``concurrency`` posts in flight at once instead of waiting for each
+    response in turn.
+
+    Posts are claimed in batches with :func:`claim_pending`, sent
+    concurrently from a thread pool over the client's pooled connections,
+    and their outcomes recorded as by :func:`publish_pending`. A rate
+    limit ends the run once the current batch is recorded.
+
+    :param limit: Maximum number of rows to process.
+    :type limit: int or None
+    :param concurrency: Posts in flight at once; defaults to
+        ``X_POOL_SIZE``, so every post has a pooled connection.
+    :type concurrency: int or None
+    :param client: Client to post with; defaults to :func:`get_client`.
+    :type client: XClient or None
+    :return: A summary of the run.
+    :rtype: PublishResult
+    """
+    client = client or get_client()
+    concurrency = max(concurrency or settings.X_POOL_SIZE, 1)
+    create_post = sync_to_async(client.create_post, thread_sensitive=False)
+    result = PublishResult()
+    processed = 0
+    while not result.rate_limited and (limit is None or processed < limit):
+        count = concurrency if limit is None else min(concurrency,
+                                                      limit - processed)
+        posts = await sync_to_async(claim_pending)(count)
+        if not posts:
+            break
+        processed += len(posts)
+        outcomes = await asyncio.gather(
+            *(create_post(post_text(post.article)) for post in posts),
+            return_exceptions=True)
+        await sync_to_async(_record_outcomes)(posts, outcomes, result)
+    return result
@@ -1,7 +1,57 @@
+import asyncio
+import importlib
+import json
+import os
+import re
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock, skipUnless
+
+import requests
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission, \
+    update_last_login
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, \
+    transaction
+from django.db.models import Count, Sum
 from rest_framework.test import APIClient
-from .models import Article, Publisher
-from django.test import TestCase
+from .models import Article, DigestDelivery, DigestItem, FeedEntry, \
+    Publisher, Newsletter, NotificationOutbox, SearchCorpus, SearchDocument, \
+    SearchPosting, SocialPost
+from .access import bump_access_generation, get_cache as get_access_cache, \
+    get_user_access, has_role
+from .benchmarks import benchmark_routes, benchmark_sessions, \
+    compare_serializers, find_regressions, load_test, route_paths, \
+    seed_dataset
+from .cache import GENERATION_KEY, bump_generation, get_cache, \
+    get_generation
+from .digests import iter_digests, send_digests
+from .exports import EXPORT_FIELDS
+from .feeds import reader_feed, trim_expired
+from .notifications import delivery_stats, dispatch_progress, \
+    drain_outbox
+from .recipients import iter_subscriber_emails, iter_subscriber_ids
+from .search import rebuild_index, search
+from .serializers import ArticleSerializer, ValuesSerializer
+from .social import XClient, XPostError, XPostUnknown, _retry_at, \
+    apublish_pending, publish_pending
+from .tracking import approved
+from newsportal.databases import database_config
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.template.loader import render_to_string
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -167,3 +217,2882 @@ class APITest(TestCase):
         response = self.client.get('/api/articles/')
         # Add appropriate assertions for editor logic
         self.assertEqual(response.status_code, 200)
+
+
+class NotificationOutboxTest(TestCase):
+    """
+    Tests for the subscriber notification outbox: approving an article
+    queues a single outbox row without sending mail, and the
+    ``send_notifications`` worker later delivers it in batches over one
+    mail connection.
+
+    :ivar publisher: Publisher the test article belongs to.
+    :type publisher: Publisher
+    :ivar journalist: Journalist who wrote the test article.
+    :type journalist: User
+    :ivar editor: Editor who approves the article.
+    :type editor: User
+    :ivar article: Article pending approval.
+    :type article: Article
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a publisher, a journalist, an editor, five readers
+        subscribed to the publisher (two of them also to the journalist)
+        and an unapproved article.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.editor = User.objects.create_user(
+            username='editor1', password='edtest',
+            email='editor1@example.com', role='editor')
+        for i in range(5):
+            reader = User.objects.create_user(
+                username=f'reader{i}', password='pass',
+                email=f'reader{i}@example.com', role='reader')
+            reader.subscriptions_publishers.add(self.publisher)
+            if i < 2:
+                reader.subscriptions_journalists.add(self.journalist)
+        self.article = Article.objects.create(
+            title='Pending Article', content='Body.',
+            publisher=self.publisher, journalist=self.journalist)
+
+    def test_approval_queues_without_sending(self) -> None:
+        """
+        Approving through the editor view creates exactly one outbox row
+        and sends no email during the request.
+
+        :return: None
+        """
+        self.client.force_login(self.editor)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/approve_article/{self.article.id}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        outbox = NotificationOutbox.objects.get(article=self.article)
+        self.assertEqual(outbox.status, NotificationOutbox.STATUS_PENDING)
+
+        self.article.title = 'Edited title'
+        self.article.save()
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+
+    def test_worker_delivers_in_batches(self) -> None:
+        """
+        The worker sends one message per distinct recipient, in batches
+        of the requested size, and records progress on the outbox row.
+
+        :return: None
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = True
+            self.article.save()
+        out = StringIO()
+        call_command('send_notifications', batch_size=2, stdout=out)
+
+        recipients = sorted(m.to[0] for m in mail.outbox)
+        self.assertEqual(
+            recipients, [f'reader{i}@example.com' for i in range(5)])
+        outbox = NotificationOutbox.objects.get(article=self.article)
+        self.assertEqual(outbox.status, NotificationOutbox.STATUS_SENT)
+        self.assertEqual(outbox.recipients_sent, 5)
+        self.assertIsNotNone(outbox.finished_at)
+        self.assertIn('5 emails for 1 notifications in 3 batches',
+                      out.getvalue())
+
+        call_command('send_notifications', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_worker_resumes_after_failure(self) -> None:
+        """
+        A delivery that fails part-way is returned to pending and resumes
+        after the last recipient that was delivered.
+
+        :return: None
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = True
+            self.article.save()
+        sent = []
+
+        def flaky_send(backend, messages):
+            if sent:
+                raise ConnectionError('relay went away')
+            sent.extend(messages)
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend'
+                        '.send_messages', flaky_send):
+            result = drain_outbox(batch_size=2)
+        self.assertEqual(result.failed, 1)
+        outbox = NotificationOutbox.objects.get(article=self.article)
+        self.assertEqual(outbox.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(outbox.last_recipient, 'reader1@example.com')
+        self.assertEqual(outbox.attempts, 1)
+
+        drain_outbox(batch_size=2)
+        self.assertEqual(
+            sorted(m.to[0] for m in mail.outbox),
+            [f'reader{i}@example.com' for i in range(2, 5)])
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.recipients_sent, 5)
+        self.assertEqual(delivery_stats()['emails'], 5)
+
+
+class StubXHandler(BaseHTTPRequestHandler):
+    """
+    Request handler for a local stand-in of the X create post endpoint.
+    Each request pops the next ``(status, headers, body)`` tuple from the
+    server's ``responses`` list and records the JSON payload it received.
+    A status of None never answers, outlasting the client's read timeout.
+    """
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get('Content-Length', 0))
+        self.server.requests.append(json.loads(self.rfile.read(length)))
+        status, headers, body = self.server.responses.pop(0)
+        if status is None:
+            time.sleep(1.5)
+            self.close_connection = True
+            return
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class SocialPostTest(TestCase):
+    """
+    Tests for the background X publishing pipeline, run against a local
+    stub HTTP server instead of the real API.
+
+    :ivar server: The stub HTTP server.
+    :type server: ThreadingHTTPServer
+    :ivar client_x: Client pointed at the stub server.
+    :type client_x: XClient
+    :ivar article: Approved article queued for posting.
+    :type article: Article
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubXHandler)
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self) -> None:
+        """
+        Resets the stub server and queues one approved article.
+
+        :return: None
+        """
+        self.server.requests = []
+        self.server.responses = []
+        host, port = self.server.server_address
+        self.client_x = XClient(f'http://{host}:{port}/2/tweets', 'token',
+                                timeout=(1, 1), max_retries=2, backoff=0)
+        publisher = Publisher.objects.create(name='Acme Publishing')
+        journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        with self.settings(X_POSTING_ENABLED=True), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.article = Article.objects.create(
+                title='Approved Article', content='Approved content.',
+                publisher=publisher, journalist=journalist, approved=True)
+
+    def tearDown(self) -> None:
+        self.client_x.close()
+
+    def test_posts_once(self) -> None:
+        """
+        A queued article is posted exactly once, even if it is saved
+        again afterwards.
+
+        :return: None
+        """
+        self.server.responses = [(201, {}, {'data': {'id': '42'}})]
+        result = publish_pending(client=self.client_x)
+        self.assertEqual(result.posted, 1)
+        post = SocialPost.objects.get(article=self.article)
+        self.assertEqual(post.status, SocialPost.STATUS_POSTED)
+        self.assertEqual(post.remote_id, '42')
+        self.assertEqual(self.server.requests[0]['text'],
+                         'Approved Article\n\nApproved content....')
+
+        with self.settings(X_POSTING_ENABLED=True), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.article.save()
+        self.assertEqual(publish_pending(client=self.client_x).posted, 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retries_server_errors(self) -> None:
+        """
+        Transient 5xx responses are retried on the same session.
+
+        :return: None
+        """
+        self.server.responses = [(503, {}, {}), (201, {},
+                                                 {'data': {'id': '7'}})]
+        result = publish_pending(client=self.client_x)
+        self.assertEqual(result.posted, 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_rate_limit_reschedules(self) -> None:
+        """
+        A 429 response reschedules the post for the rate limit reset
+        instead of retrying immediately.
+
+        :return: None
+        """
+        reset = int(time.time()) + 900
+        self.server.responses = [
+            (429, {'x-rate-limit-reset': str(reset)}, {})]
+        result = publish_pending(client=self.client_x)
+        self.assertTrue(result.rate_limited)
+        post = SocialPost.objects.get(article=self.article)
+        self.assertEqual(post.status, SocialPost.STATUS_PENDING)
+        self.assertEqual(int(post.next_attempt_at.timestamp()), reset)
+        self.assertEqual(publish_pending(client=self.client_x).posted, 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retry_at_headers(self) -> None:
+        """
+        ``Retry-After`` dates always give an aware datetime, and invalid
+        values fall back to one minute from now.
+
+        :return: None
+        """
+        def retry_at(**headers):
+            response = requests.Response()
+            response.headers.update(headers)
+            return _retry_at(response)
+
+        self.assertEqual(
+            retry_at(**{'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}),
+            datetime(2015, 10, 21, 7, 28, tzinfo=dt_timezone.utc))
+        self.assertEqual(
+            retry_at(**{'Retry-After': 'Wed, 21 Oct 2015 07:28:00'}),
+            datetime(2015, 10, 21, 7, 28, tzinfo=dt_timezone.utc))
+        for headers in ({'Retry-After': 'soon'},
+                        {'x-rate-limit-reset': '9' * 30}, {}):
+            fallback = retry_at(**headers)
+            self.assertTrue(timezone.is_aware(fallback))
+            self.assertAlmostEqual(
+                (fallback - timezone.now()).total_seconds(), 60, delta=5)
+
+    def test_client_errors_are_not_retried(self) -> None:
+        """
+        A 4xx rejection counts as a failed attempt without retrying.
+
+        :return: None
+        """
+        self.server.responses = [(403, {}, {'detail': 'Forbidden'})]
+        result = publish_pending(client=self.client_x)
+        self.assertEqual(result.failed, 1)
+        post = SocialPost.objects.get(article=self.article)
+        self.assertEqual(post.attempts, 1)
+        self.assertIn('403', post.last_error)
+        self.assertIsNotNone(post.next_attempt_at)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_unanswered_post_is_not_resent(self) -> None:
+        """
+        A post whose response timed out may have been published, so it
+        is marked failed after one request instead of being retried.
+
+        :return: None
+        """
+        self.server.responses = [(None, {}, {}),
+                                 (201, {}, {'data': {'id': '7'}})]
+        result = publish_pending(client=self.client_x)
+        self.assertEqual(result.failed, 1)
+        post = SocialPost.objects.get(article=self.article)
+        self.assertEqual(post.status, SocialPost.STATUS_FAILED)
+        self.assertIn('No response', post.last_error)
+        self.assertEqual(publish_pending(client=self.client_x).failed, 0)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_connection_failures_are_retried(self) -> None:
+        """
+        Failing to connect sends nothing, so it is retried and reported
+        as an ordinary failure.
+
+        :return: None
+        """
+        with socket.socket() as unused:
+            unused.bind(('127.0.0.1', 0))
+            port = unused.getsockname()[1]
+        client = XClient(f'http://127.0.0.1:{port}/2/tweets', 'token',
+                         timeout=(1, 1), max_retries=2, backoff=0)
+        with mock.patch.object(client.session, 'post',
+                               wraps=client.session.post) as post, \
+                self.assertRaises(XPostError) as raised:
+            client.create_post('Text')
+        self.assertNotIsInstance(raised.exception, XPostUnknown)
+        self.assertEqual(post.call_count, 3)
+        client.close()
+
+    def test_concurrent_publishing(self) -> None:
+        """
+        ``apublish_pending`` posts claimed batches concurrently and
+        records each outcome as ``publish_pending`` does.
+
+        :return: None
+        """
+        with self.settings(X_POSTING_ENABLED=True), \
+                self.captureOnCommitCallbacks(execute=True):
+            for i in range(4):
+                Article.objects.create(
+                    title=f'Article {i}', content='Body.',
+                    publisher=self.article.publisher,
+                    journalist=self.article.journalist, approved=True)
+        self.server.responses = [(201, {}, {'data': {'id': str(i)}})
+                                 for i in range(4)] + [(403, {}, {})]
+        result = async_to_sync(apublish_pending)(concurrency=3,
+                                                 client=self.client_x)
+        self.assertEqual((result.posted, result.failed), (4, 1))
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(SocialPost.objects.filter(
+            status=SocialPost.STATUS_POSTED).count(), 4)
+        self.assertEqual(
+            async_to_sync(apublish_pending)(client=self.client_x).posted, 0)
+
+
+class ApprovalTransitionTest(TestCase):
+    """
+    Tests for the edge-triggered ``approved`` transition event sent by
+    Article and Newsletter saves.
+
+    :ivar publisher: Publisher used by the test content.
+    :type publisher: Publisher
+    :ivar journalist: Journalist used by the test content.
+    :type journalist: User
+    :ivar events: Instances the ``approved`` signal was sent for.
+    :type events: list
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a publisher and a journalist and starts recording
+        ``approved`` events.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.events = []
+        approved.connect(self.record, dispatch_uid='transition-test')
+        self.addCleanup(approved.disconnect, dispatch_uid='transition-test')
+
+    def record(self, sender, instance, **kwargs) -> None:
+        self.events.append(instance)
+
+    def test_event_sent_once_after_commit(self) -> None:
+        """
+        The event is deferred until commit and is not repeated by later
+        saves of the approved article, which cost a single UPDATE of the
+        article row (the other queries re-index it for search).
+
+        :return: None
+        """
+        article = Article.objects.create(
+            title='Pending', content='Body.',
+            publisher=self.publisher, journalist=self.journalist)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.approved = True
+            article.save()
+            self.assertEqual(self.events, [])
+            self.assertTrue(NotificationOutbox.objects.filter(
+                article=article).exists())
+        self.assertEqual(self.events, [article])
+
+        article = Article.objects.get(pk=article.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks, \
+                CaptureQueriesContext(connection) as queries:
+            article.title = 'Typo fixed'
+            article.save()
+        # The listings are invalidated, but no second event is sent.
+        self.assertIn(bump_generation, callbacks)
+        self.assertNotIn(article._send_approved, callbacks)
+        article_queries = [query['sql'] for query in queries
+                           if '"newsapp_article"' in query['sql']]
+        self.assertEqual(len(article_queries), 1)
+        self.assertTrue(article_queries[0].startswith('UPDATE'))
+        self.assertEqual(len(self.events), 1)
+
+    def test_rolled_back_approval_sends_nothing(self) -> None:
+        """
+        An approval whose transaction rolls back never sends the event
+        and queues nothing, and saving the article again approves it.
+
+        :return: None
+        """
+        article = Article.objects.create(
+            title='Pending', content='Body.',
+            publisher=self.publisher, journalist=self.journalist)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    article.approved = True
+                    article.save()
+                    self.assertFalse(article.has_changed('approved'))
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        self.assertEqual(self.events, [])
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertFalse(SocialPost.objects.exists())
+        self.assertTrue(article.has_changed('approved'))
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        self.assertEqual(self.events, [article])
+        self.assertEqual(NotificationOutbox.objects.filter(
+            article=article).count(), 1)
+
+    def test_failing_receiver_is_logged(self) -> None:
+        """
+        A receiver of the after-commit event that raises is logged and
+        does not stop the others.
+
+        :return: None
+        """
+        def fail(sender, instance, **kwargs):
+            raise RuntimeError('receiver failed')
+
+        approved.connect(fail, dispatch_uid='failing-receiver')
+        self.addCleanup(approved.disconnect, dispatch_uid='failing-receiver')
+        article = Article.objects.create(
+            title='Pending', content='Body.',
+            publisher=self.publisher, journalist=self.journalist)
+        with self.assertLogs('newsapp.tracking', 'ERROR'), \
+                self.captureOnCommitCallbacks(execute=True):
+            article.approved = True
+            article.save()
+        self.assertEqual(self.events, [article])
+
+    def test_deferred_field_and_newsletter(self) -> None:
+        """
+        Approving an instance loaded without its ``approved`` field still
+        sends the event, and newsletters send it too.
+
+        :return: None
+        """
+        newsletter = Newsletter.objects.create(
+            title='Weekly', content='Body.',
+            publisher=self.publisher, journalist=self.journalist)
+        newsletter = Newsletter.objects.only('title').get(pk=newsletter.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            newsletter.approved = True
+            newsletter.save()
+        self.assertEqual(self.events, [newsletter])
+        self.assertFalse(newsletter.has_changed('approved'))
+
+
+class RecipientResolutionTest(TestCase):
+    """
+    Tests for the single-query subscriber resolution in
+    ``newsapp.recipients``.
+
+    :ivar publisher: Publisher readers subscribe to.
+    :type publisher: Publisher
+    :ivar journalist: Journalist readers subscribe to.
+    :type journalist: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates four readers: one subscribed to the publisher, one to the
+        journalist, one to both and one to both but without an email.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        for name, email, to_pub, to_jour in (
+                ('pub', 'c@example.com', True, False),
+                ('jour', 'a@example.com', False, True),
+                ('both', 'b@example.com', True, True),
+                ('noemail', '', True, True)):
+            reader = User.objects.create(username=name, email=email,
+                                         role='reader')
+            if to_pub:
+                reader.subscriptions_publishers.add(self.publisher)
+            if to_jour:
+                reader.subscriptions_journalists.add(self.journalist)
+
+    def test_distinct_emails_in_one_query(self) -> None:
+        """
+        Subscribers of either entity are returned once each, in order,
+        without empty addresses, using a single query.
+
+        :return: None
+        """
+        with self.assertNumQueries(1):
+            emails = list(iter_subscriber_emails(self.publisher.pk,
+                                                 self.journalist.pk))
+        self.assertEqual(
+            emails, ['a@example.com', 'b@example.com', 'c@example.com'])
+
+    def test_paged_and_resumable(self) -> None:
+        """
+        Small chunks page through the results with keyset queries, and a
+        cursor resumes after the given address.
+
+        :return: None
+        """
+        with self.assertNumQueries(2):
+            emails = list(iter_subscriber_emails(
+                self.publisher.pk, self.journalist.pk, chunk_size=2))
+        self.assertEqual(len(emails), 3)
+        self.assertEqual(
+            list(iter_subscriber_emails(self.publisher.pk, None,
+                                        after='b@example.com')),
+            ['c@example.com'])
+        self.assertEqual(
+            len(list(iter_subscriber_ids(self.publisher.pk,
+                                         self.journalist.pk))), 4)
+
+
+class RoleGroupSyncTest(TestCase):
+    """
+    Query-count tests for the role-to-group syncing done by
+    ``CustomUser.save``.
+
+    :ivar reader: A reader with one publisher subscription.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a reader subscribed to a publisher.
+
+        :return: None
+        """
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.reader.subscriptions_publishers.add(
+            Publisher.objects.create(name='Acme Publishing'))
+
+    def test_create_assigns_group(self) -> None:
+        """
+        Creating a user adds the role group with one extra query.
+
+        :return: None
+        """
+        self.assertEqual(list(self.reader.groups.values_list('name',
+                                                             flat=True)),
+                         ['Reader'])
+        with self.assertNumQueries(2):
+            User.objects.create(username='reader2', role='reader')
+
+    def test_unchanged_role_costs_one_query(self) -> None:
+        """
+        Saves that leave the role alone, such as the login-time
+        ``last_login`` update or a profile edit, only run their UPDATE.
+
+        :return: None
+        """
+        user = User.objects.get(pk=self.reader.pk)
+        with self.assertNumQueries(1):
+            update_last_login(None, user)
+        with self.assertNumQueries(1):
+            user.bio = 'Hello'
+            user.save()
+
+    def test_role_change_resyncs(self) -> None:
+        """
+        Changing the role replaces the group and, for journalists, clears
+        the user's subscriptions.
+
+        :return: None
+        """
+        user = User.objects.get(pk=self.reader.pk)
+        user.role = 'journalist'
+        user.save()
+        self.assertEqual(list(user.groups.values_list('name', flat=True)),
+                         ['Journalist'])
+        self.assertFalse(user.subscriptions_publishers.exists())
+
+
+class ArticlePaginationTest(TestCase):
+    """
+    Tests for the keyset pagination and sparse fieldsets of the article
+    list API.
+
+    :ivar reader: Reader subscribed to the test publisher.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates 25 approved articles, ten of which share one creation
+        time, and a reader subscribed to their publisher.
+
+        :return: None
+        """
+        get_cache().clear()
+        publisher = Publisher.objects.create(name='Acme Publishing')
+        journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        Article.objects.bulk_create([
+            Article(title=f'Article {i}', content='Body.',
+                    publisher=publisher, journalist=journalist,
+                    approved=True)
+            for i in range(25)
+        ])
+        Article.objects.filter(title__in=[f'Article {i}'
+                                          for i in range(10)]).update(
+            created_at=Article.objects.order_by('created_at')
+            .first().created_at)
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.reader.subscriptions_publishers.add(publisher)
+        self.reader.subscriptions_journalists.add(journalist)
+        self.client = APIClient()
+
+    def fetch_all(self, url: str) -> list:
+        """
+        Follows ``Link`` headers from ``url`` and returns every row.
+
+        :param url: The first page URL.
+        :type url: str
+        :return: All rows from all pages.
+        :rtype: list
+        """
+        rows = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            rows.extend(response.json())
+            link = response.headers.get('Link')
+            url = link[1:link.index('>')] if link else None
+        return rows
+
+    def test_pages_cover_every_article_once(self) -> None:
+        """
+        Walking the pages returns every article exactly once, newest
+        first, including articles with identical creation times.
+
+        :return: None
+        """
+        rows = self.fetch_all('/api/articles/?page_size=7')
+        ids = [row['id'] for row in rows]
+        self.assertEqual(len(ids), 25)
+        self.assertEqual(len(set(ids)), 25)
+        expected = list(Article.objects.order_by(
+            '-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_reader_pages_cost_constant_queries(self) -> None:
+        """
+        A reader's deep page costs the same queries as the first (the
+        publishers served on read, the page's feed entries and its
+        articles), and no article appears twice.
+
+        :return: None
+        """
+        self.client.force_authenticate(user=self.reader)
+        with self.assertNumQueries(3):
+            first = self.client.get('/api/articles/?page_size=5')
+        link = first.headers['Link']
+        with self.assertNumQueries(3):
+            self.client.get(link[1:link.index('>')])
+        self.assertEqual(len(self.fetch_all('/api/articles/?page_size=5')),
+                         25)
+
+    def test_sparse_fieldset(self) -> None:
+        """
+        ``fields`` limits the serialized fields and leaves ``content``
+        out of the query; unknown fields are rejected.
+
+        :return: None
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/?fields=id,title')
+        self.assertEqual(set(response.json()[0]), {'id', 'title'})
+        self.assertNotIn('content', queries[0]['sql'])
+        response = self.client.get('/api/articles/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get('/api/articles/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+
+class ReaderFeedTest(TestCase):
+    """
+    Tests for the precomputed reader feeds maintained by
+    ``newsapp.feeds``.
+
+    :ivar publisher: Publisher the reader subscribes to.
+    :type publisher: Publisher
+    :ivar other: Publisher the reader does not subscribe to.
+    :type other: Publisher
+    :ivar journalist: Journalist writing for both publishers.
+    :type journalist: User
+    :ivar reader: The reader whose feed is checked.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates two publishers, a journalist and a reader.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.other = Publisher.objects.create(name='Other Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+
+    def approve(self, publisher: Publisher, title: str) -> Article:
+        """
+        Creates an approved article and runs its on-commit handlers.
+
+        :param publisher: Publisher of the article.
+        :type publisher: Publisher
+        :param title: Title of the article.
+        :type title: str
+        :return: The article.
+        :rtype: Article
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(
+                title=title, content='Body.', publisher=publisher,
+                journalist=self.journalist, approved=True)
+
+    def feed_titles(self) -> set:
+        return set(reader_feed(self.reader).values_list('title', flat=True))
+
+    def test_fan_out_and_backfill(self) -> None:
+        """
+        Approval fans out to subscribers, subscribing backfills earlier
+        articles and unsubscribing trims them.
+
+        :return: None
+        """
+        self.approve(self.other, 'Before')
+        self.reader.subscriptions_publishers.add(self.publisher)
+        self.approve(self.publisher, 'Subscribed')
+        self.approve(self.other, 'Unsubscribed')
+        self.assertEqual(self.feed_titles(), {'Subscribed'})
+
+        self.reader.subscriptions_journalists.add(self.journalist)
+        self.assertEqual(self.feed_titles(),
+                         {'Before', 'Subscribed', 'Unsubscribed'})
+
+        self.reader.subscriptions_journalists.remove(self.journalist)
+        self.assertEqual(self.feed_titles(), {'Subscribed'})
+        self.publisher.subscribed_readers.remove(self.reader)
+        self.assertEqual(self.feed_titles(), set())
+
+    def test_large_publisher_is_read_on_demand(self) -> None:
+        """
+        A publisher over ``FEED_FANOUT_LIMIT`` subscribers stops being
+        fanned out but still appears in its readers' feeds.
+
+        :return: None
+        """
+        self.reader.subscriptions_publishers.add(self.publisher)
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            self.approve(self.publisher, 'Big news')
+        self.publisher.refresh_from_db()
+        self.assertTrue(self.publisher.fanout_on_read)
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(self.feed_titles(), {'Big news'})
+
+    def test_pages_merge_entries_and_publishers_read_on_demand(self) -> None:
+        """
+        Keyset pages of a feed mixing feed entries and a publisher
+        served on read list every article once, newest first.
+
+        :return: None
+        """
+        self.other.fanout_on_read = True
+        self.other.save()
+        self.reader.subscriptions_publishers.add(self.publisher, self.other)
+        for i in range(6):
+            self.approve(self.publisher if i % 2 else self.other, f'A{i}')
+        client = APIClient()
+        client.force_authenticate(user=self.reader)
+        titles, url = [], '/api/articles/?page_size=4&fields=id,title'
+        while url:
+            response = client.get(url)
+            titles.extend(row['title'] for row in response.json())
+            link = response.headers.get('Link')
+            url = link[1:link.index('>')] if link else None
+        self.assertEqual(titles, [f'A{i}' for i in reversed(range(6))])
+
+    def test_trim_expired(self) -> None:
+        """
+        Entries of articles older than the retention period are removed.
+
+        :return: None
+        """
+        self.reader.subscriptions_publishers.add(self.publisher)
+        self.approve(self.publisher, 'Old')
+        self.approve(self.publisher, 'New')
+        FeedEntry.objects.filter(article__title='Old').update(
+            created_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(trim_expired(), 0)
+        with self.settings(FEED_RETENTION_DAYS=365):
+            self.assertEqual(trim_expired(), 1)
+        self.assertEqual(self.feed_titles(), {'New'})
+
+    def test_backfill_limit_is_opt_in(self) -> None:
+        """
+        Subscribing backfills every article of the source unless
+        ``FEED_BACKFILL_LIMIT`` is set.
+
+        :return: None
+        """
+        for i in range(3):
+            self.approve(self.publisher, f'A{i}')
+        self.reader.subscriptions_publishers.add(self.publisher)
+        self.assertEqual(self.feed_titles(), {'A0', 'A1', 'A2'})
+        self.reader.subscriptions_publishers.remove(self.publisher)
+        with self.settings(FEED_BACKFILL_LIMIT=2):
+            self.reader.subscriptions_publishers.add(self.publisher)
+        self.assertEqual(self.feed_titles(), {'A1', 'A2'})
+
+    def test_large_fan_out_is_deferred(self) -> None:
+        """
+        An approval reaching more than ``FEED_SYNC_FANOUT_LIMIT``
+        subscribers writes no entries; ``fan_out_feeds`` adds them.
+
+        :return: None
+        """
+        self.reader.subscriptions_publishers.add(self.publisher)
+        with self.settings(FEED_SYNC_FANOUT_LIMIT=0):
+            article = self.approve(self.publisher, 'Big news')
+        self.assertTrue(article.feed_pending)
+        self.assertFalse(FeedEntry.objects.exists())
+        out = StringIO()
+        call_command('fan_out_feeds', stdout=out)
+        self.assertIn('Fanned out 1 articles.', out.getvalue())
+        self.assertEqual(self.feed_titles(), {'Big news'})
+        article.refresh_from_db()
+        self.assertFalse(article.feed_pending)
+
+
+class QueryPlanTest(TestCase):
+    """
+    Runs ``EXPLAIN`` on every query issued by the hot approval and feed
+    paths and fails if any of them falls back to a full table scan or
+    sorts its rows instead of reading them in index order.
+
+    The queries are captured from real requests to the views, so the test
+    follows the views if their querysets change.
+
+    :ivar editor: Editor user.
+    :type editor: User
+    :ivar journalist: Journalist user.
+    :type journalist: User
+    :ivar reader: Reader subscribed to the publisher.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates three publishers, an editor, a journalist, a reader
+        subscribed to one publisher, a hundred readers subscribed to the
+        others and a few hundred approved and pending articles and
+        newsletters, so that the planner has real choices,
+        and collects the table statistics it bases them on.
+
+        :return: None
+        """
+        get_cache().clear()
+        publisher, *others = [
+            Publisher.objects.create(name=name)
+            for name in ('Acme Publishing', 'Other One', 'Other Two')]
+        self.editor = User.objects.create_user(
+            username='editor1', password='edtest',
+            email='editor1@example.com', role='editor')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        for i in range(4):
+            Article.objects.create(
+                title=f'Article {i}', content='Body.', publisher=publisher,
+                journalist=self.journalist, approved=i % 2 == 0)
+            Newsletter.objects.create(
+                title=f'Newsletter {i}', content='Body.',
+                publisher=publisher, journalist=self.journalist,
+                approved=i % 2 == 0)
+        for model in (Article, Newsletter):
+            model.objects.bulk_create([
+                model(title=f'Seeded {i}', content='Seeded body.',
+                      publisher=others[i % 2], journalist=self.journalist,
+                      approved=i % 3 != 0)
+                for i in range(300)
+            ])
+        rebuild_index()
+        readers = User.objects.bulk_create([
+            User(username=f'seeded{i}', email=f'seeded{i}@example.com',
+                 role='reader')
+            for i in range(100)
+        ])
+        User.subscriptions_publishers.through.objects.bulk_create([
+            User.subscriptions_publishers.through(
+                customuser_id=reader.pk, publisher_id=other.pk)
+            for reader in readers for other in others
+        ])
+        self.reader.subscriptions_publishers.add(publisher)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def full_scans(self, sql: str) -> list:
+        """
+        Explains a query and returns the plan lines that scan a whole
+        table or sort the rows in a temporary B-tree (MySQL: a
+        filesort).
+
+        :param sql: The SQL statement, with parameters inlined.
+        :type sql: str
+        :return: The offending plan lines.
+        :rtype: list[str]
+        """
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                details = [row[-1] for row in cursor.fetchall()]
+                return [d for d in details
+                        if re.match(r'SCAN \w+$', d)
+                        or d.startswith('USE TEMP B-TREE')]
+            cursor.execute(f'EXPLAIN {sql}')
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            return [str(row) for row in rows
+                    if row.get('type') == 'ALL'
+                    or 'Using filesort' in (row.get('Extra') or '')]
+
+    def assertNoFullScans(self, client, url: str) -> None:
+        """
+        Requests ``url`` and asserts that none of the ``SELECT`` queries
+        it runs needs a full table scan or a sort.
+
+        :param client: The test client to use.
+        :param url: The URL to request.
+        :type url: str
+        :return: None
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(self.full_scans(query['sql']), [],
+                                 f"{url}: {query['sql']}")
+
+    @skipUnless(connection.vendor in ('sqlite', 'mysql'),
+                'plan parsing is implemented for SQLite and MySQL')
+    def test_hot_paths_use_indexes(self) -> None:
+        """
+        The pending queue, public listings, search, dashboards,
+        newsletter list and article API are all served from indexes.
+
+        :return: None
+        """
+        self.assertNoFullScans(self.client, '/articles/')
+        self.assertNoFullScans(self.client, '/api/articles/')
+        self.assertNoFullScans(self.client,
+                               '/api/articles/search/?q=article+bod*')
+        self.client.force_login(self.editor)
+        self.assertNoFullScans(self.client, '/editor_dashboard/')
+        self.client.force_login(self.journalist)
+        self.assertNoFullScans(self.client, '/journalist_dashboard/')
+        self.client.force_login(self.reader)
+        self.assertNoFullScans(self.client, '/newsletters/')
+        self.assertNoFullScans(self.client, '/api/articles/')
+
+
+class ListingCacheTest(TestCase):
+    """
+    Tests for the generation-versioned cache of the anonymous article
+    listings.
+
+    :ivar publisher: Publisher of the test articles.
+    :type publisher: Publisher
+    :ivar journalist: Author of the test articles.
+    :type journalist: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Empties the cache and creates one approved article.
+
+        :return: None
+        """
+        get_cache().clear()
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        Article.objects.create(
+            title='First Story', content='Body.', publisher=self.publisher,
+            journalist=self.journalist, approved=True)
+        self.client = APIClient()
+
+    def test_repeat_requests_skip_the_database(self) -> None:
+        """
+        A second anonymous request for the same listing runs no queries.
+
+        :return: None
+        """
+        for url in ('/articles/', '/api/articles/'):
+            first = self.client.get(url)
+            with self.assertNumQueries(0):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, 200)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_approval_invalidates_listings(self) -> None:
+        """
+        Approving an article starts a new generation, so the next request
+        shows it; saving a pending article does not.
+
+        :return: None
+        """
+        self.client.get('/api/articles/')
+        article = Article.objects.create(
+            title='Second Story', content='Body.', publisher=self.publisher,
+            journalist=self.journalist)
+        generation = get_generation()
+        article.title = 'Second Story, revised'
+        article.save()
+        self.assertEqual(get_generation(), generation)
+        article.approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+        self.assertGreater(get_generation(), generation)
+        titles = [row['title']
+                  for row in self.client.get('/api/articles/').json()]
+        self.assertIn('Second Story, revised', titles)
+        article.delete()
+        self.assertNotIn(b'Second Story', self.client.get('/articles/')
+                         .content)
+
+    def test_generation_changes_on_commit(self) -> None:
+        """
+        Publishing, deleting an article and changing a publisher start a
+        new generation only once the transaction commits, so a request
+        racing the commit cannot cache the old rows under the new one.
+
+        :return: None
+        """
+        generation = get_generation()
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(
+                title='Second Story', content='Body.',
+                publisher=self.publisher, journalist=self.journalist,
+                approved=True)
+            self.assertEqual(get_generation(), generation)
+        self.assertGreater(get_generation(), generation)
+        for change in (article.delete, self.publisher.save):
+            generation = get_generation()
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+                self.assertEqual(get_generation(), generation)
+            self.assertGreater(get_generation(), generation)
+
+    def test_conditional_requests(self) -> None:
+        """
+        Revalidating with the ``ETag`` returns ``304 Not Modified`` until
+        the articles change.
+
+        :return: None
+        """
+        etag = self.client.get('/api/articles/')['ETag']
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(
+                title='Second Story', content='Body.',
+                publisher=self.publisher, journalist=self.journalist,
+                approved=True)
+        response = self.client.get('/api/articles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_negotiated_formats_are_cached_apart(self) -> None:
+        """
+        The JSON and browsable renderings of the API are cached and
+        validated separately, and responses vary on ``Accept``.
+
+        :return: None
+        """
+        json_response = self.client.get('/api/articles/',
+                                        HTTP_ACCEPT='application/json')
+        html_response = self.client.get('/api/articles/',
+                                        HTTP_ACCEPT='text/html')
+        self.assertTrue(html_response['Content-Type'].startswith(
+            'text/html'))
+        self.assertNotEqual(html_response['ETag'], json_response['ETag'])
+        self.assertIn('Accept', json_response['Vary'])
+        response = self.client.get('/api/articles/',
+                                   HTTP_ACCEPT='application/json')
+        self.assertEqual(response.content, json_response.content)
+
+    def test_authenticated_users_are_not_cached(self) -> None:
+        """
+        Logged-in users always get a freshly built listing; only its
+        template fragments are cached.
+
+        :return: None
+        """
+        reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.client.force_login(reader)
+        first = self.client.get('/articles/')
+        response = self.client.get('/articles/')
+        self.assertContains(response, 'My Subscriptions')
+        # Each page carries a freshly masked CSRF token.
+        self.assertNotEqual(response.content, first.content)
+        self.assertNotIn('ETag', response)
+
+
+class SearchTest(TestCase):
+    """
+    Tests for the inverted-index search over articles and newsletters.
+
+    :ivar publisher: Publisher of the test content.
+    :type publisher: Publisher
+    :ivar journalist: Author of the test content.
+    :type journalist: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates three approved articles and one pending article.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.budget = self.create_article(
+            'Budget vote', 'Parliament passed the budget after a long '
+                           'budget debate.')
+        self.weather = self.create_article(
+            'Storm warning', 'Heavy rain and wind expected tonight.')
+        self.sports = self.create_article(
+            'Cup final', 'The final ended after extra time; the budget '
+                         'for the stadium was mentioned once.')
+        self.draft = self.create_article(
+            'Budget leak', 'Budget budget budget.', approved=False)
+        self.client = APIClient()
+
+    def create_article(self, title: str, content: str,
+                       approved: bool = True) -> Article:
+        """
+        Creates an article by the test journalist.
+
+        :return: The article.
+        :rtype: Article
+        """
+        return Article.objects.create(
+            title=title, content=content, publisher=self.publisher,
+            journalist=self.journalist, approved=approved)
+
+    def test_unchanged_save_is_not_reindexed(self) -> None:
+        """
+        Saving an approved article without changing its title, content
+        or approval costs only the UPDATE of the article row; changing
+        its title re-indexes it.
+
+        :return: None
+        """
+        article = Article.objects.get(pk=self.weather.pk)
+        with self.assertNumQueries(1):
+            article.save()
+        article.title = 'Storm update'
+        article.save()
+        self.assertEqual(
+            [pk for pk, _ in search('update')], [article.pk])
+
+    def test_ranking_and_approval(self) -> None:
+        """
+        The article about the term ranks first, and pending articles are
+        not searchable.
+
+        :return: None
+        """
+        ids = [object_id for object_id, _ in search('budget')]
+        self.assertEqual(ids, [self.budget.pk, self.sports.pk])
+        self.assertEqual(search('storm wind')[0][0], self.weather.pk)
+        self.assertEqual(search('nonexistent'), [])
+
+    def test_prefix_matching(self) -> None:
+        """
+        A word ending in ``*`` matches terms starting with it.
+
+        :return: None
+        """
+        self.assertEqual(search('bud'), [])
+        self.assertEqual({object_id for object_id, _ in search('bud*')},
+                         {self.budget.pk, self.sports.pk})
+        self.assertEqual(search('stor*')[0][0], self.weather.pk)
+
+    def test_prefix_reads_are_bounded(self) -> None:
+        """
+        Short prefixes are looked up as whole words, prefixes expand to
+        at most ``SEARCH_PREFIX_EXPANSION`` terms, and no more than
+        ``SEARCH_MAX_POSTINGS`` postings are read.
+
+        :return: None
+        """
+        self.assertEqual(search('b*'), [])
+        with self.settings(SEARCH_MIN_PREFIX=1):
+            self.assertEqual({object_id for object_id, _ in search('b*')},
+                             {self.budget.pk, self.sports.pk})
+        # "e*" expands to "ended" (the cup final), then "expected".
+        with self.settings(SEARCH_MIN_PREFIX=1, SEARCH_PREFIX_EXPANSION=1):
+            self.assertEqual([object_id for object_id, _ in search('e*')],
+                             [self.sports.pk])
+        with self.settings(SEARCH_MAX_POSTINGS=1), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(len(search('budget')), 1)
+        self.assertIn('LIMIT 1', queries[-1]['sql'])
+
+    def test_index_follows_changes(self) -> None:
+        """
+        Editing, approving, withdrawing and deleting content updates the
+        index incrementally.
+
+        :return: None
+        """
+        self.weather.content = 'Budget rain.'
+        self.weather.save()
+        self.assertIn(self.weather.pk,
+                      [object_id for object_id, _ in search('budget')])
+        self.draft.approved = True
+        self.draft.save()
+        self.assertEqual(search('leak')[0][0], self.draft.pk)
+        self.draft.approved = False
+        self.draft.save()
+        self.assertEqual(search('leak'), [])
+        self.budget.delete()
+        self.assertEqual(search('parliament'), [])
+        self.assertFalse(SearchPosting.objects.filter(
+            term='parliament').exists())
+        newsletter = Newsletter.objects.create(
+            title='Weekly digest', content='Budget roundup.',
+            journalist=self.journalist, publisher=self.publisher,
+            approved=True)
+        self.assertEqual(search('roundup', kind='newsletter')[0][0],
+                         newsletter.pk)
+        self.assertEqual(search('roundup'), [])
+        for kind in ('article', 'newsletter'):
+            self.assertEqual(
+                SearchCorpus.objects.values_list(
+                    'documents', 'total_length').get(kind=kind),
+                tuple(SearchDocument.objects.filter(kind=kind).aggregate(
+                    count=Count('id'), total=Sum('length')).values()))
+
+    def test_accented_terms_are_distinct(self) -> None:
+        """
+        Terms differing only by accents are separate postings, and a
+        prefix matches accented continuations.
+
+        :return: None
+        """
+        resume = self.create_article('Resume', 'resume')
+        accented = self.create_article('Résumé', 'résumé')
+        self.assertEqual([object_id for object_id, _ in search('résumé')],
+                         [accented.pk])
+        with self.settings(SEARCH_MIN_PREFIX=1):
+            self.assertEqual({object_id for object_id, _ in search('r*')},
+                             {resume.pk, accented.pk, self.weather.pk})
+
+    def test_rebuild_index(self) -> None:
+        """
+        Rebuilding reproduces the incrementally maintained index.
+
+        :return: None
+        """
+        before = search('budget final')
+        SearchDocument.objects.all().delete()
+        self.assertEqual(rebuild_index(), 3)
+        self.assertEqual(search('budget final'), before)
+
+    def test_search_endpoint(self) -> None:
+        """
+        The endpoint returns serialized matches with scores, validates
+        its parameters and never reads the article content column.
+
+        :return: None
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/articles/search/?q=budget'
+                                       '&limit=1')
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()
+        self.assertEqual([row['id'] for row in rows], [self.budget.pk])
+        self.assertGreater(rows[0]['score'], 0)
+        for query in queries[:-1]:
+            self.assertNotIn('"content"', query['sql'])
+        self.assertEqual(
+            self.client.get('/api/articles/search/').status_code, 400)
+        self.assertEqual(self.client.get(
+            '/api/articles/search/?q=x&kind=user').status_code, 400)
+
+
+class RouteBenchmarkTest(TestCase):
+    """
+    Tests for the route benchmark harness behind
+    ``python manage.py benchmark routes``.
+    """
+
+    def test_every_route_is_benchmarked(self) -> None:
+        """
+        Every route in ``newsapp.urls`` is requested as every role and
+        gets a complete result row.
+
+        :return: None
+        """
+        from .urls import urlpatterns
+
+        ids = seed_dataset(publishers=2, journalists=2, readers=3,
+                           articles=20, subscriptions=1)
+        paths = route_paths(ids)
+        self.assertEqual(len(paths), len(urlpatterns))
+        results = benchmark_routes(ids, repeat=1)
+        self.assertEqual(len(results), 4 * len(paths))
+        row = results['reader /api/articles/']
+        self.assertEqual(row['status'], 200)
+        self.assertEqual(set(row),
+                         {'status', 'queries', 'p50_ms', 'p95_ms',
+                          'peak_kib'})
+        self.assertGreater(
+            results['anonymous /api/articles/search/?q=article+bod*']
+            ['queries'], 0)
+        # Each request was rolled back, so nothing was approved.
+        self.assertFalse(Article.objects.get(pk=ids['article']).approved)
+
+    def test_find_regressions(self) -> None:
+        """
+        Extra queries, new server errors and large latency or memory
+        growth are regressions; small noise is not.
+
+        :return: None
+        """
+        before = {'status': 200, 'queries': 3, 'p50_ms': 2.0,
+                  'p95_ms': 4.0, 'peak_kib': 100.0}
+        baseline = {'editor /': before}
+        noisy = dict(before, p95_ms=4.9, peak_kib=150.0)
+        self.assertEqual(
+            find_regressions(baseline, {'editor /': noisy}, 0.25), [])
+        worse = dict(before, status=500, queries=4, p95_ms=9.0)
+        self.assertEqual(
+            len(find_regressions(baseline, {'editor /': worse}, 0.25)), 3)
+        self.assertEqual(
+            find_regressions(baseline, {'reader /': worse}, 0.25), [])
+
+
+class QueryBudgetMixin:
+    """
+    Test mixin asserting that a view runs a fixed number of queries
+    however many rows it lists, which is what an N+1 lookup breaks.
+    """
+
+    def assertQueryBudget(self, client, url: str, budget: int,
+                          grow) -> None:
+        """
+        Requests ``url``, calls ``grow`` to add rows, and requests it
+        again. Both requests must succeed, run the same number of
+        queries, and stay within ``budget``. A first, unmeasured request
+        warms the per-user caches.
+
+        :param client: The (logged in) test client.
+        :param url: The URL to request.
+        :type url: str
+        :param budget: Maximum number of queries per request.
+        :type budget: int
+        :param grow: Callable that adds rows the view lists.
+        :return: None
+        """
+        client.get(url)
+        counts = []
+        for step in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            counts.append(len(queries))
+            if step == 0:
+                grow()
+        self.assertEqual(counts[0], counts[1],
+                         f"{url}: query count grows with rows "
+                         f"({counts[0]} -> {counts[1]})")
+        self.assertLessEqual(counts[1], budget, url)
+
+
+class ListQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Checks that the list views load related objects in batches.
+
+    :ivar publisher: Publisher of the test content.
+    :type publisher: Publisher
+    :ivar editor: Editor user.
+    :type editor: User
+    :ivar reader: Reader user.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a publisher, an editor, a reader and one journalist with
+        an article and a newsletter.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.editor = User.objects.create_user(
+            username='editor1', password='edtest',
+            email='editor1@example.com', role='editor')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.count = 0
+        self.add_journalist()
+
+    def add_journalist(self) -> None:
+        """
+        Adds a journalist with a pending article and an approved
+        newsletter, and another publisher with an editor.
+
+        :return: None
+        """
+        self.count += 1
+        user = User.objects.create_user(
+            username=f'journalist{self.count}', password='testpass123',
+            email=f'journo{self.count}@example.com', role='journalist')
+        user.journalist.publishers.add(self.publisher)
+        Publisher.objects.create(
+            name=f'Publisher {self.count}'
+        ).editors.add(User.objects.create_user(
+            username=f'editor-extra{self.count}', role='editor'))
+        Article.objects.create(
+            title=f'Article {self.count}', content='Body.',
+            publisher=self.publisher, journalist=user)
+        Newsletter.objects.create(
+            title=f'Newsletter {self.count}', content='Body.',
+            publisher=self.publisher, journalist=user, approved=True)
+
+    def grow(self) -> None:
+        for _ in range(3):
+            self.add_journalist()
+
+    def test_editor_views(self) -> None:
+        """
+        The editor dashboard, newsletter list and APIs have a fixed
+        query budget.
+
+        :return: None
+        """
+        self.client.force_login(self.editor)
+        for url, budget in (('/editor_dashboard/', 3),
+                            ('/newsletters/', 3),
+                            ('/api/journalists/', 4),
+                            ('/api/publishers/', 4)):
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget, self.grow)
+
+    def test_reader_views(self) -> None:
+        """
+        The reader's newsletter list and journalist browser have a fixed
+        query budget.
+
+        :return: None
+        """
+        self.client.force_login(self.reader)
+        for url, budget in (('/newsletters/', 3),
+                            ('/browse_journalists/', 4)):
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget, self.grow)
+
+    def test_newsletter_detail(self) -> None:
+        """
+        The newsletter page loads its publisher and author with the
+        newsletter, in one query once the session and user are cached.
+
+        :return: None
+        """
+        self.client.force_login(self.reader)
+        newsletter = Newsletter.objects.first()
+        self.client.get(f'/newsletters/{newsletter.pk}/')
+        with self.assertNumQueries(1):
+            self.client.get(f'/newsletters/{newsletter.pk}/')
+
+
+@override_settings(BROWSE_PAGE_SIZE=5)
+class BrowseDirectoryTest(TestCase):
+    """
+    Tests for the paginated, filterable publisher and journalist
+    directories.
+
+    :ivar reader: Reader subscribed to some of the entries.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates 12 journalists and 12 publishers and a reader subscribed
+        to the first two of each.
+
+        :return: None
+        """
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        for i in range(12):
+            journalist = User.objects.create_user(
+                username=f'writer{i:02}', role='journalist')
+            publisher = Publisher.objects.create(name=f'Press {i:02}')
+            if i < 2:
+                self.reader.subscriptions_journalists.add(journalist)
+                self.reader.subscriptions_publishers.add(publisher)
+        self.client.force_login(self.reader)
+
+    def test_pages_and_subscription_flags(self) -> None:
+        """
+        Each page holds ``BROWSE_PAGE_SIZE`` entries flagged from one
+        query (plus the paginator's count, once the session and user are
+        cached), and the flags match the reader's subscriptions.
+
+        :return: None
+        """
+        for url in ('/browse_journalists/', '/browse_publishers/'):
+            self.client.get(url)
+            with self.subTest(url=url), self.assertNumQueries(2):
+                response = self.client.get(url)
+            entries = list(response.context['page_obj'])
+            self.assertEqual(len(entries), 5)
+            self.assertEqual([entry.is_subscribed for entry in entries],
+                             [True, True, False, False, False])
+            self.assertContains(response, 'Page 1 of 3')
+            last = self.client.get(url, {'page': 99}).context['page_obj']
+            self.assertEqual(last.number, 3)
+            self.assertEqual(len(last), 2)
+
+    def test_name_prefix_filter(self) -> None:
+        """
+        ``q`` keeps only names starting with it, case insensitively.
+
+        :return: None
+        """
+        response = self.client.get('/browse_journalists/', {'q': 'WRITER1'})
+        self.assertEqual([j.name for j in response.context['page_obj']],
+                         ['writer10', 'writer11'])
+        response = self.client.get('/browse_publishers/', {'q': 'press 0'})
+        self.assertEqual(response.context['page_obj'].paginator.count, 10)
+        self.assertContains(response, 'q=press%200&amp;page=2')
+
+
+class BulkSubscriptionTest(TestCase):
+    """
+    Tests for the bulk subscription API.
+
+    :ivar publishers: Publishers, each with one approved article.
+    :type publishers: list
+    :ivar journalists: ``Journalist`` profiles.
+    :type journalists: list
+    :ivar reader: The reader changing subscriptions.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates 40 publishers with an article each, four journalists and
+        a reader.
+
+        :return: None
+        """
+        self.journalists = [
+            User.objects.create_user(
+                username=f'journalist{i}', role='journalist').journalist
+            for i in range(4)
+        ]
+        self.publishers = Publisher.objects.bulk_create(
+            [Publisher(name=f'Press {i}') for i in range(40)])
+        Article.objects.bulk_create([
+            Article(title=f'Article {i}', content='Body.', approved=True,
+                    publisher=publisher,
+                    journalist=self.journalists[0].user)
+            for i, publisher in enumerate(self.publishers)
+        ])
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.reader)
+
+    def post(self, body: dict):
+        return self.client.post('/api/subscriptions/', body, format='json')
+
+    def test_add_and_remove(self) -> None:
+        """
+        Adds and removes are applied together, the state is returned,
+        and the reader's feed follows.
+
+        :return: None
+        """
+        publisher_ids = [p.pk for p in self.publishers]
+        response = self.post({
+            'publishers': {'add': publisher_ids[:10]},
+            'journalists': {'add': [self.journalists[1].pk]},
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'publishers': publisher_ids[:10],
+            'journalists': [self.journalists[1].pk],
+        })
+        self.assertEqual(reader_feed(self.reader).count(), 10)
+        response = self.post({
+            'publishers': {'add': publisher_ids[:2],
+                           'remove': publisher_ids[2:10]},
+            'journalists': {'remove': [self.journalists[1].pk]},
+        })
+        self.assertEqual(response.json(), {
+            'publishers': publisher_ids[:2], 'journalists': []})
+        self.assertEqual(reader_feed(self.reader).count(), 2)
+        self.assertEqual(self.client.get('/api/subscriptions/').json(),
+                         response.json())
+
+    def test_query_count_does_not_grow(self) -> None:
+        """
+        Subscribing to 5 or to 30 publishers costs the same queries.
+
+        :return: None
+        """
+        publisher_ids = [p.pk for p in self.publishers]
+        counts = []
+        for ids in (publisher_ids[:5], publisher_ids[5:35]):
+            with CaptureQueriesContext(connection) as queries:
+                self.post({'publishers': {'add': ids},
+                           'journalists': {'add': [self.journalists[2].pk]}})
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(reader_feed(self.reader).count(), 35)
+
+    def test_invalid_requests_change_nothing(self) -> None:
+        """
+        Unknown ids and contradictory lists are rejected as a whole, and
+        only readers may subscribe.
+
+        :return: None
+        """
+        publisher_id = self.publishers[0].pk
+        response = self.post({'publishers': {'add': [publisher_id, 99999]}})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('publishers', response.json())
+        response = self.post({'journalists': {
+            'add': [self.journalists[0].pk],
+            'remove': [self.journalists[0].pk]}})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/api/subscriptions/').json(),
+                         {'publishers': [], 'journalists': []})
+        self.client.force_authenticate(user=self.journalists[0].user)
+        response = self.post({'publishers': {'add': [publisher_id]}})
+        self.assertEqual(response.status_code, 403)
+
+
+class ImportNewsTest(TestCase):
+    """
+    Tests for the ``import_news`` bulk import command.
+
+    :ivar reader: A reader subscribed to the imported publisher.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates the publisher the import refers to and a reader
+        subscribed to it.
+
+        :return: None
+        """
+        get_cache().clear()
+        self.publisher = Publisher.objects.create(name='Daily Planet')
+        self.reader = User.objects.create_user(
+            username='reader1', email='reader1@example.com', role='reader')
+        self.reader.subscriptions_publishers.add(self.publisher)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+    def import_file(self, name: str, text: str, *args: str) -> str:
+        path = f'{self.tmpdir}/{name}'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_news', path, *args, stdout=out, stderr=err)
+        self.errors = err.getvalue()
+        return out.getvalue()
+
+    def test_jsonl_import(self) -> None:
+        """
+        Publishers, users and articles are imported in one pass, with
+        role groups, journalist profiles, feeds and the search index
+        updated, and without queuing notifications.
+
+        :return: None
+        """
+        lines = [
+            {'type': 'publisher', 'name': 'Daily Planet'},
+            {'type': 'publisher', 'name': 'Gotham Gazette'},
+            {'type': 'user', 'username': 'clark', 'role': 'journalist'},
+            {'type': 'user', 'username': 'lois', 'role': 'reader'},
+        ] + [
+            {'type': 'article', 'title': f'Archive story {i}',
+             'content': 'Metropolis news.', 'publisher': 'Daily Planet',
+             'journalist': 'clark', 'approved': True,
+             'created_at': f'2020-01-{i + 1:02d}T12:00:00Z'}
+            for i in range(5)
+        ] + [
+            {'type': 'article', 'title': 'Lost', 'content': 'x',
+             'publisher': 'Nowhere', 'journalist': 'clark'},
+        ]
+        generation = get_generation()
+        output = self.import_file(
+            'news.jsonl', '\n'.join(json.dumps(line) for line in lines),
+            '--batch-size', '2')
+        self.assertIn('Imported 10 rows (8 created, 1 skipped, 1 errors)',
+                      output)
+        self.assertIn("unknown publisher 'Nowhere'", self.errors)
+
+        clark = User.objects.get(username='clark')
+        self.assertTrue(clark.groups.filter(name='Journalist').exists())
+        self.assertEqual(clark.journalist.name, 'clark')
+        self.assertFalse(clark.has_usable_password())
+        lois = User.objects.get(username='lois')
+        self.assertIsNone(lois.published_newsletters)
+        self.assertTrue(lois.groups.filter(name='Reader').exists())
+
+        articles = Article.objects.filter(journalist=clark)
+        self.assertEqual(articles.count(), 5)
+        self.assertEqual(articles.earliest('created_at').created_at.year,
+                         2020)
+        self.assertEqual(reader_feed(self.reader).count(), 5)
+        self.assertEqual(len(search('metropolis')), 5)
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_csv_import(self) -> None:
+        """
+        CSV input with a ``--type`` imports one kind of record, and
+        re-importing skips existing rows.
+
+        :return: None
+        """
+        text = 'username,role,email\nann,editor,ann@example.com\n' \
+               'bob,reader,\nbad,admin,\n'
+        output = self.import_file('users.csv', text, '--type', 'user')
+        self.assertIn('(2 created, 0 skipped, 1 errors)', output)
+        self.assertIn("line 4: unknown role 'admin'", self.errors)
+        self.assertTrue(User.objects.get(username='ann').groups.filter(
+            name='Editor').exists())
+        output = self.import_file('users.csv', text, '--type', 'user')
+        self.assertIn('(0 created, 2 skipped, 1 errors)', output)
+
+    def test_publisher_import_invalidates_listings(self) -> None:
+        """
+        Importing only publishers invalidates the cached listings;
+        importing nothing new leaves them cached.
+
+        :return: None
+        """
+        generation = get_generation()
+        self.import_file('publishers.csv', 'name\nDaily Planet\n',
+                         '--type', 'publisher')
+        self.assertEqual(get_generation(), generation)
+        self.import_file('publishers.csv', 'name\nGotham Gazette\n',
+                         '--type', 'publisher')
+        self.assertNotEqual(get_generation(), generation)
+
+    def test_bad_lines_and_failed_input(self) -> None:
+        """
+        Lines that are not JSON objects are counted and skipped; when a
+        later input fails, the records already read are still imported
+        and added to feeds.
+
+        :return: None
+        """
+        User.objects.create_user(username='clark', role='journalist')
+        article = json.dumps({
+            'type': 'article', 'title': 'Kept', 'content': 'Body.',
+            'publisher': 'Daily Planet', 'journalist': 'clark',
+            'approved': True, 'created_at': '2020-01-01T12:00:00Z'})
+        output = self.import_file(
+            'news.jsonl', '\n'.join(['{broken', '[1, 2]', article]))
+        self.assertIn('Imported 3 rows (1 created, 0 skipped, 2 errors)',
+                      output)
+        self.assertIn('line 1: invalid JSON', self.errors)
+        self.assertIn('line 2: expected a JSON object', self.errors)
+        self.assertEqual(Article.objects.get(title='Kept').created_at.year,
+                         2020)
+
+        path = f'{self.tmpdir}/more.jsonl'
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(article.replace('Kept', 'Also kept'))
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.assertRaises(CommandError):
+            call_command('import_news', path, f'{self.tmpdir}/missing',
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(set(reader_feed(self.reader).values_list(
+            'title', flat=True)), {'Kept', 'Also kept'})
+
+
+@override_settings(EXPORT_BATCH_SIZE=2)
+class ArticleExportTest(TestCase):
+    """
+    Tests for the streaming article export endpoint and command.
+
+    :ivar articles: The approved articles, oldest first.
+    :type articles: list
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates five approved articles and a pending one.
+
+        :return: None
+        """
+        journalist = User.objects.create_user(
+            username='journalist1', role='journalist')
+        publisher = Publisher.objects.create(name='Daily Planet')
+        self.articles = [
+            Article.objects.create(
+                title=f'Story {i}', content='Body, "quoted".',
+                approved=True, publisher=publisher, journalist=journalist)
+            for i in range(5)
+        ]
+        Article.objects.create(title='Pending', content='Body.',
+                               publisher=publisher, journalist=journalist)
+
+    def test_ndjson_matches_api(self) -> None:
+        """
+        The NDJSON export streams every approved article, oldest first,
+        serialized as the article API does.
+
+        :return: None
+        """
+        response = self.client.get('/api/articles/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in
+                b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(rows, [ArticleSerializer(a).data
+                                for a in self.articles])
+
+    def test_csv_and_since(self) -> None:
+        """
+        The CSV export has a header row, and passing the returned cursor
+        back as ``since`` exports only newer articles.
+
+        :return: None
+        """
+        response = self.client.get('/api/articles/export/?format=csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(EXPORT_FIELDS))
+        self.assertEqual(len(lines), 6)
+        self.assertIn('"Body, ""quoted""."', lines[1])
+        cursor = response['X-Export-Cursor']
+
+        newer = Article.objects.create(
+            title='Newer', content='Body.', approved=True,
+            publisher=self.articles[0].publisher,
+            journalist=self.articles[0].journalist)
+        response = self.client.get(f'/api/articles/export/?since={cursor}')
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(row)['id'] for row in rows],
+                         [newer.pk])
+        response = self.client.get('/api/articles/export/?since=nonsense')
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self) -> None:
+        """
+        The command writes the same export and reports the next cursor.
+
+        :return: None
+        """
+        out, err = StringIO(), StringIO()
+        call_command('export_news', '--since', '2000-01-01T00:00:00Z',
+                     stdout=out, stderr=err)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        self.assertIn('Next cursor:', err.getvalue())
+
+
+class ValuesSerializerTest(TestCase):
+    """
+    Tests that the ``values()``-based list serialization matches the
+    model serializers.
+    """
+
+    def test_output_matches_model_serializers(self) -> None:
+        """
+        Articles (also with a sparse fieldset), journalists and
+        publishers, including many-to-many ids, serialize identically.
+
+        :return: None
+        """
+        seed_dataset(publishers=3, journalists=4, readers=2, articles=20,
+                     subscriptions=1)
+        results = compare_serializers(rows=10, repeat=1)
+        self.assertEqual(len(results), 6)
+        for key, row in results.items():
+            self.assertTrue(row['identical'], key)
+        articles = Article.objects.order_by('id')
+        fast = ValuesSerializer.for_serializer(
+            ArticleSerializer, ['title', 'created_at'])
+        self.assertEqual(
+            fast.serialize(articles.values(*fast.columns)),
+            [dict(ArticleSerializer(a, fields=['title', 'created_at']).data)
+             for a in articles])
+
+
+class AccessCacheTest(TestCase):
+    """
+    Tests for the cached role and permission resolution.
+
+    :ivar editor: An editor; the Editor group has article permissions.
+    :type editor: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Sets up the role groups' permissions and creates an editor.
+
+        :return: None
+        """
+        get_access_cache().clear()
+        call_command('setup_roles', stdout=StringIO())
+        self.editor = User.objects.create_user(
+            username='editor1', password='testpass123', role='editor')
+
+    def fresh(self):
+        return User.objects.get(pk=self.editor.pk)
+
+    def test_checks_are_cached(self) -> None:
+        """
+        Once resolved, role and permission checks on new user objects
+        (as in later requests) cost no queries.
+
+        :return: None
+        """
+        self.assertTrue(self.fresh().has_perm('newsapp.change_article'))
+        editor = self.fresh()
+        with self.assertNumQueries(0):
+            self.assertTrue(editor.has_perm('newsapp.change_article'))
+            self.assertFalse(editor.has_perm('newsapp.add_article'))
+            self.assertTrue(has_role(editor, 'editor'))
+            self.assertEqual(get_user_access(editor).groups, {'Editor'})
+
+    def test_invalidation(self) -> None:
+        """
+        Changes to a role, to a user's permissions and to a group's
+        permissions are seen by the next check.
+
+        :return: None
+        """
+        self.assertFalse(self.fresh().has_perm('newsapp.add_article'))
+        editors = Group.objects.get(name='Editor')
+        with self.captureOnCommitCallbacks(execute=True):
+            editors.permissions.add(
+                Permission.objects.get(codename='add_article'))
+        self.assertTrue(self.fresh().has_perm('newsapp.add_article'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.user_permissions.add(
+                Permission.objects.get(codename='view_newsletter'))
+        self.assertTrue(self.fresh().has_perm('newsapp.view_newsletter'))
+
+        self.editor.role = 'reader'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.save()
+        reader = self.fresh()
+        self.assertTrue(has_role(reader, 'reader'))
+        self.assertFalse(reader.has_perm('newsapp.change_article'))
+        self.assertEqual(get_user_access(reader).groups, {'Reader'})
+
+
+    def test_invalidated_on_commit(self) -> None:
+        """
+        Until a group's permissions change commits, checks keep answering
+        from the cached access, so a concurrent request cannot cache the
+        old permissions again after the invalidation.
+
+        :return: None
+        """
+        self.assertTrue(self.fresh().has_perm('newsapp.change_article'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Group.objects.get(name='Editor').permissions.clear()
+            self.assertTrue(self.fresh().has_perm('newsapp.change_article'))
+        self.assertEqual(callbacks, [bump_access_generation])
+        self.assertFalse(self.fresh().has_perm('newsapp.change_article'))
+
+
+class SessionCacheTest(TestCase):
+    """
+    Tests for cached sessions and request users.
+
+    :ivar reader: The logged in reader.
+    :type reader: User
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a reader and empties the cache.
+
+        :return: None
+        """
+        get_access_cache().clear()
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456', role='reader')
+
+    def test_logged_in_requests_need_no_queries(self) -> None:
+        """
+        With cached sessions and users, a warm logged-in request to the
+        home and profile pages runs no queries; with database sessions
+        and users it runs two.
+
+        :return: None
+        """
+        results = benchmark_sessions(self.reader, repeat=1,
+                                     engines=('db', 'cached_db'))
+        for route in ('home', 'profile'):
+            self.assertEqual(results[f'db database {route}']['queries'], 2)
+            self.assertEqual(results[f'cached_db cached {route}']['queries'],
+                             0)
+
+    def test_saved_user_is_reloaded(self) -> None:
+        """
+        Changing the user's password ends their cached session user.
+
+        :return: None
+        """
+        self.client.login(username='reader1', password='testpass456')
+        self.assertEqual(self.client.get('/accounts/profile/').status_code,
+                         200)
+        self.reader.set_password('newpass789')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.save()
+            # Until the commit, requests keep the cached (old) user.
+            response = self.client.get('/accounts/profile/')
+            self.assertEqual(response.status_code, 200)
+        response = self.client.get('/accounts/profile/')
+        self.assertEqual(response.status_code, 302)
+
+
+class TemplateFragmentTest(TestCase):
+    """
+    Tests for the cached ``{% cache %}`` fragments of the navigation bar
+    and the listing pages.
+
+    :ivar editor: A logged in editor.
+    :type editor: User
+    :ivar reader: A reader.
+    :type reader: User
+    :ivar publisher: Publisher of the test article.
+    :type publisher: Publisher
+    """
+
+    def setUp(self) -> None:
+        """
+        Empties the cache and creates an editor, a reader and one
+        approved article.
+
+        :return: None
+        """
+        get_cache().clear()
+        self.editor = User.objects.create_user(
+            username='editor1', password='testpass123', role='editor')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456', role='reader')
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        Article.objects.create(
+            title='First Story', content='Body.', publisher=self.publisher,
+            journalist=self.editor, approved=True)
+        self.client.force_login(self.editor)
+
+    def test_listings_are_rendered_from_fragments(self) -> None:
+        """
+        Once rendered, the article and publisher lists are served from
+        their fragments without querying the listed tables.
+
+        :return: None
+        """
+        for url, table, text in (
+                ('/articles/', 'newsapp_article', b'First Story'),
+                ('/publishers/', 'newsapp_publisher', b'Acme Publishing')):
+            first = self.client.get(url)
+            self.assertContains(first, text.decode())
+            with CaptureQueriesContext(connection) as queries:
+                second = self.client.get(url)
+            self.assertContains(second, text.decode())
+            self.assertFalse([query for query in queries
+                              if table in query['sql']])
+
+    def test_content_changes_invalidate_fragments(self) -> None:
+        """
+        Approving an article or adding a publisher starts a new
+        generation, so the next page shows it.
+
+        :return: None
+        """
+        self.client.get('/articles/')
+        self.client.get('/publishers/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(
+                title='Second Story', content='Body.',
+                publisher=self.publisher, journalist=self.editor,
+                approved=True)
+        Publisher.objects.create(name='Globex News')
+        self.assertContains(self.client.get('/articles/'), 'Second Story')
+        self.assertContains(self.client.get('/publishers/'), 'Globex News')
+
+    def test_navigation_is_cached_per_role(self) -> None:
+        """
+        Each role gets its own navigation fragment.
+
+        :return: None
+        """
+        response = self.client.get('/')
+        self.assertContains(response, 'Editor Dashboard')
+        self.assertNotContains(response, 'My Subscriptions')
+        self.client.force_login(self.reader)
+        response = self.client.get('/')
+        self.assertContains(response, 'My Subscriptions')
+        self.assertNotContains(response, 'Editor Dashboard')
+        self.client.logout()
+        response = self.client.get('/')
+        self.assertNotContains(response, 'My Subscriptions')
+        self.assertNotContains(response, 'Newsletters')
+
+
+class DatabaseConfigTest(TestCase):
+    """
+    Tests for the database settings read from the environment.
+    """
+
+    def test_defaults_reuse_mysql_connections(self) -> None:
+        """
+        Given only a password, the local MySQL database is used with
+        persistent, health-checked connections; without one the settings
+        are rejected.
+
+        :return: None
+        """
+        config = database_config({'DB_PASSWORD': 'secret'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.mysql')
+        self.assertEqual(config['NAME'], 'newsappdb')
+        self.assertEqual(config['PASSWORD'], 'secret')
+        self.assertEqual(config['CONN_MAX_AGE'], 60)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        with self.assertRaises(ImproperlyConfigured):
+            database_config({})
+
+    def test_asgi_opens_a_connection_per_request(self) -> None:
+        """
+        Loading the ASGI application makes per-request connections the
+        default, unless ``DB_CONN_MAX_AGE`` is set.
+
+        :return: None
+        """
+        import newsportal.asgi
+        with mock.patch.dict(os.environ, {'DB_ENGINE': 'sqlite3'}):
+            os.environ.pop('DB_CONN_MAX_AGE', None)
+            importlib.reload(newsportal.asgi)
+            self.assertEqual(database_config()['CONN_MAX_AGE'], 0)
+            os.environ['DB_CONN_MAX_AGE'] = '30'
+            importlib.reload(newsportal.asgi)
+            self.assertEqual(database_config()['CONN_MAX_AGE'], 30)
+
+    def test_sqlite_fallback(self) -> None:
+        """
+        ``DB_ENGINE=sqlite3`` needs only a file name.
+
+        :return: None
+        """
+        config = database_config({'DB_ENGINE': 'sqlite3',
+                                  'DB_CONN_MAX_AGE': '0',
+                                  'DB_CONN_HEALTH_CHECKS': 'false'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertTrue(config['NAME'].endswith('db.sqlite3'))
+        self.assertNotIn('HOST', config)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertFalse(config['CONN_HEALTH_CHECKS'])
+
+    def test_pool_replaces_persistent_connections(self) -> None:
+        """
+        A pool size configures the PostgreSQL pool and turns persistent
+        connections off; other backends ignore it.
+
+        :return: None
+        """
+        environ = {'DB_ENGINE': 'postgresql', 'DB_NAME': 'news',
+                   'DB_PASSWORD': '', 'DB_POOL_MAX_SIZE': '8',
+                   'DB_CONN_MAX_AGE': 'none'}
+        config = database_config(environ)
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertEqual(config['OPTIONS'],
+                         {'pool': {'min_size': 0, 'max_size': 8}})
+        config = database_config(dict(environ, DB_ENGINE='mysql'))
+        self.assertIsNone(config['CONN_MAX_AGE'])
+        self.assertNotIn('OPTIONS', config)
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    """
+    Tests for read-replica routing, with a copy of the test database in
+    an SQLite file standing in for a replica that has not yet received
+    the latest writes.
+
+    :ivar editor: An editor.
+    :type editor: User
+    :ivar reader: A reader.
+    :type reader: User
+    :ivar publisher: A publisher.
+    :type publisher: Publisher
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates an editor, a reader, a publisher and an approved
+        newsletter, copies the database to the replica, then adds a
+        pending newsletter to the primary only. The article generation
+        is set in the past, so the replica is in use.
+
+        :return: None
+        """
+        get_cache().clear()
+        self.editor = User.objects.create_user(
+            username='editor1', password='testpass123', role='editor')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456', role='reader')
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        Newsletter.objects.create(
+            title='Replicated Issue', content='Body.', approved=True,
+            journalist=self.editor, publisher=self.publisher)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        primary = connections['default']
+        connections['replica'] = type(primary)(
+            dict(primary.settings_dict, NAME=path), alias='replica')
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(connections['replica'].close)
+
+        Newsletter.objects.create(
+            title='Fresh Issue', content='Body.',
+            journalist=self.editor, publisher=self.publisher)
+        # The content last changed long ago.
+        get_cache().set(GENERATION_KEY, 0, None)
+
+    def test_read_only_views_read_from_replica(self) -> None:
+        """
+        Decorated views read from the replica; other reads go to the
+        primary.
+
+        :return: None
+        """
+        self.client.force_login(self.editor)
+        response = self.client.get('/newsletters/')
+        self.assertContains(response, 'Replicated Issue')
+        self.assertNotContains(response, 'Fresh Issue')
+        self.assertTrue(Newsletter.objects.filter(
+            title='Fresh Issue').exists())
+
+    def test_own_writes_pin_reads_to_primary(self) -> None:
+        """
+        After subscribing (a GET) or approving (a POST), the user reads
+        from the primary, and sees the change.
+
+        :return: None
+        """
+        self.client.force_login(self.reader)
+        self.assertNotContains(self.client.get('/browse_publishers/'),
+                               'Unsubscribe')
+        self.client.get(f'/subscribe_publisher/{self.publisher.pk}/')
+        self.assertContains(self.client.get('/browse_publishers/'),
+                            'Unsubscribe')
+
+        self.client.force_login(self.editor)
+        self.assertNotContains(self.client.get('/newsletters/'),
+                               'Fresh Issue')
+        fresh = Newsletter.objects.get(title='Fresh Issue')
+        self.client.post(f'/newsletters/{fresh.pk}/approve/')
+        self.assertContains(self.client.get('/newsletters/'), 'Fresh Issue')
+
+    def test_users_are_loaded_from_primary(self) -> None:
+        """
+        A reader created after the replica was copied is authenticated
+        from the primary by the DRF and async article APIs, while their
+        pages are read from the replica.
+
+        :return: None
+        """
+        reader = User.objects.create_user(
+            username='reader2', password='testpass789', role='reader')
+        for client in (self.client, self.async_client):
+            client.force_login(reader)
+
+        def forget_user() -> None:
+            get_access_cache().clear()
+            get_cache().set(GENERATION_KEY, 0, None)
+
+        forget_user()
+        with CaptureQueriesContext(connections['replica']) as replica:
+            self.assertNotIn('ETag', self.client.get('/api/articles/'))
+        forget_user()
+        with CaptureQueriesContext(connections['replica']) as replica_async:
+            response = async_to_sync(self.async_client.get)('/api/articles/')
+        self.assertNotIn('ETag', response)
+        for queries in (replica, replica_async):
+            sql = [query['sql'] for query in queries]
+            self.assertTrue(sql)
+            self.assertFalse([q for q in sql
+                              if 'FROM "newsapp_customuser" ' in q
+                              or '"django_session"' in q], sql)
+
+    def test_content_changes_read_from_primary(self) -> None:
+        """
+        Just after the article generation changes, listings are read from
+        the primary, so they are not cached from a lagging replica.
+
+        :return: None
+        """
+        self.client.force_login(self.editor)
+        bump_generation()
+        self.assertContains(self.client.get('/newsletters/'), 'Fresh Issue')
+
+
+class StubPageHandler(BaseHTTPRequestHandler):
+    """
+    Request handler answering every GET with a small JSON page, for load
+    testing without a Django server.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:
+        payload = b'[]'
+        self.send_response(404 if self.path.endswith('/missing/') else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Tests for the async views served to ASGI requests.
+
+    :ivar publisher: Publisher of the articles.
+    :type publisher: Publisher
+    :ivar journalist: Author of the articles and the newsletter.
+    :type journalist: User
+    :ivar reader: Reader subscribed to the publisher.
+    :type reader: User
+    :ivar newsletter: Unapproved newsletter of the journalist.
+    :type newsletter: Newsletter
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates approved articles, a subscribed reader and an unapproved
+        newsletter, and empties the caches.
+
+        :return: None
+        """
+        get_cache().clear()
+        get_access_cache().clear()
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.reader = User.objects.create_user(
+            username='reader1', password='testpass456',
+            email='reader1@example.com', role='reader')
+        self.reader.subscriptions_publishers.add(self.publisher)
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(5):
+                Article.objects.create(
+                    title=f'Article {i}', content='Body.',
+                    publisher=self.publisher, journalist=self.journalist,
+                    approved=True)
+        self.newsletter = Newsletter.objects.create(
+            title='Weekly', content='Draft.', journalist=self.journalist,
+            publisher=self.publisher)
+
+    def get_async(self, path: str):
+        return async_to_sync(self.async_client.get)(path)
+
+    def get_both(self, path: str) -> tuple:
+        """
+        Requests a path through ASGI and WSGI, each with a cold listing
+        cache.
+
+        :param path: The path.
+        :type path: str
+        :return: The async and the synchronous response.
+        :rtype: tuple
+        """
+        get_cache().clear()
+        async_response = self.get_async(path)
+        get_cache().clear()
+        return async_response, self.client.get(path)
+
+    def test_asgi_requests_use_async_views(self) -> None:
+        """
+        ASGI requests to the read-heavy routes reach the async views;
+        other routes and WSGI requests are unaffected.
+
+        :return: None
+        """
+        for path in ('/', '/articles/', '/api/articles/'):
+            self.assertEqual(
+                self.get_async(path).resolver_match.func.__module__,
+                'newsapp.async_views')
+            self.assertEqual(
+                self.client.get(path).resolver_match.func.__module__,
+                'newsapp.views')
+        self.assertEqual(
+            self.get_async('/signup/').resolver_match.func.__module__,
+            'newsapp.views')
+
+    def test_api_matches_sync_views(self) -> None:
+        """
+        The async APIs return the same JSON and ``Link`` header as the
+        DRF views, anonymously and for a reader.
+
+        :return: None
+        """
+        paths = ('/api/articles/?page_size=2',
+                 '/api/articles/?fields=id,title&page_size=3',
+                 '/api/journalists/', '/api/publishers/')
+        for login in (False, True):
+            if login:
+                self.client.force_login(self.reader)
+                self.async_client.force_login(self.reader)
+            for path in paths:
+                async_response, sync_response = self.get_both(path)
+                self.assertEqual(async_response.status_code, 200, path)
+                self.assertEqual(async_response.json(),
+                                 sync_response.json(), path)
+                self.assertEqual(async_response.get('Link'),
+                                 sync_response.get('Link'), path)
+
+        next_page = self.get_async('/api/articles/?page_size=2')['Link']
+        cursor = re.search(r'cursor=([^&>]+)', next_page).group(1)
+        page = self.get_async(f'/api/articles/?page_size=2&cursor={cursor}')
+        self.assertEqual([a['title'] for a in page.json()],
+                         ['Article 2', 'Article 1'])
+
+    def test_api_errors(self) -> None:
+        """
+        Unknown fields and malformed cursors are rejected as by the DRF
+        view.
+
+        :return: None
+        """
+        for path, status in (('/api/articles/?fields=id,secret', 400),
+                             ('/api/articles/?cursor=bogus', 404)):
+            async_response, sync_response = self.get_both(path)
+            self.assertEqual(async_response.status_code, status)
+            self.assertEqual(async_response.json(), sync_response.json())
+
+    def test_anonymous_listings_share_the_cache(self) -> None:
+        """
+        Anonymous API pages cached by either view are served by the
+        other, and revalidated with ``304``.
+
+        :return: None
+        """
+        first = self.get_async('/api/articles/')
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/articles/')
+        self.assertEqual(cached.json(), first.json())
+        not_modified = async_to_sync(self.async_client.get)(
+            '/api/articles/', headers={'If-None-Match': first['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+
+        get_cache().clear()
+        self.client.get('/articles/')
+        page = self.get_async('/articles/')
+        self.assertContains(page, 'Article 4')
+
+    def test_cache_stays_off_the_event_loop(self) -> None:
+        """
+        The async listings reach the cache through its async methods, so
+        no blocking cache call runs on the event loop.
+
+        :return: None
+        """
+        cache = get_cache()
+        blocking = []
+
+        def off_loop(method):
+            def wrapper(*args, **kwargs):
+                try:
+                    asyncio.get_running_loop()
+                    blocking.append(method.__name__)
+                except RuntimeError:
+                    pass
+                return method(*args, **kwargs)
+            return wrapper
+
+        for name in ('get', 'set', 'add'):
+            patcher = mock.patch.object(cache, name,
+                                        off_loop(getattr(cache, name)))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        for path in ('/api/articles/', '/articles/'):
+            for _ in range(2):
+                self.assertEqual(self.get_async(path).status_code, 200)
+        self.assertEqual(blocking, [])
+
+    def test_pages(self) -> None:
+        """
+        The async home page and newsletter detail page render with the
+        user's role and enforce the same access rules.
+
+        :return: None
+        """
+        self.async_client.force_login(self.journalist)
+        self.assertContains(self.get_async('/'), 'Journalist Dashboard')
+        self.assertContains(
+            self.get_async(f'/newsletters/{self.newsletter.pk}/'), 'Weekly')
+
+        self.async_client.force_login(self.reader)
+        response = self.get_async(f'/newsletters/{self.newsletter.pk}/')
+        self.assertRedirects(response, '/newsletters/',
+                             fetch_redirect_response=False)
+        self.assertEqual(self.get_async('/newsletters/999/').status_code,
+                         404)
+
+        self.async_client.logout()
+        response = self.get_async(f'/newsletters/{self.newsletter.pk}/')
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('/accounts/login/', response['Location'])
+
+    def test_load_test(self) -> None:
+        """
+        The load generator counts requests, errors and latencies against
+        a running server.
+
+        :return: None
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubPageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        result = load_test(f'http://{host}:{port}', ['/', '/missing/'],
+                           concurrency=4, requests=20)
+        self.assertEqual(result['requests'], 20)
+        self.assertEqual(result['errors'], 10)
+        self.assertGreater(result['rps'], 0)
+        self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+
+
+@override_settings(NOTIFICATION_MODE='digest')
+class DigestTest(TestCase):
+    """
+    Tests for digest mode: approvals are queued per subscriber and
+    ``send_digests`` mails each reader one digest per run.
+
+    :ivar publisher: Publisher the readers subscribe to.
+    :type publisher: Publisher
+    :ivar journalist: Author of the articles.
+    :type journalist: User
+    :ivar readers: Two readers with an email address and one without.
+    :type readers: list[User]
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a publisher, a journalist and three subscribed readers,
+        one of them also following the journalist.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.readers = []
+        for i, email in enumerate(('reader0@example.com',
+                                   'reader1@example.com', '')):
+            reader = User.objects.create_user(
+                username=f'reader{i}', password='pass', email=email,
+                role='reader')
+            reader.subscriptions_publishers.add(self.publisher)
+            self.readers.append(reader)
+        self.readers[1].subscriptions_journalists.add(self.journalist)
+
+    def approve(self, title: str) -> Article:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(
+                title=title, content='Body.', publisher=self.publisher,
+                journalist=self.journalist, approved=True)
+
+    def test_approval_queues_per_reader(self) -> None:
+        """
+        In digest mode an approval queues one item per subscriber and no
+        outbox notification.
+
+        :return: None
+        """
+        self.approve('First')
+        self.approve('Second')
+        self.assertFalse(NotificationOutbox.objects.exists())
+        self.assertEqual(DigestItem.objects.count(), 6)
+
+    def test_one_digest_per_reader(self) -> None:
+        """
+        Each reader with an email address gets one message listing all
+        their queued articles; the queue is emptied and delivery state
+        recorded, in a fixed number of queries.
+
+        :return: None
+        """
+        self.approve('First')
+        self.approve('Second')
+        with self.assertNumQueries(5):
+            result = send_digests()
+        self.assertEqual((result.digests, result.articles, result.batches),
+                         (2, 4, 1))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         ['reader0@example.com', 'reader1@example.com'])
+        self.assertIn('- First (Acme Publishing)\n- Second',
+                      mail.outbox[0].body)
+        self.assertFalse(DigestItem.objects.exists())
+        delivery = DigestDelivery.objects.get(reader=self.readers[0])
+        self.assertEqual((delivery.status, delivery.digests_sent,
+                          delivery.articles_sent),
+                         (DigestDelivery.STATUS_SENT, 1, 2))
+        self.assertEqual(DigestDelivery.objects.get(
+            reader=self.readers[2]).digests_sent, 0)
+
+        self.approve('Third')
+        send_digests()
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertIn('1 new article', mail.outbox[-1].subject)
+
+    def test_failed_batch_is_retried(self) -> None:
+        """
+        Readers of a batch that fails keep their items for the next run,
+        which sends them without duplicates.
+
+        :return: None
+        """
+        self.approve('First')
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.'
+                        'send_messages', side_effect=OSError('relay down')):
+            result = send_digests()
+        self.assertEqual(result.failed, 2)
+        delivery = DigestDelivery.objects.get(reader=self.readers[0])
+        self.assertEqual((delivery.status, delivery.attempts),
+                         (DigestDelivery.STATUS_PENDING, 1))
+        self.assertEqual(DigestItem.objects.count(), 2)
+
+        result = send_digests(batch_size=1)
+        self.assertEqual((result.digests, result.batches), (2, 2))
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(DigestDelivery.objects.get(
+            reader=self.readers[0]).attempts, 0)
+
+    def test_pages_keep_readers_together(self) -> None:
+        """
+        Digests are grouped correctly when a reader's items span several
+        pages.
+
+        :return: None
+        """
+        for title in ('First', 'Second', 'Third'):
+            self.approve(title)
+        until_id = DigestItem.objects.order_by('-id').first().id
+        digests = list(iter_digests(until_id, page_size=2))
+        self.assertEqual([len(d.articles) for d in digests], [3, 3, 3])
+        self.assertEqual([d.reader_id for d in digests],
+                         [reader.id for reader in self.readers])
+
+    def test_command(self) -> None:
+        """
+        The ``send_digests`` command reports the digests it sent.
+
+        :return: None
+        """
+        self.approve('First')
+        out = StringIO()
+        call_command('send_digests', stdout=out)
+        self.assertIn('Sent 2 digests (2 articles)', out.getvalue())
+
+
+class NewsletterDispatchTest(TestCase):
+    """
+    Tests for the distribution of approved newsletters through the
+    notification outbox.
+
+    :ivar publisher: Publisher of the newsletter.
+    :type publisher: Publisher
+    :ivar journalist: Author of the newsletter.
+    :type journalist: User
+    :ivar editor: Editor who approves it.
+    :type editor: User
+    :ivar newsletter: Newsletter pending approval.
+    :type newsletter: Newsletter
+    """
+
+    def setUp(self) -> None:
+        """
+        Creates a newsletter and seven subscribers: four of the
+        publisher, two of both the publisher and the journalist, and one
+        of the journalist only, plus a subscriber without an email
+        address.
+
+        :return: None
+        """
+        self.publisher = Publisher.objects.create(name='Acme Publishing')
+        self.journalist = User.objects.create_user(
+            username='journalist1', password='testpass123',
+            email='journo1@example.com', role='journalist')
+        self.editor = User.objects.create_user(
+            username='editor1', password='edtest',
+            email='editor1@example.com', role='editor')
+        for i in range(8):
+            reader = User.objects.create_user(
+                username=f'reader{i}', password='pass',
+                email=f'reader{i}@example.com' if i < 7 else '',
+                role='reader')
+            if i != 6:
+                reader.subscriptions_publishers.add(self.publisher)
+            if i in (4, 5, 6):
+                reader.subscriptions_journalists.add(self.journalist)
+        self.newsletter = Newsletter.objects.create(
+            title='Weekly Roundup', content='All the news & more.',
+            journalist=self.journalist, publisher=self.publisher)
+
+    def approve(self) -> NotificationOutbox:
+        self.client.force_login(self.editor)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/newsletters/{self.newsletter.pk}/approve/')
+        return NotificationOutbox.objects.get(newsletter=self.newsletter)
+
+    def test_approval_queues_rendered_newsletter_once(self) -> None:
+        """
+        Approving queues one outbox row whose email is rendered once from
+        the template; saving again queues nothing more.
+
+        :return: None
+        """
+        with mock.patch('newsapp.notifications.render_to_string',
+                        wraps=render_to_string) as render:
+            outbox = self.approve()
+            self.newsletter.refresh_from_db()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.newsletter.save()
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(outbox.subject, 'Acme Publishing: Weekly Roundup')
+        self.assertIn('All the news & more.', outbox.body)
+        self.assertEqual(NotificationOutbox.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_concurrent_delivery(self) -> None:
+        """
+        Delivery through a pool of connections reaches every subscriber
+        with an email address once and records progress and throughput.
+
+        :return: None
+        """
+        outbox = self.approve()
+        self.assertIsNone(dispatch_progress(outbox)['progress'])
+        result = drain_outbox(batch_size=2, concurrency=3)
+        self.assertEqual((result.notifications, result.emails,
+                          result.batches), (1, 7, 4))
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         [f'reader{i}@example.com' for i in range(7)])
+        self.assertEqual(len({m.body for m in mail.outbox}), 1)
+
+        outbox.refresh_from_db()
+        progress = dispatch_progress(outbox)
+        self.assertEqual(progress['status'], NotificationOutbox.STATUS_SENT)
+        self.assertEqual((progress['recipients_sent'],
+                          progress['recipients_total'],
+                          progress['batches_sent'], progress['progress']),
+                         (7, 7, 4, 1.0))
+        self.assertIsNotNone(progress['emails_per_second'])
+        stats = delivery_stats('newsletter')
+        self.assertEqual((stats['counts']['sent'], stats['emails']), (1, 7))
+        self.assertEqual(delivery_stats('article')['emails'], 0)
+
+    def test_failed_batch_stops_the_cursor(self) -> None:
+        """
+        When a batch fails, the cursor stays after the last batch
+        recorded before it, and a retry completes the delivery.
+
+        :return: None
+        """
+        outbox = self.approve()
+
+        def flaky_send(backend, messages):
+            if messages[0].to == ['reader2@example.com']:
+                raise ConnectionError('relay went away')
+            return len(messages)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend'
+                        '.send_messages', flaky_send):
+            result = drain_outbox(batch_size=2, concurrency=2)
+        self.assertEqual(result.failed, 1)
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.status, NotificationOutbox.STATUS_PENDING)
+        self.assertEqual(outbox.last_recipient, 'reader1@example.com')
+
+        drain_outbox(batch_size=2, concurrency=2)
+        outbox.refresh_from_db()
+        self.assertEqual(outbox.status, NotificationOutbox.STATUS_SENT)
+        self.assertEqual(outbox.recipients_sent, 7)
+        self.assertEqual(outbox.last_recipient, 'reader6@example.com')
@@ -0,0 +1,260 @@
+"""
+Field change tracking for models.
+
+:class:`TrackedFieldsMixin` remembers the values of a model's
+``tracked_fields`` as they were loaded from (or last saved to) the
+database, so code can tell what a save actually changed without querying.
+:class:`ApprovalTrackingMixin` builds on it to send the :data:`approving`
+signal inside the saving transaction, and the :data:`approved` signal
+after it commits, exactly once when an instance goes from unapproved to
+approved.
+"""
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from django.db import connections, router, transaction
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+#: Sent inside the transaction that approves an instance, so the rows
+#: receivers write (outbox entries, queued posts, feed entries) commit or
+#: roll back with the approval. A receiver that raises rolls it back.
+#: Receivers get ``sender`` (the model class) and ``instance``.
+approving = Signal()
+
+#: Sent once, after commit, when an instance becomes approved, for side
+#: effects that need not survive a crash. Failing receivers are logged
+#: and do not stop the others. Receivers get ``sender`` and ``instance``.
+approved = Signal()
+
+_MISSING = object()
+
+
+class _CommitFlag:
+    """
+    ``on_commit`` callback that records whether its transaction has
+    committed.
+    """
+
+    def __init__(self) -> None:
+        self.committed = False
+
+    def __call__(self) -> None:
+        self.committed = True
+
+
+class TrackedFieldsMixin:
+    """
+    Model mixin that records the stored values of ``tracked_fields``.
+
+    The snapshot is taken when an instance is loaded from the database and
+    refreshed after each save, so :meth:`has_changed` and
+    :meth:`get_changes` are answered from memory. A save made in a
+    transaction only moves the snapshot forward for good once the
+    transaction commits; if it rolls back, the previous snapshot is used
+    again. Subclasses can override
+    :meth:`tracked_fields_saved` to react to the changes a save made.
+
+    :ivar tracked_fields: Names of the fields to track.
+    :type tracked_fields: tuple
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tracked_snapshot = instance._current_tracked_values()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs: Any) -> None:
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        snapshot = dict(self._snapshot())
+        self._tracked_pending = []
+        snapshot.update({
+            name: value
+            for name, value in self._current_tracked_values().items()
+            if fields is None or name in fields
+        })
+        self._tracked_snapshot = snapshot
+
+    def _snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the stored values, taking saves made in a transaction
+        into account while the transaction is open, and falling back to
+        the values before a save whose transaction (or savepoint) rolled
+        back.
+
+        :return: Stored value by field name.
+        :rtype: dict
+        """
+        pending = getattr(self, '_tracked_pending', [])
+        while pending:
+            snapshot, flag, using = pending[-1]
+            if flag.committed:
+                # Earlier saves were part of the same, committed, work.
+                self._tracked_snapshot = snapshot
+                pending.clear()
+            elif any(callback[1] is flag
+                     for callback in connections[using].run_on_commit):
+                return snapshot
+            else:
+                pending.pop()
+        if not hasattr(self, '_tracked_snapshot'):
+            self._tracked_snapshot = {}
+        return self._tracked_snapshot
+
+    def _current_tracked_values(self) -> Dict[str, Any]:
+        deferred = self.get_deferred_fields()
+        values = {}
+        for name in self.tracked_fields:
+            attname = self._meta.get_field(name).attname
+            if attname not in deferred:
+                values[name] = getattr(self, attname)
+        return values
+
+    def get_stored_value(self, name: str) -> Any:
+        """
+        Returns the value a tracked field had when it was last loaded or
+        saved.
+
+        :param name: Name of a tracked field.
+        :type name: str
+        :return: The stored value, or None for an unsaved instance.
+        """
+        return self._snapshot().get(name)
+
+    def has_changed(self, name: str) -> bool:
+        """
+        Determines whether a tracked field differs from its stored value.
+
+        :param name: Name of a tracked field.
+        :type name: str
+        :return: True if the in-memory value differs from the stored one,
+            or if the instance has not been saved yet.
+        :rtype: bool
+        """
+        return name in self.get_changes()
+
+    def get_changes(self) -> Dict[str, tuple]:
+        """
+        Returns the tracked fields whose in-memory value differs from the
+        stored value.
+
+        :return: A mapping of field name to ``(old, new)`` values.
+        :rtype: dict
+        """
+        snapshot = self._snapshot()
+        changes = {}
+        for name, value in self._current_tracked_values().items():
+            old = snapshot.get(name, _MISSING)
+            if old is _MISSING:
+                if self._state.adding:
+                    changes[name] = (None, value)
+            elif old != value:
+                changes[name] = (old, value)
+        return changes
+
+    def _load_missing_snapshot(self, update_fields: Optional[Iterable[str]],
+                               using: Optional[str]) -> None:
+        """
+        Fetches stored values for tracked fields that were deferred when
+        the instance was loaded but are about to be saved.
+        """
+        if self._state.adding:
+            return
+        snapshot = self._snapshot()
+        missing = [
+            name for name in self.tracked_fields
+            if name not in snapshot
+            and (update_fields is None or name in update_fields)
+        ]
+        if missing:
+            row = type(self)._base_manager.using(
+                using or self._state.db
+            ).filter(pk=self.pk).values(*missing).first()
+            snapshot.update(row or {})
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        Saves the instance, then refreshes the snapshot and passes the
+        tracked changes the save wrote to :meth:`tracked_fields_saved`,
+        in one transaction.
+
+        :param args: Positional arguments for the model's save method.
+        :param kwargs: Keyword arguments for the model's save method.
+        :return: None
+        """
+        update_fields = kwargs.get('update_fields')
+        using = kwargs.get('using') or router.db_for_write(type(self),
+                                                           instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            self._load_missing_snapshot(update_fields, using)
+            created = self._state.adding
+            changes = self.get_changes()
+            if update_fields is not None:
+                changes = {name: change for name, change in changes.items()
+                           if name in update_fields}
+            super().save(*args, **kwargs)
+            if not changes and not created:
+                return
+            snapshot = dict(self._snapshot())
+            snapshot.update({name: new
+                             for name, (old, new) in changes.items()})
+            if created:
+                snapshot.update(self._current_tracked_values())
+            flag = _CommitFlag()
+            if not hasattr(self, '_tracked_pending'):
+                self._tracked_pending = []
+            self._tracked_pending.append((snapshot, flag, using))
+            transaction.on_commit(flag, using=using)
+            if changes:
+                self.tracked_fields_saved(changes, created)
+
+    def tracked_fields_saved(self, changes: Dict[str, tuple],
+                             created: bool) -> None:
+        """
+        Hook called after a save that changed at least one tracked field.
+
+        :param changes: Mapping of field name to ``(old, new)`` values.
+        :type changes: dict
+        :param created: Whether the save inserted a new row.
+        :type created: bool
+        :return: None
+        """
+
+
+class ApprovalTrackingMixin(TrackedFieldsMixin):
+    """
+    Model mixin that signals when an instance's ``approved`` field is
+    saved as True after previously being False (or when it is created
+    already approved).
+
+    :data:`approving` is sent inside the saving transaction, for the
+    durable work an approval triggers. :data:`approved` is deferred with
+    ``transaction.on_commit`` and sent robustly. Both fire exactly once
+    per transition, and :data:`approved` never for a rolled back save.
+    Saves that leave ``approved`` unchanged do no extra work at all.
+    """
+    tracked_fields = ('approved',)
+
+    def tracked_fields_saved(self, changes: Dict[str, tuple],
+                             created: bool) -> None:
+        super().tracked_fields_saved(changes, created)
+        old, new = changes.get('approved', (None, None))
+        if new and not old:
+            approving.send(sender=type(self), instance=self)
+            transaction.on_commit(self._send_approved, using=self._state.db)
+
+    def _send_approved(self) -> None:
+        """
+        Sends :data:`approved`, logging the receivers that fail.
+
+        :return: None
+        """
+        for receiver, result in approved.send_robust(sender=type(self),
+                                                     instance=self):
+            if isinstance(result, Exception):
+                logger.error(
+                    'approved receiver %r failed for %s %s', receiver,
+                    type(self).__name__, self.pk, exc_info=result)
@@ -1,6 +1,8 @@
 from django.urls import path
 from .views import (
-    home, article_list, signup, profile, ArticleListView,
+    home, article_list, signup, profile, ArticleListView, ArticleSearchView,
+    article_export,
+    SubscriptionsView,
     JournalistListView, PublisherListView, approve_article,
     editor_dashboard, journalist_dashboard, subscriptions,
     submit_article, add_publisher, browse_publishers, browse_journalists,
@@ -17,6 +19,11 @@ urlpatterns = [
     path('accounts/profile/', profile, name='profile'),
     path('api/articles/', ArticleListView.as_view(),
          name='article_list'),
+    path('api/articles/search/', ArticleSearchView.as_view(),
+         name='article_search'),
+    path('api/articles/export/', article_export, name='article_export'),
+    path('api/subscriptions/', SubscriptionsView.as_view(),
+         name='subscriptions_api'),
     path('api/journalists/', JournalistListView.as_view(),
          name='journalist_list'),
     path('api/publishers/', PublisherListView.as_view(), name='publisher_list'),
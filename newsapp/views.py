@@ -1,19 +1,44 @@
+from typing import List, Optional
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import UserCreationForm
-from django.db.models import QuerySet
-from django.http import HttpResponse, HttpRequest, HttpResponseRedirect
+from django.db import transaction
+from django.core.paginator import Page, Paginator
+from django.db.models import Exists, OuterRef, QuerySet
+from django.http import HttpResponse, HttpRequest, HttpResponseRedirect, \
+    JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_GET
 from django.views.generic import CreateView
 from rest_framework import generics
+from rest_framework.views import APIView
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .access import has_role
+from .cache import cache_public_listing, conditional_response, get_cache, \
+    get_generation, listing_cache_key, set_validators
 from .forms import ArticleForm, NewsletterForm, AssignPublisherForm
 from .forms import CustomUserCreationForm
+from .exports import CONTENT_TYPES, export_articles, parse_since
 from .models import Article, Journalist, Publisher, Newsletter
+from .feeds import JournalistSubscription, PublisherSubscription, \
+    reader_feed
+from .pagination import KeysetPagination
+from .routers import pin_to_primary, read_from_replicas
 from .forms import PublisherForm
+from .search import MODELS, search
 from .serializers import JournalistSerializer, PublisherSerializer, \
-    ArticleSerializer
+    ArticleSerializer, NewsletterSerializer, SubscriptionChangeSerializer, \
+    ValuesSerializer
+from .subscriptions import SubscriptionError, change_subscriptions, \
+    subscription_state
 
 # ------------- Helper role checks -------------
+# The checks resolve the role through newsapp.access, once per request.
 def is_editor(user):
     """
     Determines if the given user has the role of an editor.
@@ -29,7 +54,7 @@ def is_editor(user):
         of 'editor', otherwise False.
     :rtype: bool
     """
-    return user.is_authenticated and user.role == 'editor'
+    return has_role(user, 'editor')
 
 def is_journalist(user):
     """
@@ -45,7 +70,7 @@ def is_journalist(user):
         is 'journalist'. Otherwise, returns `False`.
     :rtype: bool
     """
-    return user.is_authenticated and user.role == 'journalist'
+    return has_role(user, 'journalist')
 
 def is_reader(user):
     """
@@ -64,7 +89,7 @@ def is_reader(user):
         otherwise False.
     :rtype: bool
     """
-    return user.is_authenticated and user.role == 'reader'
+    return has_role(user, 'reader')
 
 # ------------- Home Page -------------
 def home(request: HttpRequest) -> HttpResponse:
@@ -84,19 +109,31 @@ def home(request: HttpRequest) -> HttpResponse:
         or an empty context for anonymous users.
     :rtype: HttpResponse
     """
+    return render(request, 'newsapp/home.html', home_context(request.user))
+
+
+def home_context(user) -> dict:
+    """
+    Builds the home page context for a user.
+
+    :param user: The user, possibly anonymous.
+    :return: The dashboard URL name and label for the user's role; empty
+        for anonymous users.
+    :rtype: dict
+    """
     context = {}
-    if request.user.is_authenticated:
-        if request.user.role == 'editor':
+    if user.is_authenticated:
+        if user.role == 'editor':
             context['dashboard_url'] = 'editor_dashboard'
             context['dashboard_label'] = 'Editor Dashboard'
-        elif request.user.role == 'journalist':
+        elif user.role == 'journalist':
             context['dashboard_url'] = 'journalist_dashboard'
             context['dashboard_label'] = 'Journalist Dashboard'
-        elif request.user.role == 'reader':
+        elif user.role == 'reader':
             context['dashboard_url'] = 'subscriptions'
             context['dashboard_label'] = 'My Subscriptions'
     # no else needed; context blank for anonymous
-    return render(request, 'newsapp/home.html', context)
+    return context
 
 # ------------- Role-Based Dashboards -------------
 @login_required
@@ -115,8 +152,11 @@ def editor_dashboard(request: HttpRequest) -> HttpResponse:
         unapproved articles.
     :rtype: HttpResponse
     """
-    # Show all articles not approved yet
-    articles = Article.objects.filter(approved=False)
+    # Show all articles not approved yet, oldest first, with their
+    # authors loaded in the same query
+    articles = Article.objects.filter(approved=False).select_related(
+        'journalist').only('id', 'title', 'created_at', 'approved',
+                           'journalist__username').order_by('created_at')
     return render(request,
                   'newsapp/editor_dashboard.html',
                   {'articles': articles})
@@ -136,7 +176,8 @@ def journalist_dashboard(request: HttpRequest) -> HttpResponse:
         template with context data.
     :rtype: HttpResponse
     """
-    articles = request.user.journalist_articles.filter(approved=True)
+    articles = request.user.journalist_articles.filter(
+        approved=True).order_by('-created_at')
     has_unapproved_articles = request.user.journalist_articles.filter(
         approved=False).exists()
     return render(
@@ -182,6 +223,10 @@ def approve_article(request: HttpRequest, article_id: int) -> HttpResponse:
     editor dashboard. Otherwise, a template for approving the article is
     rendered.
 
+    Once the approval commits, the subscriber notification is queued in
+    the outbox; the emails are delivered later by the
+    ``send_notifications`` worker, so the request does not wait on SMTP.
+
     :param request: The HTTP request object provided by Django.
     :param article_id: The ID of the article to be approved.
     :return: An HTTP response redirecting to the editor dashboard
@@ -190,8 +235,9 @@ def approve_article(request: HttpRequest, article_id: int) -> HttpResponse:
     """
     article = get_object_or_404(Article, id=article_id)
     if request.method == 'POST':
-        article.approved = True
-        article.save()
+        with transaction.atomic():
+            article.approved = True
+            article.save()
         return redirect('editor_dashboard')
     return render(
         request,
@@ -200,6 +246,8 @@ def approve_article(request: HttpRequest, article_id: int) -> HttpResponse:
     )
 
 # ------------- Article List, Profile, Signup -------------
+@cache_public_listing
+@read_from_replicas
 def article_list(request: HttpRequest) -> HttpResponse:
     """
     Retrieves and renders a list of approved articles.
@@ -207,14 +255,16 @@ def article_list(request: HttpRequest) -> HttpResponse:
     This function queries the Article model for entries marked as approved
     and renders them using the 'newsapp/article_list.html' template. The
     result is a dynamically generated web page displaying the list of
-    articles.
+    articles. Pages rendered for anonymous visitors are cached until the
+    next article change (see :mod:`newsapp.cache`).
 
     :param request: The HTTP request object, representing the client's
         request to the server.
     :return: An HttpResponse instance containing the rendered article list
         page.
     """
-    articles = Article.objects.filter(approved=True)
+    articles = Article.objects.filter(approved=True).order_by(
+        '-created_at', '-id')
     return render(
         request, 'newsapp/article_list.html',
         {'articles': articles})
@@ -264,8 +314,71 @@ def signup(request: HttpRequest) -> HttpResponse:
         {'form': form})
 
 
-# ------------- REST API views (unchanged) -------------
-class ArticleListView(generics.ListAPIView):
+# ------------- REST API views -------------
+class ValuesListMixin:
+    """
+    List-view mixin that reads ``values()`` rows and serializes them with
+    :class:`~newsapp.serializers.ValuesSerializer` instead of building
+    model instances and running the model serializer for each one. The
+    JSON output is the same.
+
+    :ivar keyset_columns: Columns always read, for pagination.
+    :type keyset_columns: tuple
+    """
+    keyset_columns = ()
+
+    def get_values_serializer(self) -> ValuesSerializer:
+        """
+        :return: The fast serializer mirroring ``serializer_class``.
+        :rtype: ValuesSerializer
+        """
+        return ValuesSerializer.for_serializer(self.serializer_class)
+
+    def list(self, request, *args, **kwargs) -> Response:
+        """
+        Returns the serialized rows, paginated if the view has a
+        paginator.
+
+        :returns: The list response.
+        :rtype: Response
+        """
+        serializer = self.get_values_serializer()
+        columns = list(serializer.columns)
+        columns += [c for c in self.keyset_columns if c not in columns]
+        queryset = self.filter_queryset(self.get_queryset()).values(*columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
+
+
+def parse_fields(value: Optional[str], serializer_class: type
+                 ) -> Optional[List[str]]:
+    """
+    Parses a ``fields`` query parameter selecting a sparse fieldset.
+
+    :param value: The parameter, such as ``"id,title,created_at"``.
+    :type value: str or None
+    :param serializer_class: The serializer the fields belong to.
+    :type serializer_class: type
+    :returns: The requested field names, or None when the parameter is
+        absent.
+    :rtype: list[str] or None
+    :raises ValidationError: If an unknown field is requested.
+    """
+    if not value:
+        return None
+    fields = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = set(fields) - set(serializer_class().fields)
+    if unknown:
+        raise ValidationError(
+            {'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+    return fields
+
+
+# On list, not dispatch: DRF authenticates the user from the primary first.
+@method_decorator(read_from_replicas, name='list')
+class ArticleListView(ValuesListMixin, generics.ListAPIView):
     """
     Provides a list view for articles with specific filtering logic
     based on user authentication and subscriptions.
@@ -274,15 +387,86 @@ class ArticleListView(generics.ListAPIView):
     or all approved articles when unauthenticated.
 
     Specifically, for authenticated users with the role of 'reader',
-    the view will filter articles published by the publishers or
+    the view will return the reader's precomputed feed (see
+    :mod:`newsapp.feeds`) of articles published by the publishers or
     journalists to whom the user has subscribed. If a user is not
     authenticated, the view defaults to returning all approved articles.
 
+    Results are returned newest first and paginated with a keyset cursor
+    (see :class:`~newsapp.pagination.KeysetPagination`); the next page is
+    linked from the ``Link`` response header. A ``fields`` query
+    parameter, such as ``?fields=id,title,created_at``, selects a sparse
+    fieldset and only those columns are read from the database.
+
     :ivar serializer_class: The serializer class for the articles.
     :type serializer_class: type
+    :ivar pagination_class: The paginator used for the list.
+    :type pagination_class: type
 
     """
     serializer_class = ArticleSerializer
+    pagination_class = KeysetPagination
+    keyset_columns = ('id', 'created_at')
+
+    def get_fields(self) -> Optional[List[str]]:
+        """
+        Parses the ``fields`` query parameter.
+
+        :returns: The requested field names, or None when the parameter
+            is absent.
+        :rtype: list[str] or None
+        :raises ValidationError: If an unknown field is requested.
+        """
+        return parse_fields(self.request.query_params.get('fields'),
+                            self.serializer_class)
+
+    def get_serializer(self, *args, **kwargs) -> ArticleSerializer:
+        """
+        Builds the serializer, restricted to the requested sparse
+        fieldset.
+
+        :returns: The serializer instance.
+        :rtype: ArticleSerializer
+        """
+        kwargs.setdefault('fields', self.get_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_values_serializer(self) -> ValuesSerializer:
+        """
+        :returns: The fast serializer for the requested sparse fieldset.
+        :rtype: ValuesSerializer
+        """
+        return ValuesSerializer.for_serializer(self.serializer_class,
+                                               self.get_fields())
+
+    def list(self, request, *args, **kwargs) -> Response:
+        """
+        Returns a page of articles. Pages requested anonymously are served
+        from the listing cache of the current article generation when
+        possible, and conditional requests for an unchanged page get
+        ``304 Not Modified``.
+
+        :returns: The page of articles.
+        :rtype: Response
+        """
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        generation = get_generation()
+        not_modified = conditional_response(request, generation)
+        if not_modified is not None:
+            return not_modified
+        cache = get_cache()
+        key = listing_cache_key(request, generation)
+        cached = cache.get(key)
+        if cached is not None:
+            response = Response(*cached)
+        else:
+            response = super().list(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, (response.data, response.status_code,
+                                None, dict(response.items())),
+                          getattr(settings, 'LISTING_CACHE_TIMEOUT', 300))
+        return set_validators(response, request, generation)
 
     def get_queryset(self) -> QuerySet[Article]:
         """
@@ -294,27 +478,164 @@ class ArticleListView(generics.ListAPIView):
         authenticated or does not have a 'reader' role, only approved
         articles are returned.
 
+        :meth:`list` reads only the columns of the requested sparse
+        fieldset from it, plus the keyset columns.
+
         :returns: A filtered queryset of articles based on user
             subscriptions or approved status.
         :rtype: QuerySet[Article]
         """
         user = self.request.user
         if user.is_authenticated and user.role == 'reader':
-            publishers = user.subscriptions_publishers.all()
-            journalists = user.subscriptions_journalists.all()
-            return Article.objects.filter(
-                approved=True
-            ).filter(
-                publisher__in=publishers
-            ) | Article.objects.filter(
-                approved=True
-            ).filter(
-                journalist__in=journalists
-            )
-        return Article.objects.filter(approved=True)
-
-
-class JournalistListView(generics.ListAPIView):
+            queryset = reader_feed(user)
+        else:
+            queryset = Article.objects.filter(approved=True)
+        return queryset
+
+
+class ArticleSearchView(APIView):
+    """
+    Full-text search over approved articles, or newsletters with
+    ``?kind=newsletter``.
+
+    The ``q`` parameter holds the query; a word ending in ``*`` matches
+    every word starting with it. Results are ranked with BM25 from the
+    inverted index in :mod:`newsapp.search`, best match first, and each
+    result carries its ``score``. ``limit`` caps the number of results,
+    up to ``max_limit``.
+
+    :ivar serializers: Serializer class for each searchable kind.
+    :type serializers: dict
+    :ivar max_limit: Largest number of results a client may request.
+    :type max_limit: int
+    """
+    serializers = {
+        'article': ArticleSerializer,
+        'newsletter': NewsletterSerializer,
+    }
+    max_limit = 100
+
+    def get(self, request) -> Response:
+        """
+        Runs the search.
+
+        :param request: The current request.
+        :returns: The matching objects with their scores.
+        :rtype: Response
+        :raises ValidationError: If ``q`` is missing or ``kind`` is
+            unknown.
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': 'A search query is required.'})
+        kind = request.query_params.get('kind', 'article')
+        if kind not in self.serializers:
+            raise ValidationError({'kind': f"Unknown kind: {kind}"})
+        try:
+            limit = min(max(int(request.query_params['limit']), 1),
+                        self.max_limit)
+        except (KeyError, ValueError):
+            limit = None
+        ranked = search(query, kind, limit)
+        objects = MODELS[kind].objects.filter(approved=True).in_bulk(
+            [object_id for object_id, _ in ranked])
+        data = []
+        for object_id, score in ranked:
+            if object_id in objects:
+                row = self.serializers[kind](objects[object_id]).data
+                row['score'] = round(score, 4)
+                data.append(row)
+        return Response(data)
+
+
+@require_GET
+def article_export(request: HttpRequest) -> HttpResponse:
+    """
+    Streams every approved article as NDJSON (``?format=ndjson``, the
+    default) or CSV (``?format=csv``), oldest first.
+
+    Rows are read in keyset batches and written as they are serialized
+    (see :mod:`newsapp.exports`), so the size of the dump does not affect
+    the worker's memory. The ``X-Export-Cursor`` response header holds
+    the position of the last exported article; passing it back as
+    ``?since=`` exports only newer articles. ``since`` also accepts an
+    ISO 8601 timestamp.
+
+    :param request: The HTTP request object.
+    :return: The streaming export, or a 400 response for an unknown
+        format or an invalid ``since``.
+    """
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in CONTENT_TYPES:
+        return JsonResponse({'format': f"Unknown format: {fmt}"}, status=400)
+    since = request.GET.get('since')
+    if since:
+        try:
+            since = parse_since(since)
+        except ValueError:
+            return JsonResponse({'since': 'Invalid cursor or timestamp.'},
+                                status=400)
+    chunks, cursor = export_articles(fmt, since or None)
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = \
+        f'attachment; filename="articles.{fmt}"'
+    if cursor:
+        response['X-Export-Cursor'] = cursor
+    return response
+
+
+class SubscriptionsView(APIView):
+    """
+    Reads and changes the current reader's subscriptions in bulk.
+
+    ``GET`` returns ``{"publishers": [...], "journalists": [...]}``.
+    ``POST`` takes ids to add and remove, for example
+    ``{"publishers": {"add": [1, 2], "remove": [3]},
+    "journalists": {"add": [4]}}``, applies them in one transaction and
+    returns the resulting state. Journalists are identified by their
+    ``Journalist`` id, as in the browse pages. Unknown ids, or an id
+    both added and removed, reject the whole request with ``400``.
+
+    :ivar permission_classes: Only logged-in users may call the view.
+    :type permission_classes: list
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request) -> Response:
+        """
+        :returns: The reader's current subscriptions.
+        :rtype: Response
+        """
+        return Response(subscription_state(request.user))
+
+    def post(self, request) -> Response:
+        """
+        Applies a bulk subscription change.
+
+        :returns: The reader's subscriptions after the change.
+        :rtype: Response
+        :raises PermissionDenied: If the user is not a reader.
+        :raises ValidationError: If the body or an id is invalid.
+        """
+        if request.user.role != 'reader':
+            raise PermissionDenied('Only readers have subscriptions.')
+        serializer = SubscriptionChangeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        publishers = serializer.validated_data.get('publishers', {})
+        journalists = serializer.validated_data.get('journalists', {})
+        try:
+            state = change_subscriptions(
+                request.user,
+                add_publishers=publishers.get('add', ()),
+                remove_publishers=publishers.get('remove', ()),
+                add_journalists=journalists.get('add', ()),
+                remove_journalists=journalists.get('remove', ()))
+        except SubscriptionError as e:
+            raise ValidationError(e.errors)
+        return Response(state)
+
+
+class JournalistListView(ValuesListMixin, generics.ListAPIView):
     """
     Represents a read-only view for listing journalists.
 
@@ -334,7 +655,7 @@ class JournalistListView(generics.ListAPIView):
     serializer_class = JournalistSerializer
 
 
-class PublisherListView(generics.ListAPIView):
+class PublisherListView(ValuesListMixin, generics.ListAPIView):
     """
     Handles the retrieval and listing of Publisher objects.
 
@@ -437,11 +758,37 @@ def add_publisher(request: HttpRequest) -> HttpResponse:
         "newsapp/add_publisher.html",
         {'form': form})
 
+def browse_page(request: HttpRequest, queryset: QuerySet) -> Page:
+    """
+    Returns one page of a directory listing ordered by name.
+
+    The ``q`` query parameter keeps only names starting with it (case
+    insensitively), and ``page`` selects the page; pages hold
+    ``BROWSE_PAGE_SIZE`` entries.
+
+    :param request: The HTTP request carrying ``q`` and ``page``.
+    :type request: HttpRequest
+    :param queryset: Publishers or journalists, which have a ``name``.
+    :type queryset: QuerySet
+    :return: The requested page, or the last one if it is out of range.
+    :rtype: Page
+    """
+    prefix = request.GET.get('q', '').strip()
+    if prefix:
+        queryset = queryset.filter(name__istartswith=prefix)
+    paginator = Paginator(queryset.order_by('name', 'id'),
+                          getattr(settings, 'BROWSE_PAGE_SIZE', 50))
+    return paginator.get_page(request.GET.get('page'))
+
+
 @login_required
+@read_from_replicas
 def browse_publishers(request: HttpRequest) -> HttpResponse:
     """
-    Retrieve and render the list of publishers and current user's
-    subscribed publishers within a template.
+    Retrieve and render the list of publishers, each flagged with
+    whether the current user is subscribed to it, within a template.
+    The list is paginated and can be filtered by name prefix (see
+    :func:`browse_page`).
 
     :param request: An HTTP request object that represents the client's
         request to the server. This includes information about the user,
@@ -452,23 +799,28 @@ def browse_publishers(request: HttpRequest) -> HttpResponse:
         the user's subscriptions as context.
     :rtype: HttpResponse
     """
-    publishers = Publisher.objects.all()
-    user_subs = request.user.subscriptions_publishers.all()
+    publishers = Publisher.objects.only('id', 'name').annotate(
+        is_subscribed=Exists(PublisherSubscription.objects.filter(
+            customuser_id=request.user.pk, publisher_id=OuterRef('pk'))))
+    page = browse_page(request, publishers)
     return render(
         request, 'newsapp/browse_publishers.html', {
-        'publishers': publishers,
-        'user_subs': user_subs
+        'publishers': page,
+        'page_obj': page,
+        'q': request.GET.get('q', ''),
     })
 
 
 @login_required
+@read_from_replicas
 def browse_journalists(request: HttpRequest) -> HttpResponse:
     """
     Browse a list of journalists and display them on the "browse
-    journalists" page. This function retrieves all available journalists
-    from the database and also fetches the logged-in user's
-    journalist subscriptions. These are then rendered on the specified
-    HTML template.
+    journalists" page. This function retrieves one page of journalists,
+    optionally filtered by name prefix (see :func:`browse_page`), each
+    annotated with whether the logged-in user is subscribed to them, in
+    a single query. These are then rendered on the specified HTML
+    template.
 
     :param request: The HTTP request object containing metadata
         about the request.
@@ -477,12 +829,16 @@ def browse_journalists(request: HttpRequest) -> HttpResponse:
         journalists" HTML template.
     :rtype: HttpResponse
     """
-    journalists = Journalist.objects.all()
-    user_subs = request.user.subscriptions_journalists.all()
+    journalists = Journalist.objects.only('id', 'name').annotate(
+        is_subscribed=Exists(JournalistSubscription.objects.filter(
+            from_customuser_id=request.user.pk,
+            to_customuser_id=OuterRef('user_id'))))
+    page = browse_page(request, journalists)
     return render(
         request, 'newsapp/browse_journalists.html', {
-        'journalists': journalists,
-        'user_subs': user_subs
+        'journalists': page,
+        'page_obj': page,
+        'q': request.GET.get('q', ''),
     })
 
 
@@ -504,6 +860,8 @@ def subscribe_publisher(request: HttpRequest, pk: int) -> HttpResponse:
     """
     publisher = get_object_or_404(Publisher, pk=pk)
     request.user.subscriptions_publishers.add(publisher)
+    # Subscriptions change on GET, so the middleware does not pin.
+    pin_to_primary(request)
     return redirect('browse_publishers')
 
 
@@ -523,6 +881,8 @@ def unsubscribe_publisher(request: HttpRequest,
     """
     publisher = get_object_or_404(Publisher, pk=pk)
     request.user.subscriptions_publishers.remove(publisher)
+    # Subscriptions change on GET, so the middleware does not pin.
+    pin_to_primary(request)
     return redirect('browse_publishers')
 
 
@@ -547,6 +907,8 @@ def subscribe_journalist(request: HttpRequest,
     """
     journalist = get_object_or_404(Journalist, pk=pk)
     request.user.subscriptions_journalists.add(journalist.user)
+    # Subscriptions change on GET, so the middleware does not pin.
+    pin_to_primary(request)
     return redirect('browse_journalists')
 
 
@@ -572,6 +934,8 @@ def unsubscribe_journalist(request: HttpRequest,
     """
     journalist = get_object_or_404(Journalist, pk=pk)
     request.user.subscriptions_journalists.remove(journalist.user)
+    # Subscriptions change on GET, so the middleware does not pin.
+    pin_to_primary(request)
     return redirect('browse_journalists')
 
 
@@ -631,7 +995,8 @@ def newsletter_update(request: HttpRequest, pk: int) -> HttpResponse:
     :rtype: HttpResponse
     """
     newsletter = get_object_or_404(Newsletter, pk=pk)
-    if (request.user == newsletter.journalist) or is_editor(request.user):
+    if (newsletter.journalist_id == request.user.pk
+            or is_editor(request.user)):
         if request.method == 'POST':
             form = NewsletterForm(request.POST, instance=newsletter)
             if form.is_valid():
@@ -662,7 +1027,8 @@ def newsletter_delete(request: HttpRequest, pk: int) -> HttpResponseRedirect:
     :rtype: HttpResponseRedirect
     """
     newsletter = get_object_or_404(Newsletter, pk=pk)
-    if (request.user == newsletter.journalist) or is_editor(request.user):
+    if (newsletter.journalist_id == request.user.pk
+            or is_editor(request.user)):
         newsletter.delete()
     return redirect('newsletter_list')
 
@@ -704,6 +1070,7 @@ def approve_newsletter(request: HttpRequest, pk: int) -> HttpResponse:
 
 
 @login_required
+@read_from_replicas
 def newsletter_list(request: HttpRequest) -> HttpResponse:
     """
     Fetches and displays a list of newsletters for the user based on
@@ -721,10 +1088,14 @@ def newsletter_list(request: HttpRequest) -> HttpResponse:
         appropriate newsletters for the user's role.
     :rtype: HttpResponse
     """
+    # The list only shows titles; authorship is checked on journalist_id
+    newsletters = Newsletter.objects.only(
+        'id', 'title', 'approved', 'journalist_id', 'created_at')
     if is_editor(request.user) or is_journalist(request.user):
-        newsletters = Newsletter.objects.all()
+        newsletters = newsletters.order_by('-created_at')
     elif is_reader(request.user):
-        newsletters = Newsletter.objects.filter(approved=True)
+        newsletters = newsletters.filter(
+            approved=True).order_by('-created_at')
     else:
         newsletters = Newsletter.objects.none()
     return render(request,
@@ -750,9 +1121,10 @@ def newsletter_detail(request: HttpRequest, pk: int) -> HttpResponse:
         list page if access is denied.
     :rtype: HttpResponse
     """
-    newsletter = get_object_or_404(Newsletter, pk=pk)
+    newsletter = get_object_or_404(
+        Newsletter.objects.select_related('publisher', 'journalist'), pk=pk)
     allowed = (newsletter.approved
-               or (request.user == newsletter.journalist)
+               or newsletter.journalist_id == request.user.pk
                or is_editor(request.user))
     if allowed:
         return render(request,
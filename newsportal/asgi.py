@@ -12,5 +12,9 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'newsportal.settings')
+# Sync ORM calls run in asgiref's executor threads, which request cleanup
+# does not reach, so persistent connections would pile up; open one per
+# request unless DB_CONN_MAX_AGE says otherwise (see databases.py).
+os.environ.setdefault('DB_CONN_MAX_AGE', '0')
 
 application = get_asgi_application()
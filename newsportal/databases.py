@@ -0,0 +1,149 @@
+"""
+Database configuration read from the environment.
+
+``DB_ENGINE`` selects the backend: ``mysql`` (the default), ``postgresql``
+or ``sqlite3``, or the dotted path of any other backend. SQLite needs no
+server, which makes it the fallback for local development and tests:
+``DB_ENGINE=sqlite3`` stores the database in ``db.sqlite3`` next to
+``manage.py`` unless ``DB_NAME`` names another file. Other variables:
+
+``DB_NAME``, ``DB_USER``, ``DB_PASSWORD``, ``DB_HOST``, ``DB_PORT``
+    Connection parameters. ``DB_PASSWORD`` is required for database
+    servers; set it empty for servers that need no password.
+``DB_CONN_MAX_AGE``
+    Seconds a connection is kept open and reused by later requests of the
+    same worker thread (default 60); 0 opens a connection per request
+    and ``none`` keeps connections open indefinitely. Under ASGI the ORM
+    runs in short-lived executor threads whose connections no request
+    would close, so ``newsportal/asgi.py`` makes 0 the default there.
+``DB_CONN_HEALTH_CHECKS``
+    Whether a reused connection is checked before a request uses it, so
+    one dropped by the server is replaced instead of failing the request
+    (default true).
+``DB_POOL_MIN_SIZE``, ``DB_POOL_MAX_SIZE``
+    Size of the connection pool shared by the threads of a process.
+    Only PostgreSQL has a pool in Django; it needs ``psycopg[pool]`` and
+    replaces persistent connections. With MySQL and SQLite each worker
+    thread keeps at most one persistent connection, so the number of
+    worker threads bounds the connections of a process.
+``DB_REPLICAS``
+    Comma separated aliases of read replicas, such as ``replica1``. Each
+    replica is configured like the primary, with variables prefixed by
+    its alias (``DB_REPLICA1_HOST``); those not set are taken from the
+    primary's. For example, ``DB_ENGINE=sqlite3 DB_REPLICAS=replica
+    DB_REPLICA_NAME=replica.sqlite3`` uses two local SQLite files.
+"""
+import os
+from pathlib import Path
+from typing import Mapping, Optional
+
+from django.core.exceptions import ImproperlyConfigured
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+ENGINES = {
+    'mysql': 'django.db.backends.mysql',
+    'postgresql': 'django.db.backends.postgresql',
+    'sqlite3': 'django.db.backends.sqlite3',
+}
+
+MYSQL_DEFAULTS = {
+    'NAME': 'newsappdb',
+    'USER': 'admin',
+    'HOST': 'localhost',
+    'PORT': '3306',
+}
+
+
+def _flag(value: str) -> bool:
+    """
+    :param value: An environment value such as ``true`` or ``0``.
+    :type value: str
+    :return: Whether the value is true.
+    :rtype: bool
+    """
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _max_age(value: str) -> Optional[int]:
+    """
+    :param value: Value of ``DB_CONN_MAX_AGE``.
+    :type value: str
+    :return: The ``CONN_MAX_AGE`` it stands for; None for ``none``.
+    :rtype: int or None
+    """
+    if value.strip().lower() == 'none':
+        return None
+    return int(value)
+
+
+def database_config(environ: Mapping[str, str] = os.environ,
+                    prefix: str = 'DB') -> dict:
+    """
+    Builds a ``DATABASES`` entry from the environment.
+
+    :param environ: The environment to read.
+    :type environ: Mapping
+    :param prefix: Prefix of the variable names, such as ``DB`` for
+        ``DB_ENGINE``.
+    :type prefix: str
+    :return: The database settings.
+    :rtype: dict
+    :raises ImproperlyConfigured: If a database server is configured
+        without ``DB_PASSWORD``.
+    """
+    def env(name: str, default: str = '') -> str:
+        return environ.get(f'{prefix}_{name}', default)
+
+    engine = env('ENGINE', 'mysql')
+    engine = ENGINES.get(engine, engine)
+    if engine == ENGINES['sqlite3']:
+        config = {'NAME': env('NAME', str(BASE_DIR / 'db.sqlite3'))}
+    else:
+        if f'{prefix}_PASSWORD' not in environ:
+            raise ImproperlyConfigured(
+                f"Set {prefix}_PASSWORD to the password of the "
+                f"{engine.rsplit('.', 1)[-1]} database.")
+        defaults = MYSQL_DEFAULTS if engine == ENGINES['mysql'] else {}
+        config = {name: env(name, defaults.get(name, ''))
+                  for name in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')}
+    config.update({
+        'ENGINE': engine,
+        'CONN_MAX_AGE': _max_age(env('CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': _flag(env('CONN_HEALTH_CHECKS', 'true')),
+    })
+    pool_size = env('POOL_MAX_SIZE')
+    if pool_size and engine == ENGINES['postgresql']:
+        # Pooled connections are returned to the pool after each request,
+        # so Django refuses to combine them with persistent connections.
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS'] = {'pool': {
+            'min_size': int(env('POOL_MIN_SIZE', '0')),
+            'max_size': int(pool_size),
+        }}
+    return config
+
+
+def replica_configs(environ: Mapping[str, str] = os.environ) -> dict:
+    """
+    Builds the ``DATABASES`` entries of the replicas listed in
+    ``DB_REPLICAS``. In tests, replicas mirror the test database.
+
+    :param environ: The environment to read.
+    :type environ: Mapping
+    :return: The database settings by replica alias.
+    :rtype: dict
+    """
+    configs = {}
+    for alias in environ.get('DB_REPLICAS', '').split(','):
+        alias = alias.strip()
+        if not alias:
+            continue
+        prefix = f'DB_{alias.upper()}_'
+        replica_environ = dict(environ)
+        replica_environ.update({
+            'DB_' + name[len(prefix):]: value
+            for name, value in environ.items() if name.startswith(prefix)})
+        configs[alias] = dict(database_config(replica_environ),
+                              TEST={'MIRROR': 'default'})
+    return configs
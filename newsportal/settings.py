@@ -13,11 +13,27 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from dotenv import load_dotenv
 
+from newsportal.databases import database_config, replica_configs
+
 # X (Twitter) API credentials loaded from environment variables
 X_BEARER_TOKEN = os.environ.get('X_BEARER_TOKEN', '')
 X_API_KEY = os.environ.get('X_API_KEY', '')
 X_API_SECRET = os.environ.get('X_API_SECRET', '')
 
+# Approved articles are queued and posted by `python manage.py publish_to_x`.
+# Posting is only enabled when a bearer token is configured.
+X_API_URL = os.environ.get('X_API_URL', 'https://api.twitter.com/2/tweets')
+X_POSTING_ENABLED = bool(X_BEARER_TOKEN)
+X_CONNECT_TIMEOUT = float(os.environ.get('X_CONNECT_TIMEOUT', 3.05))
+X_READ_TIMEOUT = float(os.environ.get('X_READ_TIMEOUT', 10))
+X_MAX_RETRIES = 3
+X_RETRY_BACKOFF = 0.5
+X_POOL_SIZE = 10
+X_MAX_ATTEMPTS = 5
+# Seconds a post claimed by ``publish_to_x --concurrency`` stays hidden
+# from other workers while it is being posted.
+X_CLAIM_LEASE = 300
+
 
 from pathlib import Path
 
@@ -57,26 +73,47 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'newsapp.middleware.ReplicaPinMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'newsapp.middleware.AsyncURLConfMiddleware',
 ]
 
 ROOT_URLCONF = 'newsportal.urls'
 
+# URLconf of requests served through ASGI (e.g. ``uvicorn
+# newsportal.asgi:application``), mapping the read-heavy pages and APIs
+# to async views; None serves them from ROOT_URLCONF. newsportal/asgi.py
+# also defaults DB_CONN_MAX_AGE to 0, as ASGI does not close persistent
+# connections of the threads the ORM runs in.
+ASYNC_URLCONF = 'newsapp.async_urls'
+
+# Templates are compiled once per process by the cached loader and reused
+# for every request (in DEBUG, the autoreloader empties it when a template
+# changes). Fragments wrapped in {% cache %} are stored in the default
+# cache for TEMPLATE_FRAGMENT_TIMEOUT seconds; see
+# newsapp/context_processors.py.
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'newsapp.context_processors.fragments',
+            ],
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
             ],
         },
     },
 ]
+TEMPLATE_FRAGMENT_TIMEOUT = 300
 
 WSGI_APPLICATION = 'newsportal.wsgi.application'
 
@@ -84,17 +121,30 @@ WSGI_APPLICATION = 'newsportal.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Configured from the environment (DB_ENGINE, DB_NAME, DB_CONN_MAX_AGE,
+# ...); see newsportal/databases.py. Defaults to the local MariaDB
+# database, whose password must be given in DB_PASSWORD, with connections
+# reused for 60 seconds (0 under ASGI); DB_ENGINE=sqlite3 runs without a
+# database server.
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'newsappdb',  # Your MariaDB database name
-        'USER': 'admin',       # Your MariaDB username
-        'PASSWORD': '@Sapd71236147',
-        'HOST': 'localhost',
-        'PORT': '3306',
-    }
+    'default': database_config(),
+    **replica_configs(),
 }
 
+# Read-only reader pages and APIs read from these aliases (DB_REPLICAS),
+# except for REPLICA_PIN_SECONDS after a change; see newsapp/routers.py.
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+DATABASE_ROUTERS = ['newsapp.routers.ReplicaRouter']
+
+# MySQL has no partial indexes: it builds Article's article_published_idx
+# and article_pending_idx without their conditions, and Django warns
+# about them (models.W037). Queries there use the composite
+# article_approved_created_idx instead, so the warning is silenced on
+# MySQL only.
+if DATABASES['default']['ENGINE'] == 'django.db.backends.mysql':
+    SILENCED_SYSTEM_CHECKS = ['models.W037']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -139,8 +189,90 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGOUT_REDIRECT_URL = '/'
 
+# Default page size of the keyset-paginated article API.
+ARTICLE_PAGE_SIZE = 50
+
+# Entries per page of the publisher and journalist directories.
+BROWSE_PAGE_SIZE = 50
+
+# Precomputed reader feeds: the subscriber count above which a
+# publisher's articles are read from the articles table instead of being
+# fanned out, and above which an approval leaves the fan-out to the
+# fan_out_feeds command (run it every minute or so). Feeds show only
+# their entries: setting FEED_BACKFILL_LIMIT copies only that many of a
+# source's newest articles on subscribe, and setting FEED_RETENTION_DAYS
+# lets the trim_feeds command remove older entries. Both are unlimited
+# by default.
+FEED_BACKFILL_LIMIT = None
+FEED_FANOUT_LIMIT = 10000
+FEED_SYNC_FANOUT_LIMIT = 1000
+FEED_BATCH_SIZE = 1000
+FEED_RETENTION_DAYS = None
+
+# Cache backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# and CACHE_LOCATION=redis://127.0.0.1:6379 to share it between processes.
+# Deployments with several worker processes need a shared backend: with
+# the default per-process LocMemCache, a change invalidates the cached
+# listings of the process that made it only (see newsapp/cache.py).
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Anonymous article listings are cached per article generation; see
+# newsapp/cache.py.
+LISTING_CACHE_ALIAS = 'default'
+LISTING_CACHE_TIMEOUT = 300
+
+# Users' resolved roles, groups and permissions (newsapp.access) are
+# cached in this cache alias; entries are invalidated on change.
+ACCESS_CACHE_ALIAS = 'default'
+ACCESS_CACHE_TIMEOUT = 3600
+
+AUTHENTICATION_BACKENDS = ['newsapp.access.CachedModelBackend']
+
+# Seconds a request's user is served from the cache; 0 loads it from the
+# database on every request.
+USER_CACHE_TIMEOUT = 300
+
+# Session storage: cached_db reads sessions from the cache and falls
+# back to the database; set SESSION_ENGINE to
+# django.contrib.sessions.backends.signed_cookies (no server-side
+# storage) or ...backends.cache (a shared CACHES backend required).
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+
+# Default number of results returned by /api/articles/search/. Query
+# words ending in * match terms starting with them if they have at least
+# SEARCH_MIN_PREFIX characters, up to SEARCH_PREFIX_EXPANSION terms per
+# word; a search reads at most SEARCH_MAX_POSTINGS index rows.
+SEARCH_RESULT_LIMIT = 20
+SEARCH_MIN_PREFIX = 3
+SEARCH_PREFIX_EXPANSION = 50
+SEARCH_MAX_POSTINGS = 10000
+
+# Rows read per query by the streaming article export.
+EXPORT_BATCH_SIZE = 1000
+
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Subscriber notifications are queued in the outbox and delivered by
+# `python manage.py send_notifications` in batches of this many recipients.
+NOTIFICATION_FROM_EMAIL = 'no-reply@newsportal.com'
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', 100))
+NOTIFICATION_MAX_ATTEMPTS = 5
+# Batches in flight at once, each over its own mail connection; 1 sends
+# them one after the other over a single connection.
+NOTIFICATION_CONCURRENCY = int(os.environ.get('NOTIFICATION_CONCURRENCY', 1))
+
+# 'immediate' queues one notification per approved article; 'digest'
+# queues approvals per subscriber and `python manage.py send_digests`,
+# run once per digest period, mails each reader one digest.
+NOTIFICATION_MODE = os.environ.get('NOTIFICATION_MODE', 'immediate')
+
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'smtp.gmail.com'
 # EMAIL_PORT = 587